@@ -4,7 +4,12 @@ from django.contrib.auth.admin import UserAdmin
 from production.models import (
     Worker, Workplace,
     Order, Material,
-    Printer, PrintQueue
+    Printer, PrintQueue,
+    SlowQuery,
+    ArchivedOrder, ArchivedPrintQueue,
+    StatusEvent,
+    MaterialLedgerEntry,
+    MaterialRoll,
 )
 
 
@@ -27,5 +32,130 @@ class WorkerAdmin(UserAdmin):
 admin.site.register(Workplace)
 admin.site.register(Material)
 admin.site.register(Printer)
-admin.site.register(PrintQueue)
-admin.site.register(Order)
+
+
+@admin.register(PrintQueue, Order)
+class StatusHistoryAdmin(admin.ModelAdmin):
+    """Status changes made in the admin are logged with their author."""
+
+    def save_model(self, request, obj, form, change):
+        obj.changed_by = request.user
+        super().save_model(request, obj, form, change)
+
+
+admin.site.register(ArchivedPrintQueue)
+admin.site.register(ArchivedOrder)
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """
+    SlowQueryAdmin:
+    - Read-only list of slow query fingerprints, the most expensive first.
+    - Shows the code and view that ran the query and its plan.
+    """
+
+    list_display = (
+        "fingerprint_short",
+        "origin",
+        "view_name",
+        "count",
+        "average_ms",
+        "max_ms",
+        "total_ms",
+        "last_seen",
+    )
+    list_filter = ("view_name",)
+    search_fields = ("fingerprint", "origin", "view_name")
+    readonly_fields = (
+        "fingerprint",
+        "sql",
+        "explain",
+        "origin",
+        "view_name",
+        "count",
+        "average_ms",
+        "max_ms",
+        "total_ms",
+        "first_seen",
+        "last_seen",
+    )
+    exclude = ("fingerprint_hash",)
+
+    @admin.display(description="Query")
+    def fingerprint_short(self, obj):
+        return str(obj)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StatusEvent)
+class StatusEventAdmin(admin.ModelAdmin):
+    """
+    StatusEventAdmin:
+    - Read-only view of the append-only status event log.
+    """
+
+    list_display = (
+        "at",
+        "kind",
+        "order_id",
+        "print_queue_id",
+        "from_status",
+        "to_status",
+        "by",
+        "workplace",
+        "printer",
+    )
+    list_filter = ("kind", "to_status", "workplace")
+    search_fields = ("order_id", "print_queue_id")
+    date_hierarchy = "at"
+    list_select_related = ("by", "workplace", "printer")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(MaterialRoll)
+class MaterialRollAdmin(admin.ModelAdmin):
+    """
+    MaterialRollAdmin:
+    - Read-only, rolls are received and consumed through the ledger
+      (`manage.py receive_rolls`, done print queues).
+    """
+
+    list_display = ("id", "material", "area", "remaining_area", "received_at")
+    list_filter = ("material",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(MaterialLedgerEntry)
+class MaterialLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ("at", "material", "kind", "area", "roll", "print_queue_id", "by")
+    list_filter = ("kind", "material")
+    date_hierarchy = "at"
+    list_select_related = ("material", "roll", "by")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
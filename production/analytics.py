@@ -0,0 +1,307 @@
+import bisect
+import datetime
+from typing import Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from production.models import (
+    AnalyticsBucket,
+    ArchivedOrder,
+    ArchivedPrintQueue,
+    Material,
+    Order,
+    Printer,
+    PrintQueue,
+    StatusEvent,
+    Worker,
+    Workplace,
+)
+from production.reference_data import get_reference_data
+from production.utils import batched
+
+ORDER_LEAD_TIME = "order_lead_time"
+QUEUE_CYCLE_TIME = "queue_cycle_time"
+METRICS = {
+    StatusEvent.ORDER: ORDER_LEAD_TIME,
+    StatusEvent.PRINT_QUEUE: QUEUE_CYCLE_TIME,
+}
+METRIC_LABELS = {
+    ORDER_LEAD_TIME: "Order lead time (creation to done)",
+    QUEUE_CYCLE_TIME: "Print queue cycle time (creation to done)",
+}
+
+DIMENSIONS = ("all", "workplace", "printer", "material", "worker")
+DIMENSION_MODELS = {
+    "workplace": Workplace,
+    "printer": Printer,
+    "material": Material,
+}
+
+# Upper bounds of the duration buckets in seconds, the last bucket is open.
+HOUR = 3600
+BUCKET_BOUNDS = (
+    HOUR // 4,
+    HOUR // 2,
+    HOUR,
+    2 * HOUR,
+    4 * HOUR,
+    8 * HOUR,
+    12 * HOUR,
+    24 * HOUR,
+    2 * 24 * HOUR,
+    3 * 24 * HOUR,
+    5 * 24 * HOUR,
+    7 * 24 * HOUR,
+    14 * 24 * HOUR,
+    30 * 24 * HOUR,
+)
+
+MAX_DAYS = 366
+
+# Event kind -> (event field with the object id, live and archived models).
+HISTORY_SOURCES = {
+    StatusEvent.ORDER: ("order_id", (Order, ArchivedOrder)),
+    StatusEvent.PRINT_QUEUE: ("print_queue_id", (PrintQueue, ArchivedPrintQueue)),
+}
+
+# (dimension, metric, day, key, bucket) -> [count, total seconds]
+Increments = dict[tuple, list]
+
+
+def bucket_of(seconds: float) -> int:
+    return bisect.bisect_left(BUCKET_BOUNDS, seconds)
+
+
+def add_duration(
+    increments: Increments,
+    metric: str,
+    done_at: datetime.datetime,
+    seconds: float,
+    keys: dict[str, Optional[int]],
+) -> None:
+    """Count one done transition in "all" and in every known dimension."""
+    seconds = max(seconds, 0.0)
+    day = timezone.localdate(done_at)
+    bucket = bucket_of(seconds)
+    for dimension, key in (("all", 0), *keys.items()):
+        if key is None:
+            continue
+        entry = increments.setdefault((dimension, metric, day, key, bucket), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+def transition_increments(
+    transitions: Iterable[tuple], increments: Optional[Increments] = None
+) -> Increments:
+    increments = {} if increments is None else increments
+    for event, creation_time, material_id in transitions:
+        if event.to_status != Order.DONE or event.kind not in METRICS:
+            continue
+        keys = {
+            "workplace": event.workplace_id,
+            "printer": event.printer_id,
+            "material": material_id,
+        }
+        # Only orders have a performer, the history has no worker of a queue.
+        if event.kind == StatusEvent.ORDER:
+            keys["worker"] = event.by_id
+        add_duration(
+            increments,
+            METRICS[event.kind],
+            event.at,
+            (event.at - creation_time).total_seconds(),
+            keys,
+        )
+    return increments
+
+
+def apply_increments(increments: Increments) -> None:
+    """
+    Add the increments to their buckets with `UPDATE ... SET count = count + n`,
+    so concurrent transitions do not overwrite each other;
+    missing buckets are created.
+    """
+    for (dimension, metric, day, key, bucket), (count, total) in increments.items():
+        buckets = AnalyticsBucket.objects.filter(
+            dimension=dimension, metric=metric, day=day, key=key, bucket=bucket
+        )
+        add = {
+            "count": F("count") + count,
+            "total_seconds": F("total_seconds") + total,
+        }
+        if buckets.update(**add):
+            continue
+        try:
+            with transaction.atomic():
+                AnalyticsBucket.objects.create(
+                    dimension=dimension,
+                    metric=metric,
+                    day=day,
+                    key=key,
+                    bucket=bucket,
+                    count=count,
+                    total_seconds=total,
+                )
+        except IntegrityError:
+            # Created by a concurrent transition in the meantime.
+            buckets.update(**add)
+
+
+def record_transitions(transitions: Iterable[tuple]) -> None:
+    apply_increments(transition_increments(transitions))
+
+
+def history_key(event: StatusEvent) -> tuple:
+    return event.kind, getattr(event, HISTORY_SOURCES[event.kind][0])
+
+
+def history_increments(chunk_size: int = 2000) -> Increments:
+    """
+    Increments of all done transitions in the `StatusEvent` log, joined
+    to the creation time and material of the live or archived object,
+    so the rebuild counts exactly what `record_transitions` counted.
+    Events are streamed, memory is bounded by the number of buckets.
+    """
+    increments = {}
+    events = StatusEvent.objects.filter(
+        to_status=Order.DONE, kind__in=list(METRICS)
+    ).order_by("pk")
+    for chunk in batched(events.iterator(chunk_size=chunk_size), chunk_size):
+        objects = {}
+        for kind, (field, models) in HISTORY_SOURCES.items():
+            pks = {getattr(event, field) for event in chunk if event.kind == kind}
+            if not pks:
+                continue
+            for model in models:
+                rows = model.objects.filter(pk__in=pks).values_list(
+                    "pk", "creation_time", "material_id"
+                )
+                objects.update(
+                    ((kind, pk), (created, material)) for pk, created, material in rows
+                )
+        transitions = []
+        for event in chunk:
+            # Objects deleted without archiving have no creation time left.
+            found = objects.get(history_key(event))
+            if found is not None:
+                transitions.append((event, *found))
+        transition_increments(transitions, increments)
+    return increments
+
+
+def rebuild_analytics(batch_size: int = 1000) -> int:
+    """Replace all buckets with the ones computed from the history."""
+    increments = history_increments()
+    with transaction.atomic():
+        AnalyticsBucket.objects.all().delete()
+        AnalyticsBucket.objects.bulk_create(
+            (
+                AnalyticsBucket(
+                    dimension=dimension,
+                    metric=metric,
+                    day=day,
+                    key=key,
+                    bucket=bucket,
+                    count=totals[0],
+                    total_seconds=totals[1],
+                )
+                for (dimension, metric, day, key, bucket), totals in increments.items()
+            ),
+            batch_size=batch_size,
+        )
+    return len(increments)
+
+
+def bucket_quantile(counts: list[int], quantile: float) -> Optional[float]:
+    """
+    Quantile estimated from bucket counts by linear interpolation
+    inside the bucket, the open last bucket reports its lower bound.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    rank = quantile * total
+    seen = 0
+    for bucket, count in enumerate(counts):
+        if count and seen + count >= rank:
+            lower = BUCKET_BOUNDS[bucket - 1] if bucket else 0
+            if bucket == len(BUCKET_BOUNDS):
+                return float(lower)
+            upper = BUCKET_BOUNDS[bucket]
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return float(BUCKET_BOUNDS[-1])
+
+
+def dimension_labels(dimension: str, keys: Iterable[int]) -> dict[int, str]:
+    if dimension == "all":
+        return {0: "All"}
+    if dimension == "worker":
+        return dict(Worker.objects.filter(pk__in=keys).values_list("pk", "username"))
+    return get_reference_data(DIMENSION_MODELS[dimension]).labels()
+
+
+def hours(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds / HOUR, 2)
+
+
+def analytics_summary(
+    dimension: str = "all", days: int = 30, today: Optional[datetime.date] = None
+) -> dict:
+    """
+    Lead time, cycle time and throughput of the last days by dimension value.
+    Reads at most days x values x buckets rows of `AnalyticsBucket`,
+    independent of the number of orders.
+    """
+    today = today or timezone.localdate()
+    start = today - datetime.timedelta(days=days - 1)
+    rows = AnalyticsBucket.objects.filter(
+        dimension=dimension, day__gte=start, day__lte=today
+    ).values_list("metric", "key", "day", "bucket", "count", "total_seconds")
+
+    stats = {}
+    for metric, key, day, bucket, count, total in rows:
+        item = stats.setdefault(metric, {}).setdefault(
+            key,
+            {
+                "count": 0,
+                "total": 0.0,
+                "buckets": [0] * (len(BUCKET_BOUNDS) + 1),
+                "daily": [0] * days,
+            },
+        )
+        item["count"] += count
+        item["total"] += total
+        item["buckets"][bucket] += count
+        item["daily"][(day - start).days] += count
+
+    keys = {key for by_key in stats.values() for key in by_key}
+    labels = dimension_labels(dimension, keys) if keys else {}
+    metrics = {}
+    for metric in METRICS.values():
+        items = []
+        for key, item in stats.get(metric, {}).items():
+            items.append(
+                {
+                    "key": key,
+                    "label": labels.get(key, str(key)),
+                    "done": item["count"],
+                    "throughput_per_day": round(item["count"] / days, 2),
+                    "mean_hours": hours(item["total"] / item["count"]),
+                    "p50_hours": hours(bucket_quantile(item["buckets"], 0.5)),
+                    "p90_hours": hours(bucket_quantile(item["buckets"], 0.9)),
+                    "daily": item["daily"],
+                }
+            )
+        items.sort(key=lambda item: -item["done"])
+        metrics[metric] = {"label": METRIC_LABELS[metric], "items": items}
+    return {
+        "dimension": dimension,
+        "days": days,
+        "start": start.isoformat(),
+        "end": today.isoformat(),
+        "metrics": metrics,
+    }
@@ -0,0 +1,109 @@
+import datetime
+from typing import Callable, Optional
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, QuerySet
+from django.utils import timezone
+
+from production.models import ArchivedOrder, ArchivedPrintQueue, Order, PrintQueue
+from production.utils import batched
+
+ARCHIVE_BATCH_SIZE = 500
+
+
+def archivable_print_queues(before: datetime.datetime) -> QuerySet:
+    """Done queues created before the date whose orders were all done before it."""
+    unfinished_orders = Order.objects.filter(print_queue=OuterRef("pk")).exclude(
+        status=Order.DONE, performing_time__lt=before
+    )
+    return PrintQueue.objects.filter(
+        status=PrintQueue.DONE, creation_time__lt=before
+    ).exclude(Exists(unfinished_orders))
+
+
+def archivable_orders(before: datetime.datetime) -> QuerySet:
+    """Orders done before the date outside of print queues."""
+    return Order.objects.filter(
+        status=Order.DONE, performing_time__lt=before, print_queue__isnull=True
+    )
+
+
+def copy_rows(source, target, pks: list[int], archived_at: datetime.datetime) -> int:
+    """
+    Copy rows to the archive table with one INSERT ... SELECT,
+    which PostgreSQL and SQLite run without loading the rows into Python.
+    Archive tables have the same column names plus `archived_at`.
+    """
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(field.column) for field in source._meta.concrete_fields)
+    placeholders = ", ".join(["%s"] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(target._meta.db_table)} "
+            f"({columns}, {quote('archived_at')}) "
+            f"SELECT {columns}, %s FROM {quote(source._meta.db_table)} "
+            f"WHERE {quote(source._meta.pk.column)} IN ({placeholders})",
+            [archived_at, *pks],
+        )
+        return cursor.rowcount
+
+
+def archive_print_queues(pks: list[int], archived_at: datetime.datetime) -> tuple:
+    """Move the queues and their orders to the archive in one transaction."""
+    with transaction.atomic():
+        order_pks = list(
+            Order.objects.filter(print_queue__in=pks).values_list("pk", flat=True)
+        )
+        queues = copy_rows(PrintQueue, ArchivedPrintQueue, pks, archived_at)
+        orders = 0
+        for batch in batched(order_pks, ARCHIVE_BATCH_SIZE):
+            orders += copy_rows(Order, ArchivedOrder, batch, archived_at)
+            Order.objects.filter(pk__in=batch).delete()
+        PrintQueue.objects.filter(pk__in=pks).delete()
+    return queues, orders
+
+
+def archive_orders(pks: list[int], archived_at: datetime.datetime) -> int:
+    with transaction.atomic():
+        orders = copy_rows(Order, ArchivedOrder, pks, archived_at)
+        Order.objects.filter(pk__in=pks).delete()
+    return orders
+
+
+def archive_done(
+    before: datetime.datetime,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    dry_run: bool = False,
+    log: Optional[Callable[[str], None]] = None,
+) -> dict[str, int]:
+    """
+    Move done print queues and orders finished before the date
+    to `ArchivedPrintQueue` and `ArchivedOrder`, one transaction per batch,
+    so the live tables scanned by ready/problem queries hold only live work.
+    Ids are kept, so archived orders keep their URLs.
+    """
+    queue_pks = list(archivable_print_queues(before).values_list("pk", flat=True))
+    order_pks = list(archivable_orders(before).values_list("pk", flat=True))
+    archived = {"print_queues": 0, "orders": 0}
+    if dry_run:
+        archived["print_queues"] = len(queue_pks)
+        archived["orders"] = (
+            len(order_pks)
+            + Order.objects.filter(
+                print_queue__in=archivable_print_queues(before)
+            ).count()
+        )
+        return archived
+
+    archived_at = timezone.now()
+    for batch in batched(queue_pks, batch_size):
+        queues, orders = archive_print_queues(batch, archived_at)
+        archived["print_queues"] += queues
+        archived["orders"] += orders
+        if log:
+            log(f"Archived {archived['print_queues']} print queues")
+    for batch in batched(order_pks, batch_size):
+        archived["orders"] += archive_orders(batch, archived_at)
+        if log:
+            log(f"Archived {archived['orders']} orders")
+    return archived
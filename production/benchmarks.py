@@ -0,0 +1,383 @@
+import json
+import platform
+import statistics
+import timeit
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import cycle
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import django
+from django import forms
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+
+from production.calculations import PrintQueueSummary, create_summary_context
+from production.capabilities import CapabilityIndex, get_capability_index
+from production.models import Material, Order, Printer, PrintQueue, Workplace
+from production.scheduling import PrinterSchedule
+from production.simulation import (
+    ShopFloorSimulation,
+    SimulationConfig,
+    synthetic_arrivals,
+)
+from production.services import (
+    filter_materials_by_printers,
+    filter_materials_by_workplace_active_printers,
+    filter_orders_by_materials,
+    filter_orders_by_ready_or_problem_relative,
+    filter_queryset_by_instance,
+    filter_workplaces_by_active_printers_materials,
+    set_remove_foreign_by_cleaned_data_and_instance,
+)
+
+SIZES = (10, 100, 1000)
+
+
+@dataclass
+class Benchmark:
+    """
+    Benchmark:
+    - `setup(size)` prepares the input of one size
+      and returns the function to time.
+    - Benchmarks with `database` create rows, they run in a transaction
+      which is rolled back.
+    """
+
+    name: str
+    setup: Callable[[int], Callable[[], object]]
+    sizes: tuple[int, ...] = SIZES
+    database: bool = False
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, sizes: Iterable[int] = SIZES, database: bool = False):
+    def decorator(setup):
+        BENCHMARKS[name] = Benchmark(name, setup, tuple(sizes), database)
+        return setup
+
+    return decorator
+
+
+def make_orders(size: int, material: Optional[Material] = None) -> list[Order]:
+    """Unsaved orders with the sizes of real images (cm)."""
+    material = material or Material(name="Benchmark", winding=1000)
+    return [
+        Order(
+            code=str(index),
+            width=50 + index * 37 % 400,
+            height=100 + index * 53 % 300,
+            material=material,
+            status=Order.PROBLEM if index % 25 == 0 else Order.READY_TO_PRINT,
+        )
+        for index in range(size)
+    ]
+
+
+@benchmark("order.tiles_count")
+def tiles_count(size: int):
+    orders = make_orders(size)
+    return lambda: [order.tiles_count for order in orders]
+
+
+@benchmark("order.narrow_tile_width")
+def narrow_tile_width(size: int):
+    orders = make_orders(size)
+    return lambda: [order.narrow_tile_width for order in orders]
+
+
+@benchmark("print_queue_summary.as_dict")
+def summary_as_dict(size: int):
+    material = Material(name="Benchmark", winding=1000)
+    summary = PrintQueueSummary(make_orders(size, material), material)
+    return summary.as_dict
+
+
+@benchmark("create_summary_context")
+def summary_context(size: int):
+    material = Material(name="Benchmark", winding=1000)
+    form = forms.Form()
+    form.initial_context = {"material": material, "orders": make_orders(size)}
+    return lambda: create_summary_context(form)
+
+
+@benchmark("set_remove_foreign_by_cleaned_data_and_instance", database=True)
+def set_remove_foreign(size: int):
+    workplace = Workplace.objects.create(name="benchmark")
+    printers = Printer.objects.bulk_create(
+        Printer(name=f"benchmark_{index}", model=f"benchmark_{index}")
+        for index in range(size * 2)
+    )
+    pks = [printer.pk for printer in printers]
+    # Every call moves the workplace to the other half of the printers.
+    halves = cycle([pks[:size], pks[size:]])
+    # The printers are unknown to a warm index, the updates do not invalidate it.
+    get_capability_index()
+
+    def run():
+        set_remove_foreign_by_cleaned_data_and_instance(
+            Printer,
+            {"printers": Printer.objects.filter(pk__in=next(halves))},
+            workplace,
+        )
+
+    return run
+
+
+def capability_rows(size: int) -> list[tuple]:
+    """`size` printers of 10 workplaces, each supporting 3 of 10 materials."""
+    return [
+        (
+            printer,
+            Printer.MAINTENANCE if printer % 7 == 0 else Printer.ACTIVE,
+            printer % 10,
+            (printer + offset) % 10,
+        )
+        for printer in range(size)
+        for offset in range(3)
+    ]
+
+
+@benchmark("capability_index.lookup")
+def capability_index_lookup(size: int):
+    """In-memory lookups of an index of `size` printers built once."""
+    index = CapabilityIndex(capability_rows(size))
+    materials = range(10)
+
+    def run():
+        for key in range(10):
+            index.materials_for_workplace(key)
+            index.printers_for_material(key)
+            index.printers_for_material(key, workplace_id=key)
+        index.workplaces_for_materials(materials)
+
+    return run
+
+
+@benchmark("capability_index.get")
+def capability_index_get(size: int):
+    """
+    Reading the warm process index: one shared version lookup.
+    The index is built in the setup and not invalidated while timed.
+    """
+    get_capability_index()
+    return lambda: [get_capability_index() for _ in range(size)]
+
+
+@benchmark("capability_index.build", database=True)
+def capability_index_build(size: int):
+    """Rebuilding the index from the Printer.materials table, one query."""
+    workplaces = Workplace.objects.bulk_create(
+        Workplace(name=f"benchmark_{index}") for index in range(10)
+    )
+    materials = Material.objects.bulk_create(
+        Material(
+            name=f"benchmark_{index}",
+            type="benchmark",
+            roll_width=1,
+            winding=100,
+            density=1,
+        )
+        for index in range(10)
+    )
+    printers = Printer.objects.bulk_create(
+        Printer(
+            name=f"benchmark_{index}",
+            model=f"benchmark_{index}",
+            status=status,
+            workplace=workplaces[workplace],
+        )
+        for index, status, workplace, _ in capability_rows(size)[::3]
+    )
+    Printer.materials.through.objects.bulk_create(
+        Printer.materials.through(
+            printer_id=printers[printer].pk, material_id=materials[material].pk
+        )
+        for printer, _, _, material in capability_rows(size)
+    )
+    return CapabilityIndex.build
+
+
+@benchmark("printer_schedule.assign")
+def printer_schedule_assign(size: int):
+    """Planning 10 queues per printer on `size` printers of 10 workplaces."""
+    materials = range(5)
+    index = CapabilityIndex(
+        (printer, Printer.ACTIVE, printer % 10, material)
+        for printer in range(size)
+        for material in materials
+        if (printer + material) % 3
+    )
+    speeds = {printer: 5 + printer % 10 for printer in range(size)}
+    queues = [
+        (queue % 5, queue % 10, 1 + queue * 37 % 20) for queue in range(size * 10)
+    ]
+
+    def run():
+        schedule = PrinterSchedule(speeds, {}, index)
+        for material_id, workplace_id, area in queues:
+            schedule.assign(material_id, workplace_id, area)
+
+    return run
+
+
+@benchmark("simulation.week", sizes=(10, 100))
+def simulation_week(size: int):
+    """A simulated week of `size` printers busy about half of the time."""
+    printers = [
+        {
+            "id": printer,
+            "workplace_id": printer % 10,
+            "speed": 8 + printer % 5,
+            "materials": {printer % 4, (printer + 1) % 4},
+            "active": True,
+        }
+        for printer in range(size)
+    ]
+    arrivals = synthetic_arrivals(printers, orders_per_hour=size * 0.6)
+    config = SimulationConfig(days=7)
+    return lambda: ShopFloorSimulation(printers, arrivals, config).run()
+
+
+def compile_query(queryset) -> str:
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        # e.g. `pk__in` of an empty capability index, no query is run.
+        return ""
+    return sql
+
+
+@benchmark("services.filter_query_builders")
+def filter_query_builders(size: int):
+    """
+    Building and compiling the querysets, without executing them,
+    with a warm capability index.
+    """
+    workplace = Workplace(pk=1, name="benchmark")
+    queue = PrintQueue(pk=1, workplace=workplace)
+    materials = list(range(1, size + 1))
+    printers = list(range(1, size + 1))
+    get_capability_index()
+
+    def run():
+        compile_query(filter_queryset_by_instance(Printer.objects.all(), workplace))
+        compile_query(filter_materials_by_printers(Material.objects.all(), printers))
+        compile_query(
+            filter_materials_by_workplace_active_printers(
+                Material.objects.all(), workplace
+            )
+        )
+        compile_query(filter_orders_by_materials(Order.objects.all(), materials))
+        compile_query(
+            filter_workplaces_by_active_printers_materials(
+                Workplace.objects.all(), materials
+            )
+        )
+        compile_query(
+            filter_orders_by_ready_or_problem_relative(Order.objects.all(), queue)
+        )
+
+    return run
+
+
+def measure(function: Callable, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """
+    Time the function as `timeit` does: loops per run are chosen
+    so one run takes at least `min_time`, the median of `repeat` runs
+    is the result, in microseconds per call.
+    """
+    timer = timeit.Timer(function)
+    loops = 1
+    while True:
+        if timer.timeit(loops) >= min_time:
+            break
+        loops *= 2 if loops < 1000 else 10
+    runs = [timer.timeit(loops) / loops * 1e6 for _ in range(repeat)]
+    return {
+        "median_us": round(statistics.median(runs), 3),
+        "min_us": round(min(runs), 3),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def result_key(name: str, size: int) -> str:
+    return f"{name}[{size}]"
+
+
+def run_benchmarks(
+    names: Optional[Iterable[str]] = None,
+    sizes: Optional[Iterable[int]] = None,
+    repeat: int = 5,
+    min_time: float = 0.2,
+    log: Optional[Callable[[str], None]] = None,
+) -> dict:
+    selected = [BENCHMARKS[name] for name in names] if names else BENCHMARKS.values()
+    results = {}
+    for item in selected:
+        for size in tuple(sizes) if sizes else item.sizes:
+            key = result_key(item.name, size)
+            with transaction.atomic() if item.database else nullcontext():
+                function = item.setup(size)
+                function()  # warm up caches and lazy imports
+                results[key] = measure(function, repeat, min_time)
+                if item.database:
+                    # Rows created by the setup and the function are not kept.
+                    transaction.set_rollback(True)
+            if log:
+                log(f"{key}: {results[key]['median_us']}us")
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def load_results(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_results(path: Path, results: dict) -> None:
+    with open(path, "w") as file:
+        json.dump(results, file, indent=4, sort_keys=True)
+
+
+def compare_results(results: dict, previous: dict, tolerance: float = 0.2) -> list[str]:
+    """Benchmarks of both runs whose median grew by more than `tolerance`."""
+    regressions = []
+    for key, stats in results["results"].items():
+        before = previous["results"].get(key)
+        if not before or not before["median_us"]:
+            continue
+        if stats["median_us"] > before["median_us"] * (1 + tolerance):
+            regressions.append(
+                f"{key}: {before['median_us']}us -> {stats['median_us']}us"
+            )
+    return regressions
+
+
+def format_results(results: dict, previous: Optional[dict] = None) -> str:
+    header = f"{'benchmark':<60} {'median us':>12} {'min us':>12} {'vs prev':>8}"
+    lines = [header, "-" * len(header)]
+    for key, stats in results["results"].items():
+        change = ""
+        before = (previous or {}).get("results", {}).get(key)
+        if before and before["median_us"]:
+            change = f"{(stats['median_us'] / before['median_us'] - 1) * 100:+.0f}%"
+        lines.append(
+            f"{key:<60} {stats['median_us']:>12} {stats['min_us']:>12} {change:>8}"
+        )
+    return "\n".join(lines)
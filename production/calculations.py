@@ -1,13 +1,15 @@
 from typing import List, Dict, Union, Any
+from django.core.exceptions import ObjectDoesNotExist
 from django.forms import BaseForm
 
 from production.status_objects import PrintStatusMixin
 
 
 class PrintQueueSummary:
-    def __init__(self, orders=None, material=None) -> None:
+    def __init__(self, orders=None, material=None, stock=None) -> None:
         self.orders = orders
         self.material = material
+        self.stock = stock
 
     @property
     def total_tiles(self) -> int:
@@ -29,19 +31,32 @@ class PrintQueueSummary:
             else round(self.material.winding - self.total_area, 2)
         )
 
+    @property
+    def stock_left(self) -> Union[int, float, None]:
+        """Material in stock after the queue, None if it is not tracked."""
+        if self.stock is None:
+            return None
+        return round(self.stock.remaining_area - self.total_area, 2)
+
     @property
     def messages(self) -> List[str]:
         messages = []
         warning = "Warning: "
         if self.winding_left < 0:
             messages.append(warning + "You have too many orders!")
+        if self.stock_left is not None and self.stock_left < 0:
+            messages.append(warning + "There is not enough material in stock!")
         if self.total_tiles % 2 != 0:
             messages.append(
                 warning + "The recommended number of tiles must be even!"
             )
         if self.orders:
-            problem_orders = self.orders.filter(status=PrintStatusMixin.PROBLEM)
-            if problem_orders.exists():
+            problem_orders = [
+                order
+                for order in self.orders
+                if order.status == PrintStatusMixin.PROBLEM
+            ]
+            if problem_orders:
                 messages.append(warning + "There are problem orders!")
                 for order in problem_orders:
                     messages.append(f"{order};")
@@ -52,6 +67,7 @@ class PrintQueueSummary:
             "total_tiles": self.total_tiles,
             "total_area": self.total_area,
             "winding_left": self.winding_left,
+            "stock_left": self.stock_left,
             "messages": self.messages,
         }
 
@@ -66,6 +82,9 @@ class PrintQueueSummary:
     def set_material(self, material: Any):
         self.material = material
 
+    def set_stock(self, stock: Any):
+        self.stock = stock
+
     def set_field(self, field_name: str, value: Any):
         if hasattr(self, field_name):
             setattr(self, field_name, value)
@@ -78,16 +97,31 @@ class PrintQueueSummary:
 def create_summary_context(
     form: BaseForm,
 ):
-    """Generate Summary from form context data or initial_context property."""
+    """
+    Generate Summary from form context data or initial_context property.
+    (!) Form validation result is cached, so a form already
+    validated by the view is not cleaned again.
+    """
     summary = PrintQueueSummary()
     summary_context = {}
     form.is_valid()
     if hasattr(form, "cleaned_data"):
         summary_context = form.cleaned_data
-    elif hasattr(form, "initial_context"):
-        summary_context = form.initial_context
+    else:
+        summary_context = getattr(form, "initial_context", summary_context)
     material = summary_context.get("material", None)
     orders = summary_context.get("orders", None)
     summary.set_material(material)
+    summary.set_stock(material_stock(material))
     summary.set_orders(orders)
     return summary.as_context()
+
+
+def material_stock(material: Any) -> Any:
+    """`MaterialStock` of the material, None if its rolls are not tracked."""
+    if material is None or material.pk is None:
+        return None
+    try:
+        return material.stock
+    except ObjectDoesNotExist:
+        return None
@@ -0,0 +1,132 @@
+from collections import defaultdict
+from threading import Lock
+from typing import Any, Iterable, Optional
+
+from production.metrics import cache_requests
+from production.status_objects import PrinterStatusMixin
+from production.versioning import SharedVersion
+
+
+class CapabilityIndex:
+    """
+    CapabilityIndex:
+    - In-process map of material -> active printers -> workplaces.
+    - Built from the Printer.materials table with a single query.
+    - Kept per process, a shared version stamp tells every process
+      to rebuild it after a change.
+    - Answers "which workplaces/printers can print this material"
+      without many-to-many joins and `distinct()`.
+    """
+
+    def __init__(self, rows: Iterable[tuple[int, str, Optional[int], int]]) -> None:
+        """
+        Rows are (printer_id, printer_status, workplace_id, material_id).
+        """
+        self.printer_status: dict[int, str] = {}
+        self.printer_workplace: dict[int, Optional[int]] = {}
+        self.printer_materials: dict[int, set[int]] = defaultdict(set)
+        self.material_printers: dict[int, set[int]] = defaultdict(set)
+        self.material_workplaces: dict[int, set[int]] = defaultdict(set)
+        self.workplace_materials: dict[int, set[int]] = defaultdict(set)
+
+        for printer_id, status, workplace_id, material_id in rows:
+            self.printer_status[printer_id] = status
+            self.printer_workplace[printer_id] = workplace_id
+            self.printer_materials[printer_id].add(material_id)
+            if status != PrinterStatusMixin.ACTIVE:
+                continue
+            self.material_printers[material_id].add(printer_id)
+            if workplace_id is not None:
+                self.material_workplaces[material_id].add(workplace_id)
+                self.workplace_materials[workplace_id].add(material_id)
+
+    @classmethod
+    def build(cls) -> "CapabilityIndex":
+        from production.models import Printer
+
+        rows = Printer.materials.through.objects.values_list(
+            "printer_id", "printer__status", "printer__workplace_id", "material_id"
+        )
+        return cls(rows)
+
+    def is_tracked(self, printer_id: int, status: str, workplace_id: Any) -> bool:
+        """
+        Check if the index already knows the printer
+        with exactly this status and workplace.
+        """
+        return (
+            self.printer_status.get(printer_id) == status
+            and self.printer_workplace.get(printer_id) == workplace_id
+        )
+
+    def knows_printer(self, printer_id: int) -> bool:
+        return printer_id in self.printer_status
+
+    def materials_for_workplace(self, workplace_id: int) -> set[int]:
+        """Materials supported by active printers of the workplace."""
+        return set(self.workplace_materials.get(workplace_id, ()))
+
+    def workplaces_for_materials(self, material_ids: Iterable[int]) -> set[int]:
+        """Workplaces with an active printer supporting any of the materials."""
+        workplaces = set()
+        for material_id in material_ids:
+            workplaces |= self.material_workplaces.get(material_id, set())
+        return workplaces
+
+    def printers_for_material(
+        self,
+        material_id: int,
+        workplace_id: Optional[int] = None,
+    ) -> set[int]:
+        """Active printers supporting the material, optionally in one workplace."""
+        printers = self.material_printers.get(material_id, set())
+        if workplace_id is None:
+            return set(printers)
+        return {
+            printer_id
+            for printer_id in printers
+            if self.printer_workplace[printer_id] == workplace_id
+        }
+
+
+_version = SharedVersion("capability_index")
+_index: Optional[CapabilityIndex] = None
+_index_version: Optional[str] = None
+_lock = Lock()
+
+
+def get_capability_index() -> CapabilityIndex:
+    """
+    Return the current index, rebuild it if it was invalidated
+    in this or in any other worker process.
+    """
+    global _index, _index_version
+    version = _version.get()
+    if _index is None or _index_version != version:
+        with _lock:
+            if _index is None or _index_version != version:
+                cache_requests.inc(cache="capability_index", result="miss")
+                _index = CapabilityIndex.build()
+                _index_version = version
+                return _index
+    cache_requests.inc(cache="capability_index", result="hit")
+    return _index
+
+
+def peek_capability_index() -> Optional[CapabilityIndex]:
+    """Return the index without building it, if it is up to date."""
+    if _index is not None and _index_version == _version.get():
+        return _index
+    return None
+
+
+def invalidate_capability_index() -> None:
+    global _index
+    with _lock:
+        _index = None
+    _version.invalidate()
+
+
+def ids_of(objects: Iterable[Any]) -> list:
+    """Return ids of model instances, ids are passed as is."""
+    return [getattr(obj, "pk", obj) for obj in objects]
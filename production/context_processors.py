@@ -1,6 +1,19 @@
 from django.conf import settings
 
+from production.identity_map import get_identity_map
+
 
 def cfg_assets_root(request):
 
     return {"ASSETS_ROOT": settings.ASSETS_ROOT}
+
+
+def user_workplace(request):
+    """
+    Resolve `user.workplace` through the request identity map,
+    so the sidebar reuses the workplace already loaded by the view.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated and user.workplace_id:
+        get_identity_map(request).resolve(user, "workplace")
+    return {}
@@ -0,0 +1,159 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db.models import QuerySet
+from django.forms.models import ModelChoiceIterator
+
+from production.reference_data import get_reference_data
+
+
+def is_evaluated(queryset: QuerySet) -> bool:
+    return queryset._result_cache is not None
+
+
+def queryset_from_objects(queryset: QuerySet, objects: list, key: str) -> QuerySet:
+    """
+    Build a QuerySet limited to the given objects
+    and prefill its result cache, so iterating over it
+    does not hit the database again.
+    """
+    pks = [getattr(obj, key) for obj in objects]
+    selected = queryset.filter(**{f"{key}__in": pks})
+    selected._result_cache = objects
+    selected._prefetch_done = True
+    return selected
+
+
+class EvaluatedModelChoiceIterator(ModelChoiceIterator):
+    """
+    EvaluatedModelChoiceIterator:
+    - Renders choices from the field queryset cache
+      if the queryset was already evaluated (e.g. while cleaning).
+    - Falls back to the default `iterator()` query otherwise.
+    """
+
+    def __iter__(self):
+        if not is_evaluated(self.queryset):
+            yield from super().__iter__()
+            return
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.queryset:
+            yield self.choice(obj)
+
+    def __len__(self):
+        if not is_evaluated(self.queryset):
+            return super().__len__()
+        return len(self.queryset) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        if not is_evaluated(self.queryset):
+            return super().__bool__()
+        return self.field.empty_label is not None or bool(self.queryset)
+
+
+class EvaluatedModelChoiceField(forms.ModelChoiceField):
+    """
+    EvaluatedModelChoiceField:
+    - Evaluates the field queryset once per form.
+    - The cleaned object is picked from the evaluated choices
+      instead of a separate `queryset.get()` query.
+    """
+
+    iterator = EvaluatedModelChoiceIterator
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        self.validate_no_null_characters(value)
+        key = self.to_field_name or "pk"
+        if isinstance(value, self.queryset.model):
+            value = getattr(value, key)
+        for obj in self.queryset:
+            if str(getattr(obj, key)) == str(value):
+                return obj
+        raise ValidationError(
+            self.error_messages["invalid_choice"],
+            code="invalid_choice",
+            params={"value": value},
+        )
+
+
+class EvaluatedModelMultipleChoiceField(forms.ModelMultipleChoiceField):
+    """
+    EvaluatedModelMultipleChoiceField:
+    - Evaluates the field queryset once per form.
+    - Selected objects are picked from the evaluated choices,
+      so cleaning does not run an extra `pk__in` query.
+    - Rendered choices and cleaned data share the same objects.
+    """
+
+    iterator = EvaluatedModelChoiceIterator
+
+    def _check_values(self, value):
+        key = self.to_field_name or "pk"
+        try:
+            value = frozenset(value)
+        except TypeError:
+            raise ValidationError(
+                self.error_messages["invalid_list"],
+                code="invalid_list",
+            )
+        for pk in value:
+            self.validate_no_null_characters(pk)
+            try:
+                self.queryset.filter(**{key: pk})
+            except (ValueError, TypeError):
+                raise ValidationError(
+                    self.error_messages["invalid_pk_value"],
+                    code="invalid_pk_value",
+                    params={"pk": pk},
+                )
+        selected_pks = {str(pk) for pk in value}
+        selected = [
+            obj for obj in self.queryset if str(getattr(obj, key)) in selected_pks
+        ]
+        found_pks = {str(getattr(obj, key)) for obj in selected}
+        for val in value:
+            if str(val) not in found_pks:
+                raise ValidationError(
+                    self.error_messages["invalid_choice"],
+                    code="invalid_choice",
+                    params={"value": val},
+                )
+        return queryset_from_objects(self.queryset, selected, key)
+
+
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    """
+    ReferenceChoiceIterator:
+    - Renders (pk, label) choices from the reference data cache,
+      so a choice list of a small table does not hit the database.
+    """
+
+    def reference_choices(self) -> list[tuple[int, str]]:
+        return get_reference_data(self.queryset.model).choices()
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from self.reference_choices()
+
+    def __len__(self):
+        return len(self.reference_choices()) + (
+            1 if self.field.empty_label is not None else 0
+        )
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.reference_choices())
+
+
+class ReferenceModelChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField rendering its choices from the reference data cache."""
+
+    iterator = ReferenceChoiceIterator
+
+
+class ReferenceModelMultipleChoiceField(forms.ModelMultipleChoiceField):
+    """ModelMultipleChoiceField rendering its choices from the reference data cache."""
+
+    iterator = ReferenceChoiceIterator
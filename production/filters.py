@@ -4,15 +4,14 @@ from django import forms
 from production.mixins import FilterFieldMixin
 from production.models import (
     Order,
-    Material,
     PrintQueue,
-    Workplace
 )
+from production.reference_data import reference_choices
 
 
 class OrderFilter(django_filters.FilterSet, FilterFieldMixin):
-    material = django_filters.ModelChoiceFilter(
-        queryset=Material.objects.all(),
+    material = django_filters.ChoiceFilter(
+        choices=reference_choices("production.Material"),
         label="Material:",
     )
     status = django_filters.ChoiceFilter(
@@ -53,13 +52,13 @@ class PrintQueueFilter(django_filters.FilterSet, FilterFieldMixin):
     status = django_filters.ChoiceFilter(
         choices=PrintQueue.STATUS_CHOICES,
     )
-    workplace = django_filters.ModelChoiceFilter(
-        queryset=Workplace.objects.all(),
+    workplace = django_filters.ChoiceFilter(
+        choices=reference_choices("production.Workplace"),
         label="Workplace:",
     )
 
-    material = django_filters.ModelChoiceFilter(
-        queryset=Material.objects.all(),
+    material = django_filters.ChoiceFilter(
+        choices=reference_choices("production.Material"),
         label="Material:",
     )
 
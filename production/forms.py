@@ -1,11 +1,18 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 
+from production.fields import (
+    EvaluatedModelChoiceField,
+    EvaluatedModelMultipleChoiceField,
+    ReferenceModelChoiceField,
+    ReferenceModelMultipleChoiceField,
+)
 from production.mixins import FormFieldMixin, FormSaveForeignMixin
+from production.scheduling import schedule_queues
 from production.services import (
     filter_orders_by_materials,
     filter_workplaces_by_active_printers_materials,
-    filter_materials_by_printers,
+    filter_materials_by_workplace_active_printers,
     filter_orders_by_ready_or_problem_relative,
 )
 
@@ -25,6 +32,7 @@ class WorkerCreateForm(UserCreationForm):
             "phone_number",
             "workplace",
         )
+        field_classes = {"workplace": ReferenceModelChoiceField}
 
 
 class WorkerPhoneNumberForm(forms.ModelForm):
@@ -68,7 +76,7 @@ class MaterialForm(forms.ModelForm):
 
 
 class PrinterForm(FormFieldMixin, forms.ModelForm):
-    materials = forms.ModelMultipleChoiceField(
+    materials = ReferenceModelMultipleChoiceField(
         queryset=Material.objects.all(),
         widget=forms.CheckboxSelectMultiple(),
     )
@@ -76,10 +84,11 @@ class PrinterForm(FormFieldMixin, forms.ModelForm):
     class Meta:
         model = Printer
         fields = "__all__"
+        field_classes = {"workplace": ReferenceModelChoiceField}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        for field_name in ["name", "model"]:
+        for field_name in ["name", "model", "speed"]:
             self.set_form_widget_css(
                 field_name=field_name, css_class="form-control textinput"
             )
@@ -103,7 +112,7 @@ class PrintQueueCreateForm(FormFieldMixin, FormSaveForeignMixin):
     - The selected orders must match the selected material.
     """
 
-    orders = forms.ModelMultipleChoiceField(
+    orders = EvaluatedModelMultipleChoiceField(
         queryset=(
             Order.objects.select_related("material").filter(
                 print_queue=None, status=Order.READY_TO_PRINT
@@ -121,9 +130,14 @@ class PrintQueueCreateForm(FormFieldMixin, FormSaveForeignMixin):
     class Meta:
         model = PrintQueue
         fields = ["workplace", "material"]
+        field_classes = {
+            "workplace": EvaluatedModelChoiceField,
+            "material": EvaluatedModelChoiceField,
+        }
 
     def __init__(self, *args, **kwargs):
         self.cached_workplace = kwargs.pop("cached_workplace", None)
+        self.identity_map = kwargs.pop("identity_map", None)
         super().__init__(*args, **kwargs)
         for field_name in ["material", "workplace"]:
             self.set_form_widget_css(
@@ -137,10 +151,9 @@ class PrintQueueCreateForm(FormFieldMixin, FormSaveForeignMixin):
         materials_field = self.fields["material"]
         orders_field = self.fields["orders"]
 
-        printers = self.cached_workplace.printers.filter(status=Printer.ACTIVE)
-
-        materials_field.queryset = filter_materials_by_printers(
-            materials=materials_field.queryset, printers=printers
+        materials_field.queryset = filter_materials_by_workplace_active_printers(
+            materials=materials_field.queryset.select_related("stock"),
+            workplace=self.cached_workplace,
         )
 
         orders_field.queryset = filter_orders_by_materials(
@@ -183,9 +196,10 @@ class PrintQueueUpdateForm(FormFieldMixin, FormSaveForeignMixin):
     - Orders can be modified.
     - Workplace selection is allowed.
     - Problematic orders within the queue can be adjusted.
+    - Changing the workplace schedules the queue on a printer there.
     """
 
-    orders = forms.ModelMultipleChoiceField(
+    orders = EvaluatedModelMultipleChoiceField(
         queryset=(Order.objects.prefetch_related("material").all()),
         widget=forms.CheckboxSelectMultiple(),
     )
@@ -194,16 +208,24 @@ class PrintQueueUpdateForm(FormFieldMixin, FormSaveForeignMixin):
     class Meta:
         model = PrintQueue
         fields = ["material", "workplace"]
+        field_classes = {
+            "material": EvaluatedModelChoiceField,
+            "workplace": EvaluatedModelChoiceField,
+        }
 
     def __init__(self, *args, **kwargs):
         self.cached_instance = kwargs.pop("cached_instance", None)
+        self.identity_map = kwargs.pop("identity_map", None)
         super().__init__(*args, **kwargs)
         self.initialize()
 
     def set_defaults_from_cache(self):
         if not self.instance.pk:
-            self.initial.setdefault("workplace", self.cached_instance.workplace)
-            self.initial.setdefault("material", self.cached_instance.material)
+            for field_name in ["workplace", "material"]:
+                self.initial.setdefault(
+                    field_name,
+                    self.resolve_related(self.cached_instance, field_name),
+                )
             self.instance = self.cached_instance
 
     def initialize(self):
@@ -214,29 +236,47 @@ class PrintQueueUpdateForm(FormFieldMixin, FormSaveForeignMixin):
                 field_name=field_name, css_class="select form-control"
             )
         self.set_defaults_from_cache()
+        self.setup_material_queryset()
         self.setup_orders_queryset()
         self.setup_workplace_queryset()
 
+    def setup_material_queryset(self):
+        """
+        Load the material with its stock for the summary,
+        the identity map serves it to the other lookups.
+        """
+        material = self.get_field("material")
+        material.queryset = material.queryset.select_related("stock")
+        material_id = self.instance.material_id
+        if material_id and (Material, material_id) not in self.get_identity_map():
+            self.get_identity_map().add(
+                material.queryset.filter(pk=material_id).first()
+            )
+
     def setup_orders_queryset(self):
         orders = self.get_field("orders")
         self.filter_field_queryset_by_instance("orders")
         orders.queryset = filter_orders_by_materials(
-            orders=orders.queryset, materials=[self.instance.material]
+            orders=orders.queryset,
+            materials=[self.resolve_related(self.instance, "material")],
         )
         orders.queryset = filter_orders_by_ready_or_problem_relative(
             orders=orders.queryset, print_queue=self.instance
         )
-        self.set_initial_default_for_related_field("orders")
+        if self.instance.pk:
+            self.initial.setdefault(
+                "orders", self.instance.orders.select_related("material")
+            )
 
     def setup_workplace_queryset(self):
         workplace = self.get_field("workplace")
         workplace.queryset = filter_workplaces_by_active_printers_materials(
-            workplaces=workplace.queryset, materials=[self.instance.material]
+            workplaces=workplace.queryset,
+            materials=[self.resolve_related(self.instance, "material")],
         )
 
     def track_problem_orders(self, orders):
-        problem_orders = orders.filter(status=Order.PROBLEM)
-        if not problem_orders:
+        if not any(order.status == Order.PROBLEM for order in orders):
             self.instance.status = Order.READY_TO_PRINT
 
     def clean_orders(self):
@@ -244,6 +284,19 @@ class PrintQueueUpdateForm(FormFieldMixin, FormSaveForeignMixin):
         self.track_problem_orders(orders)
         return orders
 
+    def save(self, commit=True):
+        """
+        A queue moved to another workplace leaves the printer
+        of the old workplace and is scheduled in the new one.
+        """
+        moved = "workplace" in self.changed_data
+        if moved:
+            self.instance.printer = None
+        instance = super().save(commit=commit)
+        if commit and moved:
+            schedule_queues([instance.pk])
+        return instance
+
 
 class NameFieldSearchForm(
     forms.Form,
@@ -0,0 +1,169 @@
+from collections import defaultdict
+from typing import Any, Iterable, Optional, Type
+
+from django.db import models
+from django.http import Http404, HttpRequest
+
+
+class IdentityMap:
+    """
+    IdentityMap:
+    - Request scoped registry of model instances keyed by (model, pk).
+    - Repeated lookups of the same object are served without a query.
+    - Pending lookups of one model are loaded with a single `IN` query.
+    - Tracks how many queries were saved, so it can be reported per request.
+    """
+
+    def __init__(self) -> None:
+        self._objects: dict[Type[models.Model], dict[Any, models.Model]] = (
+            defaultdict(dict)
+        )
+        self._pending: dict[Type[models.Model], set] = defaultdict(set)
+        self.hits = 0
+        self.queries = 0
+        self.loaded = 0
+
+    @staticmethod
+    def _model(model: Type[models.Model] | models.Model) -> Type[models.Model]:
+        return model._meta.concrete_model
+
+    def _key(self, model: Type[models.Model], pk: Any) -> Any:
+        return self._model(model)._meta.pk.to_python(pk)
+
+    @property
+    def saved_queries(self) -> int:
+        """
+        Lookups served from the map plus objects
+        that were loaded together in a batch.
+        """
+        return self.hits + self.loaded - self.queries
+
+    def __contains__(self, item: tuple[Type[models.Model], Any]) -> bool:
+        model, pk = item
+        return self._key(model, pk) in self._objects[self._model(model)]
+
+    def add(self, obj: models.Model) -> models.Model:
+        """Register an already loaded object, keep the first one registered."""
+        if obj is None or obj.pk is None:
+            return obj
+        objects = self._objects[self._model(obj)]
+        return objects.setdefault(self._key(obj, obj.pk), obj)
+
+    def add_many(self, objects: Iterable[models.Model]) -> None:
+        for obj in objects:
+            self.add(obj)
+
+    def defer(self, model: Type[models.Model], pk: Any) -> None:
+        """Queue a lookup to be loaded with the next batch of this model."""
+        if pk is not None and (model, pk) not in self:
+            self._pending[self._model(model)].add(self._key(model, pk))
+
+    def load(self, model: Type[models.Model]) -> None:
+        """Load all pending lookups of the model with one `IN` query."""
+        model = self._model(model)
+        pks = self._pending.pop(model, set())
+        if pks:
+            objects = list(model._default_manager.filter(pk__in=pks))
+            self.queries += 1
+            self.loaded += len(objects)
+            self.add_many(objects)
+
+    def get(self, model: Type[models.Model], pk: Any) -> Optional[models.Model]:
+        if pk is None:
+            return None
+        objects = self._objects[self._model(model)]
+        key = self._key(model, pk)
+        if key in objects:
+            self.hits += 1
+            return objects[key]
+        self.defer(model, pk)
+        self.load(model)
+        return objects.get(key)
+
+    def get_or_404(self, model: Type[models.Model], pk: Any) -> models.Model:
+        obj = self.get(model, pk)
+        if obj is None:
+            raise Http404(f"No {model._meta.object_name} matches the given query.")
+        return obj
+
+    def get_many(self, model: Type[models.Model], pks: Iterable[Any]) -> list:
+        pks = [pk for pk in pks if pk is not None]
+        for pk in pks:
+            if (model, pk) in self:
+                self.hits += 1
+            else:
+                self.defer(model, pk)
+        self.load(model)
+        objects = self._objects[self._model(model)]
+        return [
+            objects[self._key(model, pk)]
+            for pk in pks
+            if self._key(model, pk) in objects
+        ]
+
+    def resolve(self, instance: models.Model, field_name: str) -> Optional[Any]:
+        """
+        Return the ForeignKey object of the instance through the map
+        and cache it on the instance, like regular attribute access does.
+        """
+        return self.resolve_many([instance], field_name)[0]
+
+    def resolve_many(
+        self,
+        instances: Iterable[models.Model],
+        field_name: str,
+    ) -> list:
+        """
+        Resolve the ForeignKey of several instances,
+        all missing objects are loaded with a single query.
+        """
+        instances = list(instances)
+        if not instances:
+            return []
+        field = instances[0]._meta.get_field(field_name)
+        related_model = self._model(field.related_model)
+        objects = self._objects[related_model]
+        pending = self._pending[related_model]
+        for instance in instances:
+            if field.is_cached(instance):
+                self.add(getattr(instance, field_name))
+                continue
+            pk = getattr(instance, field.attname)
+            if pk is None:
+                continue
+            key = self._key(related_model, pk)
+            if key in objects or key in pending:
+                self.hits += 1
+            else:
+                pending.add(key)
+        self.load(related_model)
+
+        resolved = []
+        for instance in instances:
+            if not field.is_cached(instance):
+                pk = getattr(instance, field.attname)
+                if pk is not None:
+                    obj = objects.get(self._key(related_model, pk))
+                    setattr(instance, field_name, obj)
+            resolved.append(getattr(instance, field_name))
+        return resolved
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "queries": self.queries,
+            "loaded": self.loaded,
+            "saved_queries": self.saved_queries,
+        }
+
+
+def get_identity_map(request: Optional[HttpRequest]) -> IdentityMap:
+    """
+    Return identity map of the request,
+    attach a new one if the request does not have it yet.
+    """
+    if request is None:
+        return IdentityMap()
+    if not hasattr(request, "identity_map"):
+        request.identity_map = IdentityMap()
+    return request.identity_map
@@ -0,0 +1,218 @@
+import datetime
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from production.models import (
+    Material,
+    MaterialLedgerEntry,
+    MaterialRoll,
+    MaterialStock,
+    Order,
+    PrintQueue,
+    StatusEvent,
+)
+from production.reference_data import get_reference_data
+
+
+def change_stock(material_id: int, area: float, rolls: int = 0) -> None:
+    """Add to the running totals of the material with one UPDATE."""
+    MaterialStock.objects.get_or_create(material_id=material_id)
+    MaterialStock.objects.filter(material_id=material_id).update(
+        remaining_area=F("remaining_area") + area,
+        rolls=F("rolls") + rolls,
+        updated_at=timezone.now(),
+    )
+
+
+def receive_roll(
+    material: Material, area: Optional[float] = None, by=None
+) -> MaterialRoll:
+    """Put a roll in stock, of `Material.winding` m² by default."""
+    area = float(material.winding if area is None else area)
+    with transaction.atomic():
+        roll = MaterialRoll.objects.create(
+            material=material, area=area, remaining_area=area
+        )
+        MaterialLedgerEntry.objects.create(
+            material=material,
+            roll=roll,
+            kind=MaterialLedgerEntry.RECEIPT,
+            area=area,
+            by=by,
+        )
+        change_stock(material.pk, area, rolls=1)
+    return roll
+
+
+def consume(
+    material_id: int, area: float, print_queue_id: Optional[int] = None, by=None
+) -> list[MaterialLedgerEntry]:
+    """
+    Take the area from the oldest rolls with material left.
+    Usually one or two rolls are touched, whatever the stock size.
+    Area beyond the stock is posted without a roll,
+    the stock goes negative until the missing rolls are received.
+    """
+    entries = []
+    left = area
+    emptied = 0
+    with transaction.atomic():
+        rolls = (
+            MaterialRoll.objects.select_for_update()
+            .filter(material_id=material_id, remaining_area__gt=0)
+            .order_by("received_at", "id")
+        )
+        for roll in rolls.iterator(chunk_size=10):
+            if left <= 0:
+                break
+            taken = min(left, roll.remaining_area)
+            roll.remaining_area = round(roll.remaining_area - taken, 4)
+            roll.save(update_fields=["remaining_area"])
+            emptied += roll.is_empty
+            entries.append((roll, taken))
+            left -= taken
+        if left > 0:
+            entries.append((None, left))
+        entries = MaterialLedgerEntry.objects.bulk_create(
+            MaterialLedgerEntry(
+                material_id=material_id,
+                roll=roll,
+                kind=MaterialLedgerEntry.CONSUMPTION,
+                area=-taken,
+                print_queue_id=print_queue_id,
+                by=by,
+            )
+            for roll, taken in entries
+        )
+        change_stock(material_id, -area, rolls=-emptied)
+    return entries
+
+
+def adjust_roll(roll: MaterialRoll, remaining_area: float, by=None) -> None:
+    """Correct the remaining area of a roll, e.g. after measuring it."""
+    with transaction.atomic():
+        roll = MaterialRoll.objects.select_for_update().get(pk=roll.pk)
+        delta = remaining_area - roll.remaining_area
+        if not delta:
+            return
+        rolls = int(remaining_area > 0) - int(roll.remaining_area > 0)
+        roll.remaining_area = remaining_area
+        roll.save(update_fields=["remaining_area"])
+        MaterialLedgerEntry.objects.create(
+            material_id=roll.material_id,
+            roll=roll,
+            kind=MaterialLedgerEntry.ADJUSTMENT,
+            area=delta,
+            by=by,
+        )
+        change_stock(roll.material_id, delta, rolls=rolls)
+
+
+def queue_area(print_queue_id: int) -> float:
+    area = Order.objects.filter(print_queue_id=print_queue_id).aggregate(
+        area=Sum(F("width") * F("height"))
+    )["area"]
+    return (area or 0) / 10000
+
+
+def post_queue_consumption(transitions: Iterable[tuple]) -> None:
+    """
+    Print queues moved to done consume the area of their orders.
+    A queue is posted once, even if it is done again later.
+    Materials without stock are not tracked.
+    """
+    for event, creation_time, material_id in transitions:
+        if event.kind != StatusEvent.PRINT_QUEUE or event.to_status != PrintQueue.DONE:
+            continue
+        if not MaterialStock.objects.filter(material_id=material_id).exists():
+            continue
+        if MaterialLedgerEntry.objects.filter(
+            print_queue_id=event.print_queue_id,
+            kind=MaterialLedgerEntry.CONSUMPTION,
+        ).exists():
+            continue
+        area = queue_area(event.print_queue_id)
+        if area:
+            consume(material_id, area, print_queue_id=event.print_queue_id, by=event.by)
+
+
+def backlog_areas() -> dict[int, float]:
+    """Area (m²) of ready to print orders by material, one index-only query."""
+    rows = (
+        Order.objects.filter(status=Order.READY_TO_PRINT)
+        .values("material_id")
+        .annotate(area=Sum(F("width") * F("height")))
+        .order_by()
+    )
+    return {row["material_id"]: (row["area"] or 0) / 10000 for row in rows}
+
+
+def daily_consumption(days: int) -> dict[int, float]:
+    """Average consumed area (m²) per day of the last days by material."""
+    since = timezone.now() - datetime.timedelta(days=days)
+    rows = (
+        MaterialLedgerEntry.objects.filter(
+            kind=MaterialLedgerEntry.CONSUMPTION, at__gte=since
+        )
+        .values("material_id")
+        .annotate(area=Sum("area"))
+        .order_by()
+    )
+    return {row["material_id"]: -row["area"] / days for row in rows}
+
+
+def material_forecast(days: Optional[int] = None) -> list[dict]:
+    """
+    Stock against the ready backlog and the date each tracked material
+    runs out at the consumption rate of the last days,
+    with three aggregate queries for all materials.
+    The area of the ready backlog is already committed,
+    the run-out date counts only the stock left after it.
+    """
+    days = days or settings.INVENTORY_FORECAST_DAYS
+    stocks = {stock.material_id: stock for stock in MaterialStock.objects.all()}
+    backlog = backlog_areas()
+    rates = daily_consumption(days)
+    today = timezone.localdate()
+    forecast = []
+    for material_id, name in get_reference_data(Material).labels().items():
+        stock = stocks.get(material_id)
+        remaining = round(stock.remaining_area, 2) if stock else None
+        rate = round(rates.get(material_id, 0), 2)
+        backlog_area = round(backlog.get(material_id, 0), 2)
+        available = (
+            round(stock.remaining_area - backlog_area, 2) if stock else None
+        )
+        days_left = None
+        if stock and available <= 0:
+            days_left = 0
+        elif stock and rate:
+            days_left = int(available / rate)
+        forecast.append(
+            {
+                "material_id": material_id,
+                "material": name,
+                "tracked": stock is not None,
+                "rolls": stock.rolls if stock else None,
+                "remaining_area": remaining,
+                "backlog_area": backlog_area,
+                "available_area": available,
+                "shortage": (
+                    round(max(backlog_area - stock.remaining_area, 0), 2)
+                    if stock
+                    else None
+                ),
+                "daily_consumption": rate,
+                "days_left": days_left,
+                "runs_out_on": (
+                    (today + datetime.timedelta(days=days_left)).isoformat()
+                    if days_left is not None
+                    else None
+                ),
+            }
+        )
+    return forecast
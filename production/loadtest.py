@@ -0,0 +1,312 @@
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from django.db import connections
+from django.http import HttpResponse
+from django.test import Client
+from django.urls import reverse
+
+from production.capabilities import get_capability_index
+from production.models import Material, Order, Worker, Workplace
+from production.reference_data import get_reference_data
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class LoadRecorder:
+    """
+    LoadRecorder:
+    - Thread safe collection of request latencies per URL name.
+    - Summarizes them as p50/p95/p99 in milliseconds and requests/sec.
+    """
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, url_name: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            self.latencies[url_name].append(seconds)
+            if failed:
+                self.errors[url_name] += 1
+
+    def summary(self, elapsed: float) -> dict[str, dict[str, float]]:
+        summary = {}
+        for url_name, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            stats = {
+                "requests": len(latencies),
+                "errors": self.errors[url_name],
+                "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            }
+            for percent in PERCENTILES:
+                stats[f"p{percent}"] = round(percentile(latencies, percent) * 1000, 2)
+            summary[url_name] = stats
+        return summary
+
+
+class LoadSession:
+    """
+    LoadSession:
+    - A logged in operator sending requests through the WSGI handler
+      with the test client, every request is timed and recorded.
+    - Server errors are recorded as failed requests instead of raised.
+    """
+
+    def __init__(
+        self,
+        user: Worker,
+        recorder: LoadRecorder,
+        rng: random.Random,
+        host: str,
+    ) -> None:
+        # The address is outside INTERNAL_IPS, so the debug toolbar is not rendered.
+        self.client = Client(
+            raise_request_exception=False,
+            HTTP_HOST=host,
+            REMOTE_ADDR="192.0.2.1",
+        )
+        self.client.force_login(user)
+        self.user = user
+        self.recorder = recorder
+        self.rng = rng
+
+    def request(self, method: str, path: str, data: Optional[dict] = None):
+        started = time.perf_counter()
+        response = getattr(self.client, method)(path, data)
+        elapsed = time.perf_counter() - started
+        self.recorder.record(
+            url_name=response.resolver_match.view_name,
+            seconds=elapsed,
+            failed=response.status_code >= 400,
+        )
+        return response
+
+    def get(self, path: str, data: Optional[dict] = None) -> HttpResponse:
+        return self.request("get", path, data)
+
+    def post(self, path: str, data: Optional[dict] = None) -> HttpResponse:
+        return self.request("post", path, data)
+
+
+def open_dashboard(session: LoadSession) -> None:
+    session.get(reverse("production:index"))
+
+
+def list_orders(session: LoadSession) -> None:
+    """Order list with a random combination of filters."""
+    rng = session.rng
+    filters = {}
+    if rng.random() < 0.5:
+        materials = get_reference_data(Material).choices()
+        if materials:
+            filters["material"] = rng.choice(materials)[0]
+    if rng.random() < 0.5:
+        filters["status"] = rng.choice([status for status, _ in Order.STATUS_CHOICES])
+    if rng.random() < 0.3:
+        filters["creation_time"] = rng.choice(["today", "week", "month"])
+    if rng.random() < 0.2:
+        filters["country_post"] = rng.choice(["ukr", "pl"])
+    session.get(reverse("production:order-list"), filters)
+
+
+def create_print_queue(session: LoadSession) -> None:
+    """
+    Open the create form of a workplace, pick a material
+    and approve a queue with a few matching orders.
+    """
+    rng = session.rng
+    index = get_capability_index()
+    workplaces = [
+        workplace_id
+        for workplace_id, _ in get_reference_data(Workplace).choices()
+        if index.materials_for_workplace(workplace_id)
+    ]
+    if not workplaces:
+        return
+    workplace_id = rng.choice(workplaces)
+    material_id = rng.choice(sorted(index.materials_for_workplace(workplace_id)))
+    url = reverse("production:print-queue-create", args=[workplace_id])
+    session.get(url)
+    session.post(url, {"material": material_id})
+    orders = list(
+        Order.objects.filter(
+            print_queue=None,
+            status=Order.READY_TO_PRINT,
+            material_id=material_id,
+        ).values_list("pk", flat=True)[:5]
+    )
+    if orders:
+        session.post(
+            url,
+            {
+                "material": material_id,
+                "orders": orders[: rng.randint(1, 5)],
+                "approve": "",
+            },
+        )
+
+
+def toggle_order_status(session: LoadSession) -> None:
+    """Mark a ready order as a problem and back."""
+    orders = list(
+        Order.objects.filter(status=Order.READY_TO_PRINT).values_list("pk", flat=True)[
+            :50
+        ]
+    )
+    if not orders:
+        return
+    url = reverse("production:change-order-status", args=[session.rng.choice(orders)])
+    session.post(url)
+    session.post(url)
+
+
+WORKFLOWS: dict[str, tuple[Callable[[LoadSession], None], int]] = {
+    "dashboard": (open_dashboard, 3),
+    "order_list": (list_orders, 4),
+    "create_print_queue": (create_print_queue, 1),
+    "toggle_order_status": (toggle_order_status, 2),
+}
+
+
+class LoadTest:
+    """
+    LoadTest:
+    - Replays weighted operator workflows with a number
+      of concurrent sessions (threads) against the WSGI handler.
+    - Runs for a duration in seconds or a number of workflows per session.
+    - Workflows write to the database (queues, order statuses),
+      run it against a generated dataset, not real data.
+    """
+
+    def __init__(
+        self,
+        user: Worker,
+        workflows: Optional[list[str]] = None,
+        concurrency: int = 4,
+        duration: Optional[float] = None,
+        iterations: Optional[int] = None,
+        seed: int = 1,
+        host: str = "localhost",
+    ) -> None:
+        workflows = workflows or list(WORKFLOWS)
+        unknown = set(workflows) - set(WORKFLOWS)
+        if unknown:
+            raise ValueError(f"Unknown workflows: {', '.join(sorted(unknown))}")
+        if duration is None and iterations is None:
+            iterations = 10
+        self.user = user
+        self.workflows = workflows
+        self.concurrency = max(concurrency, 1)
+        self.duration = duration
+        self.iterations = iterations
+        self.seed = seed
+        self.host = host
+        self.recorder = LoadRecorder()
+
+    def run_session(self, number: int, deadline: Optional[float]) -> None:
+        rng = random.Random(self.seed * 1000 + number)
+        session = LoadSession(self.user, self.recorder, rng, self.host)
+        functions = [WORKFLOWS[name][0] for name in self.workflows]
+        weights = [WORKFLOWS[name][1] for name in self.workflows]
+        done = 0
+        while True:
+            if self.iterations is not None and done >= self.iterations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            rng.choices(functions, weights)[0](session)
+            done += 1
+
+    def run_threaded_session(self, number: int, deadline: Optional[float]) -> None:
+        try:
+            self.run_session(number, deadline)
+        finally:
+            connections.close_all()
+
+    def run(self) -> dict[str, dict[str, float]]:
+        started = time.perf_counter()
+        deadline = started + self.duration if self.duration is not None else None
+        if self.concurrency == 1:
+            self.run_session(0, deadline)
+        else:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                sessions = [
+                    executor.submit(self.run_threaded_session, number, deadline)
+                    for number in range(self.concurrency)
+                ]
+                for session in sessions:
+                    session.result()
+        return self.recorder.summary(time.perf_counter() - started)
+
+
+def load_baseline(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_baseline(path: Path, summary: dict) -> None:
+    with open(path, "w") as file:
+        json.dump(summary, file, indent=4, sort_keys=True)
+
+
+def compare_with_baseline(
+    summary: dict,
+    baseline: dict,
+    tolerance: float = 0.2,
+) -> list[str]:
+    """
+    Return regressions of URL names present in both runs:
+    p95 latency grown or requests/sec dropped by more than `tolerance`.
+    """
+    regressions = []
+    for url_name, stats in summary.items():
+        previous = baseline.get(url_name)
+        if not previous:
+            continue
+        if previous["p95"] and stats["p95"] > previous["p95"] * (1 + tolerance):
+            regressions.append(
+                f"{url_name}: p95 {previous['p95']}ms -> {stats['p95']}ms"
+            )
+        if previous["rps"] and stats["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{url_name}: requests/sec {previous['rps']} -> {stats['rps']}"
+            )
+    return regressions
+
+
+def format_summary(summary: dict, baseline: Optional[dict] = None) -> str:
+    header = (
+        f"{'URL name':<36} {'requests':>8} {'errors':>6} {'rps':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'p95 vs base':>11}"
+    )
+    lines = [header, "-" * len(header)]
+    for url_name, stats in summary.items():
+        change = ""
+        previous = (baseline or {}).get(url_name)
+        if previous and previous["p95"]:
+            change = f"{(stats['p95'] / previous['p95'] - 1) * 100:+.0f}%"
+        lines.append(
+            f"{url_name:<36} {stats['requests']:>8} {stats['errors']:>6} "
+            f"{stats['rps']:>8} {stats['p50']:>8} {stats['p95']:>8} "
+            f"{stats['p99']:>8} {change:>11}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,59 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from production.archive import ARCHIVE_BATCH_SIZE, archive_done
+
+
+class Command(BaseCommand):
+    help = (
+        "Move done orders and print queues finished before the cutoff "
+        "to the archive tables, in batches of one transaction each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help="Archive work done more than this many days ago.",
+        )
+        parser.add_argument("--before", help="Cutoff date (YYYY-MM-DD).")
+        parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count what would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        if options["before"]:
+            date = parse_date(options["before"])
+            if date is None:
+                raise CommandError("--before must be a date (YYYY-MM-DD).")
+            before = timezone.make_aware(
+                datetime.datetime.combine(date, datetime.time.min)
+            )
+        else:
+            if options["days"] < 1:
+                raise CommandError("--days must be at least 1.")
+            before = timezone.now() - datetime.timedelta(days=options["days"])
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        archived = archive_done(
+            before,
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+            log=self.stdout.write if options["verbosity"] > 1 else None,
+        )
+        verb = "Would archive" if options["dry_run"] else "Archived"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {archived['print_queues']} print queues and "
+                f"{archived['orders']} orders done before {before:%Y-%m-%d %H:%M}."
+            )
+        )
@@ -0,0 +1,92 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from production.benchmarks import (
+    BENCHMARKS,
+    compare_results,
+    format_results,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run micro-benchmarks of calculations and services at several input "
+        "sizes, store the results as JSON and compare them with a previous run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "benchmarks",
+            nargs="*",
+            help=f"Benchmarks to run, all by default: {', '.join(BENCHMARKS)}.",
+        )
+        parser.add_argument(
+            "--sizes", help="Comma separated input sizes, 10,100,1000 by default."
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--min-time",
+            type=float,
+            default=0.2,
+            help="Minimal duration of one timed run in seconds.",
+        )
+        parser.add_argument("--output", type=Path, help="Store the results here.")
+        parser.add_argument(
+            "--compare", type=Path, help="Results of a previous run (JSON)."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed growth of the median time against the previous run.",
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options["benchmarks"]) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}.")
+        try:
+            sizes = (
+                [int(size) for size in options["sizes"].split(",")]
+                if options["sizes"]
+                else None
+            )
+        except ValueError:
+            raise CommandError("--sizes must be comma separated integers.")
+
+        if settings.DEBUG:
+            self.stderr.write(
+                "DEBUG is on, every query is logged and database benchmarks "
+                "are slower than in production."
+            )
+        previous = load_results(options["compare"]) if options["compare"] else None
+        if options["compare"] and previous is None:
+            self.stderr.write(
+                f"{options['compare']} does not exist, nothing to compare."
+            )
+        results = run_benchmarks(
+            names=options["benchmarks"],
+            sizes=sizes,
+            repeat=options["repeat"],
+            min_time=options["min_time"],
+            log=self.stdout.write if options["verbosity"] > 1 else None,
+        )
+        self.stdout.write(format_results(results, previous))
+
+        if options["output"]:
+            save_results(options["output"], results)
+            self.stdout.write(f"Results saved to {options['output']}.")
+        if previous:
+            regressions = compare_results(results, previous, options["tolerance"])
+            if regressions:
+                raise CommandError(
+                    "Regressions against the previous run:\n" + "\n".join(regressions)
+                )
+            self.stdout.write(
+                self.style.SUCCESS("No regressions against the previous run.")
+            )
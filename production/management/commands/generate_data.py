@@ -0,0 +1,77 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from production.synthetic import SyntheticDataGenerator, clear_production_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate seeded production-like data: workplaces, materials, printers, "
+        "workers, print queues and orders with a history of the given length."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--orders", type=int, default=10_000)
+        parser.add_argument("--queues", type=int, default=500)
+        parser.add_argument("--workplaces", type=int, default=8)
+        parser.add_argument("--printers-per-workplace", type=int, default=4)
+        parser.add_argument("--materials", type=int, default=10)
+        parser.add_argument("--workers", type=int, default=32)
+        parser.add_argument(
+            "--days", type=int, default=365, help="Length of the history in days."
+        )
+        parser.add_argument(
+            "--until",
+            help="Last day of the history (YYYY-MM-DD), today by default. "
+            "Set it to get the same data on every run.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Write orders with bulk_create on PostgreSQL too.",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete existing production data first, staff users are kept.",
+        )
+
+    def handle(self, *args, **options):
+        until = None
+        if options["until"]:
+            try:
+                until = datetime.datetime.strptime(
+                    options["until"], "%Y-%m-%d"
+                ).replace(tzinfo=datetime.timezone.utc)
+            except ValueError:
+                raise CommandError("--until must be a date in YYYY-MM-DD format.")
+        if options["orders"] < 0 or options["queues"] < 0:
+            raise CommandError("--orders and --queues can not be negative.")
+
+        started = time.perf_counter()
+        if options["clear"]:
+            clear_production_data()
+            self.stdout.write("Existing production data deleted.")
+
+        generator = SyntheticDataGenerator(
+            seed=options["seed"],
+            orders=options["orders"],
+            queues=options["queues"],
+            workplaces=options["workplaces"],
+            printers_per_workplace=options["printers_per_workplace"],
+            materials=options["materials"],
+            workers=options["workers"],
+            days=options["days"],
+            until=until,
+            batch_size=options["batch_size"],
+            use_copy=not options["no_copy"],
+            log=self.stdout.write if options["verbosity"] > 1 else None,
+        )
+        created = generator.generate()
+        elapsed = time.perf_counter() - started
+        summary = ", ".join(f"{count} {name}" for name, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary} in {elapsed:.1f}s."))
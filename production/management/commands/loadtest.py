@@ -0,0 +1,106 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from production.loadtest import (
+    WORKFLOWS,
+    LoadTest,
+    compare_with_baseline,
+    format_summary,
+    load_baseline,
+    save_baseline,
+)
+from production.models import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay operator workflows with concurrent sessions against the WSGI "
+        "handler and report p50/p95/p99 latency and requests/sec per URL name. "
+        "Workflows write to the database, run it on data from `generate_data`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workflows",
+            help=f"Comma separated workflows, all by default: {', '.join(WORKFLOWS)}.",
+        )
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--duration", type=float, help="Run for the given number of seconds."
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            help="Workflows per session, 10 if no duration is given.",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--username",
+            help="Operator to log in as, a worker with a workplace by default.",
+        )
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument("--baseline", type=Path, help="Baseline JSON file.")
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Store the results as the new baseline.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed p95 growth and requests/sec drop against the baseline.",
+        )
+
+    def get_user(self, username):
+        users = Worker.objects.filter(is_active=True)
+        if username:
+            users = users.filter(username=username)
+        else:
+            users = users.filter(workplace__isnull=False)
+        user = users.order_by("pk").first()
+        if user is None:
+            raise CommandError(
+                "No operator to log in as, generate data with `generate_data` first."
+            )
+        return user
+
+    def handle(self, *args, **options):
+        workflows = options["workflows"].split(",") if options["workflows"] else None
+        try:
+            load_test = LoadTest(
+                user=self.get_user(options["username"]),
+                workflows=workflows,
+                concurrency=options["concurrency"],
+                duration=options["duration"],
+                iterations=options["iterations"],
+                seed=options["seed"],
+                host=options["host"],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        if settings.DEBUG:
+            self.stderr.write(
+                "DEBUG is on, every query is logged and results are slower "
+                "than in production."
+            )
+        summary = load_test.run()
+        baseline_path = options["baseline"]
+        baseline = load_baseline(baseline_path) if baseline_path else None
+        self.stdout.write(format_summary(summary, baseline))
+
+        if baseline_path and options["save_baseline"]:
+            save_baseline(baseline_path, summary)
+            self.stdout.write(f"Baseline saved to {baseline_path}.")
+        elif baseline:
+            regressions = compare_with_baseline(summary, baseline, options["tolerance"])
+            if regressions:
+                raise CommandError(
+                    "Regressions against the baseline:\n" + "\n".join(regressions)
+                )
+            self.stdout.write(
+                self.style.SUCCESS("No regressions against the baseline.")
+            )
@@ -0,0 +1,108 @@
+from typing import Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import NoReverseMatch, resolve, reverse
+
+from production.memory import MemoryProfile, format_bytes
+from production.models import Worker
+from production.synthetic import SyntheticDataGenerator, clear_production_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure peak memory of one view with tracemalloc at several dataset "
+        "sizes. Production data is DELETED and regenerated for every size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url_name", help="URL name, e.g. production:order-list.")
+        parser.add_argument(
+            "--sizes",
+            default="1000,5000,20000",
+            help="Comma separated numbers of orders.",
+        )
+        parser.add_argument(
+            "--object",
+            help="Model of the `pk` URL argument (app_label.Model), "
+            "the view model by default. The first object is used.",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--top", type=int, default=5)
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Do not ask before deleting production data.",
+        )
+
+    def get_url(self, url_name: str, object_model: Optional[str]) -> str:
+        try:
+            return reverse(url_name)
+        except NoReverseMatch:
+            pass
+        if object_model:
+            model = apps.get_model(object_model)
+        else:
+            view = resolve(reverse(url_name, kwargs={"pk": 0})).func
+            model = getattr(getattr(view, "view_class", None), "model", None)
+            if model is None:
+                raise CommandError(f"Use --object to choose the pk of {url_name}.")
+        instance = model.objects.order_by("pk").first()
+        if instance is None:
+            raise CommandError(f"There is no {model.__name__} to profile.")
+        return reverse(url_name, kwargs={"pk": instance.pk})
+
+    @staticmethod
+    def get_user() -> Worker:
+        user = Worker.objects.filter(is_active=True, is_superuser=True).first()
+        if user is None:
+            raise CommandError("Create a superuser to profile as (createsuperuser).")
+        return user
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--sizes must be comma separated integers.")
+        if options["interactive"]:
+            answer = input(
+                "Production data will be deleted and regenerated. "
+                "Type 'yes' to continue: "
+            )
+            if answer != "yes":
+                raise CommandError("Memory profiling cancelled.")
+
+        if settings.DEBUG:
+            self.stderr.write(
+                "DEBUG is on, queries kept in connection.queries are counted too."
+            )
+        user = self.get_user()
+        rows = []
+        for size in sizes:
+            clear_production_data()
+            SyntheticDataGenerator(
+                seed=options["seed"], orders=size, queues=max(size // 20, 1)
+            ).generate()
+            url = self.get_url(options["url_name"], options["object"])
+            # The address is outside INTERNAL_IPS, so the debug toolbar is not rendered.
+            client = Client(HTTP_HOST=options["host"], REMOTE_ADDR="192.0.2.1")
+            client.force_login(user)
+            client.get(url)  # warm up imports, templates and caches
+            with MemoryProfile(top=options["top"]).measure() as profile:
+                response = client.get(url)
+            if response.status_code >= 400:
+                raise CommandError(f"{url} returned {response.status_code}.")
+            rows.append((size, profile))
+            self.stdout.write(f"\n{size} orders, {url}: {profile.report()}")
+
+        self.stdout.write("\norders      peak       held")
+        for size, profile in rows:
+            self.stdout.write(
+                f"{size:>6} {format_bytes(profile.peak):>10} "
+                f"{format_bytes(profile.allocated):>10}"
+            )
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from production.models import Workplace
+from production.rebalancing import rebalance_workplace
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge under-filled and split over-wound ready print queues "
+        "of a workplace per material. Prints the plan, writes it with --apply."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("workplace", type=int)
+        parser.add_argument(
+            "--material",
+            type=int,
+            action="append",
+            help="Rebalance queues of the material only, may be repeated.",
+        )
+        parser.add_argument("--apply", action="store_true")
+
+    def handle(self, *args, **options):
+        workplace = Workplace.objects.filter(pk=options["workplace"]).first()
+        if workplace is None:
+            raise CommandError(f"Workplace {options['workplace']} does not exist.")
+        plans = rebalance_workplace(
+            workplace, materials=options["material"], apply=options["apply"]
+        )
+        for plan in plans:
+            summary = plan.as_dict()
+            self.stdout.write(
+                f"{summary['material']}: {summary['moved_orders']} orders moved, "
+                f"{summary['new_queues']} new queues, "
+                f"{len(summary['removed_queues'])} queues removed."
+            )
+            for title, queues in summary["queues"].items():
+                self.stdout.write(f"  {title}:")
+                for queue in queues:
+                    name = f"#{queue['queue']}" if queue["queue"] else "new"
+                    self.stdout.write(
+                        f"    {name:>8} {queue['orders']:>4} orders "
+                        f"{queue['total_tiles']:>5} tiles "
+                        f"{queue['total_area']:>8} m² "
+                        f"{queue['winding_left']:>8} left"
+                    )
+        changed = sum(plan.changed for plan in plans)
+        verb = "Rebalanced" if options["apply"] else "Would rebalance"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {changed} of {len(plans)} materials.")
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from production.analytics import rebuild_analytics
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the analytics buckets from done live and archived orders "
+        "and print queues, e.g. after loading data or the first deploy. "
+        "Later transitions update them incrementally."
+    )
+
+    def handle(self, *args, **options):
+        buckets = rebuild_analytics()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} analytics buckets."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from production.inventory import receive_roll
+from production.models import Material, MaterialStock
+
+
+class Command(BaseCommand):
+    help = "Put rolls of a material in stock and post them to the ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument("material", help="Material name.")
+        parser.add_argument("--count", type=int, default=1)
+        parser.add_argument(
+            "--area",
+            type=float,
+            help="Area of one roll in m², the material winding by default.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            material = Material.objects.get(name=options["material"])
+        except Material.DoesNotExist:
+            raise CommandError(f"Material {options['material']!r} does not exist.")
+        if options["count"] < 1:
+            raise CommandError("--count must be at least 1.")
+        if options["area"] is not None and options["area"] <= 0:
+            raise CommandError("--area must be positive.")
+        for _ in range(options["count"]):
+            receive_roll(material, options["area"])
+        stock = MaterialStock.objects.get(material=material)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{material}: {stock.rolls} rolls, "
+                f"{stock.remaining_area:.2f} m² in stock."
+            )
+        )
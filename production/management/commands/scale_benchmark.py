@@ -0,0 +1,89 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from production.models import Worker
+from production.scale_curve import SIZES, ScaleCurve, format_table, render_html
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every page at growing numbers of orders and report latency, "
+        "query count, peak memory and their growth exponents. "
+        "Production data is DELETED and regenerated for every size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "url_names",
+            nargs="*",
+            help="Pages to measure (e.g. production:order-list), all by default.",
+        )
+        parser.add_argument(
+            "--sizes",
+            default=",".join(str(size) for size in SIZES),
+            help="Comma separated numbers of orders.",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument("--output", type=Path, help="Store the results as JSON.")
+        parser.add_argument(
+            "--html", type=Path, help="Store the charts as an HTML page."
+        )
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Do not ask before deleting production data.",
+        )
+
+    @staticmethod
+    def get_user() -> Worker:
+        user = Worker.objects.filter(is_active=True, is_superuser=True).first()
+        if user is None:
+            raise CommandError(
+                "Create a superuser to render pages as (createsuperuser)."
+            )
+        return user
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--sizes must be comma separated integers.")
+        if options["interactive"]:
+            answer = input(
+                "Production data will be deleted and regenerated. "
+                "Type 'yes' to continue: "
+            )
+            if answer != "yes":
+                raise CommandError("Scale benchmark cancelled.")
+        if settings.DEBUG:
+            self.stderr.write(
+                "DEBUG is on, every query is logged and results are slower "
+                "than in production."
+            )
+
+        curve = ScaleCurve(
+            user=self.get_user(),
+            sizes=sizes,
+            url_names=options["url_names"],
+            repeat=options["repeat"],
+            seed=options["seed"],
+            host=options["host"],
+            log=self.stdout.write if options["verbosity"] > 1 else None,
+        )
+        curve.run()
+        self.stdout.write(format_table(curve))
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(curve.as_dict(), file, indent=4)
+            self.stdout.write(f"Results saved to {options['output']}.")
+        if options["html"]:
+            options["html"].write_text(render_html(curve))
+            self.stdout.write(f"Charts saved to {options['html']}.")
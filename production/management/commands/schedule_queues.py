@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from production.scheduling import plan_queues
+
+
+class Command(BaseCommand):
+    help = (
+        "Assign ready print queues without a printer, oldest first, "
+        "to the least loaded active printer of their workplace supporting "
+        "their material. New and finished queues are planned incrementally."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--replan",
+            action="store_true",
+            help="Plan assigned ready queues again as well.",
+        )
+
+    def handle(self, *args, **options):
+        assignments = plan_queues(replan=options["replan"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Assigned {len(assignments)} print queues "
+                f"to {len(set(assignments.values()))} printers."
+            )
+        )
@@ -0,0 +1,155 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from production.simulation import (
+    ShopFloorSimulation,
+    SimulationConfig,
+    load_arrivals,
+    load_printers,
+    synthetic_arrivals,
+    workplace_names,
+)
+
+
+def printer_move(value: str) -> tuple[int, int]:
+    try:
+        printer_id, workplace_id = value.split(":")
+        return int(printer_id), int(workplace_id)
+    except ValueError:
+        raise CommandError(f"--move-printer expects PRINTER:WORKPLACE, got {value!r}.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate production on the current printers and workplaces with the "
+        "order arrivals of the last weeks (or synthetic ones) and report "
+        "throughput, backlog and utilization. Nothing is written."
+    )
+
+    def add_arguments(self, parser):
+        defaults = SimulationConfig()
+        parser.add_argument("--days", type=float, default=defaults.days)
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument(
+            "--history-days",
+            type=int,
+            default=28,
+            help="Days of order history the arrival rates are taken from.",
+        )
+        parser.add_argument(
+            "--orders-per-hour",
+            type=float,
+            help="Synthetic arrivals spread over the materials instead of history.",
+        )
+        parser.add_argument(
+            "--arrival-scale",
+            type=float,
+            default=defaults.arrival_scale,
+            help="Multiply the arrival rates, e.g. 1.5 for 50%% more orders.",
+        )
+        parser.add_argument("--queue-area", type=float, default=defaults.queue_area)
+        parser.add_argument(
+            "--max-wait-hours", type=float, default=defaults.max_wait_hours
+        )
+        parser.add_argument(
+            "--setup-minutes", type=float, default=defaults.setup_minutes
+        )
+        parser.add_argument("--problem-rate", type=float, default=defaults.problem_rate)
+        parser.add_argument(
+            "--problem-hours", type=float, default=defaults.problem_hours
+        )
+        parser.add_argument(
+            "--mtbf-hours",
+            type=float,
+            default=defaults.mtbf_hours,
+            help="Mean printing hours between failures, 0 disables failures.",
+        )
+        parser.add_argument("--mttr-hours", type=float, default=defaults.mttr_hours)
+        parser.add_argument(
+            "--add-printer",
+            type=int,
+            action="append",
+            default=[],
+            help="Add a copy of the printer, may be repeated.",
+        )
+        parser.add_argument("--remove-printer", type=int, action="append", default=[])
+        parser.add_argument(
+            "--move-printer",
+            type=printer_move,
+            action="append",
+            default=[],
+            help="PRINTER:WORKPLACE, may be repeated.",
+        )
+        parser.add_argument("--json", help="Write the full report to the file.")
+
+    def handle(self, *args, **options):
+        if options["days"] <= 0:
+            raise CommandError("--days must be positive.")
+        config = SimulationConfig(
+            days=options["days"],
+            seed=options["seed"],
+            arrival_scale=options["arrival_scale"],
+            queue_area=options["queue_area"],
+            max_wait_hours=options["max_wait_hours"],
+            setup_minutes=options["setup_minutes"],
+            problem_rate=options["problem_rate"],
+            problem_hours=options["problem_hours"],
+            mtbf_hours=options["mtbf_hours"] or None,
+            mttr_hours=options["mttr_hours"],
+        )
+        printers = load_printers(
+            add=options["add_printer"],
+            remove=options["remove_printer"],
+            move=dict(options["move_printer"]),
+        )
+        if not printers:
+            raise CommandError("There are no printers with a workplace.")
+        if options["orders_per_hour"]:
+            arrivals = synthetic_arrivals(
+                printers, options["orders_per_hour"], options["seed"]
+            )
+        else:
+            arrivals = load_arrivals(options["history_days"])
+        if not arrivals:
+            raise CommandError(
+                "There are no orders in the history, use --orders-per-hour."
+            )
+        report = ShopFloorSimulation(printers, arrivals, config).run()
+        if options["json"]:
+            with open(options["json"], "w") as file:
+                json.dump(report, file, indent=4)
+        self.stdout.write(self.format_report(report))
+
+    def format_report(self, report: dict) -> str:
+        lead_time = report["lead_time_hours"]
+        backlog = report["backlog"]
+        workplaces = workplace_names()
+        lines = [
+            f"Simulated {report['days']} days in {report['seconds']}s "
+            f"({report['events']} events).",
+            f"Orders: {report['orders_arrived']} arrived, "
+            f"{report['orders_done']} done ({report['throughput_per_day']}/day, "
+            f"{report['area_done']} m²), {report['problems']} problem queues, "
+            f"{report['failures']} printer failures.",
+            f"Lead time, h: mean {lead_time['mean']}, p50 {lead_time['p50']}, "
+            f"p95 {lead_time['p95']}.",
+            f"Backlog, orders: mean {backlog['mean_orders']}, "
+            f"max {backlog['max_orders']}, at the end {backlog['end_orders']} "
+            f"({backlog['end_area']} m²).",
+            "",
+            f"{'workplace':<30} {'utilization':>12}",
+        ]
+        for workplace_id, utilization in report["workplaces"].items():
+            name = workplaces.get(workplace_id, workplace_id)
+            lines.append(f"{str(name):<30} {utilization:>12.1%}")
+        lines += [
+            "",
+            f"{'printer':>8} {'utilization':>12} {'down, h':>8} {'queues':>7}",
+        ]
+        for printer in report["printers"]:
+            lines.append(
+                f"{printer['id']:>8} {printer['utilization']:>12.1%} "
+                f"{printer['downtime_hours']:>8} {printer['queues']:>7}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,123 @@
+import linecache
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from django.conf import settings
+
+# tracemalloc traces the whole process, one profile at a time
+# keeps the numbers of a profile from mixing with another one.
+_running = threading.Lock()
+
+
+class MemoryProfile:
+    """
+    MemoryProfile:
+    - tracemalloc measurement of one block of code (e.g. a request):
+      peak traced memory above the start and the lines
+      holding the most new memory at the end.
+    - Starts tracing if it was not started (`python -X tracemalloc`)
+      and stops it afterwards, so tracing costs nothing between profiles.
+    - Memory allocated by other threads in the meantime is counted too.
+    """
+
+    def __init__(self, top: int = 10, frames: int = 1) -> None:
+        self.top = top
+        self.frames = frames
+        self.peak = 0
+        self.allocated = 0
+        self.top_lines: list[dict] = []
+
+    @contextmanager
+    def measure(self) -> Iterator["MemoryProfile"]:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.frames)
+        try:
+            baseline = tracemalloc.take_snapshot()
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            yield self
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(peak - start, 0)
+            self.allocated = max(current - start, 0)
+            self.top_lines = self.compare(tracemalloc.take_snapshot(), baseline)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+    def compare(self, snapshot, baseline) -> list[dict]:
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        statistics = snapshot.filter_traces(filters).compare_to(
+            baseline.filter_traces(filters), "lineno"
+        )
+        lines = []
+        for statistic in statistics[: self.top]:
+            if statistic.size_diff <= 0:
+                break
+            frame = statistic.traceback[0]
+            lines.append(
+                {
+                    "location": f"{short_path(frame.filename)}:{frame.lineno}",
+                    "code": linecache.getline(frame.filename, frame.lineno).strip(),
+                    "size": statistic.size_diff,
+                    "count": statistic.count_diff,
+                }
+            )
+        return lines
+
+    def as_dict(self) -> dict:
+        return {
+            "peak_bytes": self.peak,
+            "allocated_bytes": self.allocated,
+            "top_lines": self.top_lines,
+        }
+
+    def report(self) -> str:
+        lines = [
+            f"peak {format_bytes(self.peak)}, "
+            f"held at the end {format_bytes(self.allocated)}"
+        ]
+        for line in self.top_lines:
+            lines.append(
+                f"  {format_bytes(line['size']):>10} {line['count']:>7} blocks "
+                f"{line['location']}  {line['code']}"
+            )
+        return "\n".join(lines)
+
+
+@contextmanager
+def profile_memory(top: int = 10) -> Iterator[Optional[MemoryProfile]]:
+    """
+    Profile the block, yields None without profiling
+    while another block of the process is profiled.
+    """
+    if not _running.acquire(blocking=False):
+        yield None
+        return
+    try:
+        with MemoryProfile(top=top).measure() as profile:
+            yield profile
+    finally:
+        _running.release()
+
+
+def short_path(filename: str) -> str:
+    """Path relative to the project or to site-packages."""
+    root = os.path.abspath(settings.BASE_DIR)
+    if filename.startswith(root):
+        return os.path.relpath(filename, root)
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return filename
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
@@ -0,0 +1,422 @@
+import fcntl
+import json
+import os
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+MEMORY_BUCKETS = tuple(256 * 1024 * 2**power for power in range(12))
+
+# Values of a running process, the start time tells apart processes
+# that got the same pid.
+PROCESS_FILE = re.compile(r"^metrics-(?P<pid>\d+)-(?P<started>\d+)\.json$")
+# Summed values of the processes that exited.
+EXITED_FILE = "metrics-exited.json"
+LOCK_FILE = "metrics.lock"
+
+
+class MetricsRegistry:
+    """
+    MetricsRegistry:
+    - In-process counters and histograms keyed by name and labels.
+    - With a directory, every process dumps its values to its own file
+      (at most once per flush interval and on every scrape),
+      a scrape sums the files of all processes (e.g. gunicorn workers).
+    - Values of a process are reset after fork,
+      so a preloaded master does not leak its values into the workers.
+    - Files are named by pid and start time, a scrape merges the files
+      of exited processes into one, so totals never go backwards
+      and the directory does not grow with worker restarts.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        flush_interval: float = 5.0,
+    ) -> None:
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self.definitions: dict[str, tuple[str, str, tuple]] = {}
+        self._lock = Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.pid = os.getpid()
+        self.started = time.time_ns()
+        self.counters: dict[tuple, float] = {}
+        self.histograms: dict[tuple, list] = {}
+        self._flushed = 0.0
+
+    def _check_pid(self) -> None:
+        if self.pid != os.getpid():
+            self._reset()
+
+    def counter(self, name: str, documentation: str) -> "Counter":
+        self.definitions[name] = ("counter", documentation, ())
+        return Counter(self, name)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> "Histogram":
+        self.definitions[name] = ("histogram", documentation, tuple(buckets))
+        return Histogram(self, name)
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return (name, *sorted(labels.items()))
+
+    def inc(self, name: str, labels: dict, amount: float = 1) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._check_pid()
+            self.counters[key] = self.counters.get(key, 0) + amount
+        self.maybe_flush()
+
+    def observe(self, name: str, labels: dict, value: float) -> None:
+        buckets = self.definitions[name][2]
+        key = self._key(name, labels)
+        with self._lock:
+            self._check_pid()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(buckets), 0.0, 0]
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+        self.maybe_flush()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._check_pid()
+            return {
+                "counters": [
+                    [list(key), value] for key, value in self.counters.items()
+                ],
+                "histograms": [
+                    [list(key), [list(buckets), total, count]]
+                    for key, (buckets, total, count) in self.histograms.items()
+                ],
+            }
+
+    def path(self) -> Path:
+        return self.directory / f"metrics-{self.pid}-{self.started}.json"
+
+    def flush(self) -> None:
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # The snapshot resets the values after fork, before the path is taken.
+        snapshot = self.snapshot()
+        write_snapshot(self.path(), snapshot)
+        self._flushed = time.monotonic()
+
+    def maybe_flush(self) -> None:
+        if (
+            self.directory is not None
+            and time.monotonic() - self._flushed >= self.flush_interval
+        ):
+            self.flush()
+
+    def exited_paths(self) -> list[Path]:
+        """Files of processes that are gone, or whose pid was reused."""
+        processes = []
+        for path in self.directory.glob("metrics-*.json"):
+            match = PROCESS_FILE.match(path.name)
+            if match:
+                processes.append((path, int(match["pid"]), int(match["started"])))
+        latest: dict[int, int] = {}
+        for _, pid, started in processes:
+            latest[pid] = max(started, latest.get(pid, started))
+        own = (self.pid, self.started)
+        return [
+            path
+            for path, pid, started in processes
+            if (pid, started) != own
+            and (started != latest[pid] or pid == self.pid or not pid_alive(pid))
+        ]
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Serializes merging and reading the files of the directory."""
+        with open(self.directory / LOCK_FILE, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def merge_exited(self) -> None:
+        """
+        Add the values of exited processes to `EXITED_FILE` and remove
+        their files, called under `locked` so they are merged once.
+        """
+        exited = self.exited_paths()
+        if not exited:
+            return
+        merged_path = self.directory / EXITED_FILE
+        snapshots = [
+            snapshot
+            for snapshot in map(read_snapshot, [merged_path, *exited])
+            if snapshot is not None
+        ]
+        write_snapshot(merged_path, as_snapshot(merge_snapshots(snapshots)))
+        for path in exited:
+            path.unlink(missing_ok=True)
+
+    def collect(self) -> dict:
+        """Values of all processes, summed by name and labels."""
+        if self.directory is None:
+            return merge_snapshots([self.snapshot()])
+        self.flush()
+        with self.locked():
+            self.merge_exited()
+            paths = list(self.directory.glob("metrics-*.json"))
+            snapshots = [
+                snapshot
+                for snapshot in map(read_snapshot, paths)
+                if snapshot is not None
+            ]
+        return merge_snapshots(snapshots)
+
+    def render(
+        self, gauges: Optional[list[tuple[str, str, dict, float]]] = None
+    ) -> str:
+        """Prometheus text exposition format of all processes and the gauges."""
+        collected = self.collect()
+        samples: dict[str, list[str]] = {name: [] for name in self.definitions}
+        for (name, *labels), value in sorted(collected["counters"].items()):
+            if name in samples:
+                samples[name].append(f"{name}{format_labels(dict(labels))} {value}")
+        for (name, *labels), (buckets, total, count) in sorted(
+            collected["histograms"].items()
+        ):
+            if name not in samples:
+                continue
+            labels = dict(labels)
+            cumulative = 0
+            for bound, bucket in zip(self.definitions[name][2], buckets):
+                cumulative += bucket
+                bucket_labels = format_labels({**labels, "le": bound})
+                samples[name].append(f"{name}_bucket{bucket_labels} {cumulative}")
+            samples[name].append(
+                f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {count}"
+            )
+            samples[name].append(f"{name}_sum{format_labels(labels)} {total}")
+            samples[name].append(f"{name}_count{format_labels(labels)} {count}")
+
+        lines = []
+        for name, (kind, documentation, _) in self.definitions.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples[name])
+        gauge_samples: dict[str, list[str]] = {}
+        for name, documentation, labels, value in gauges or []:
+            if name not in gauge_samples:
+                gauge_samples[name] = [
+                    f"# HELP {name} {documentation}",
+                    f"# TYPE {name} gauge",
+                ]
+            gauge_samples[name].append(f"{name}{format_labels(labels)} {value}")
+        for name_samples in gauge_samples.values():
+            lines.extend(name_samples)
+        return "\n".join(lines) + "\n"
+
+
+class Counter:
+    def __init__(self, registry: MetricsRegistry, name: str) -> None:
+        self.registry = registry
+        self.name = name
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        self.registry.inc(self.name, labels, amount)
+
+
+class Histogram:
+    def __init__(self, registry: MetricsRegistry, name: str) -> None:
+        self.registry = registry
+        self.name = name
+
+    def observe(self, value: float, **labels) -> None:
+        self.registry.observe(self.name, labels, value)
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_snapshot(path: Path) -> Optional[dict]:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(path: Path, snapshot: dict) -> None:
+    temporary = path.with_suffix(".tmp")
+    with open(temporary, "w") as file:
+        json.dump(snapshot, file)
+    os.replace(temporary, path)
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    counters: dict[tuple, float] = {}
+    histograms: dict[tuple, list] = {}
+    for snapshot in snapshots:
+        for key, value in snapshot["counters"]:
+            key = restore_key(key)
+            counters[key] = counters.get(key, 0) + value
+        for key, (buckets, total, count) in snapshot["histograms"]:
+            key = restore_key(key)
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+            merged[2] += count
+    return {"counters": counters, "histograms": histograms}
+
+
+def as_snapshot(collected: dict) -> dict:
+    """Summed values in the file format of `MetricsRegistry.snapshot`."""
+    return {
+        "counters": [
+            [list(key), value] for key, value in collected["counters"].items()
+        ],
+        "histograms": [
+            [list(key), histogram] for key, histogram in collected["histograms"].items()
+        ],
+    }
+
+
+def restore_key(key: list) -> tuple:
+    """JSON turns (name, (label, value), ...) keys into lists, restore tuples."""
+    return tuple(tuple(item) if isinstance(item, list) else item for item in key)
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = (
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+registry = MetricsRegistry(
+    directory=getattr(settings, "METRICS_DIR", None),
+    flush_interval=getattr(settings, "METRICS_FLUSH_INTERVAL", 5.0),
+)
+
+http_requests = registry.counter(
+    "wallis_http_requests_total", "Requests by URL name, method and status."
+)
+http_request_duration = registry.histogram(
+    "wallis_http_request_duration_seconds", "Request latency by URL name."
+)
+db_queries = registry.histogram(
+    "wallis_db_queries_per_request",
+    "SQL queries per request by URL name.",
+    buckets=QUERY_COUNT_BUCKETS,
+)
+db_duration = registry.histogram(
+    "wallis_db_duration_seconds", "SQL time per request by URL name."
+)
+memory_peak = registry.histogram(
+    "wallis_request_memory_peak_bytes",
+    "Peak traced memory of requests profiled by MemoryProfilerMiddleware.",
+    buckets=MEMORY_BUCKETS,
+)
+cache_requests = registry.counter(
+    "wallis_cache_requests_total",
+    "Lookups of in-process and shared caches by cache and result (hit/miss).",
+)
+
+DOMAIN_GAUGES_KEY = "wallis:metrics:domain_gauges"
+
+
+def build_domain_gauges() -> list[tuple[str, str, dict, float]]:
+    from django.db.models import Count, F, Sum
+
+    from production.models import ArchivedOrder, Material, Order
+    from production.reference_data import get_reference_data
+
+    gauges = []
+    for row in Order.objects.values("status").annotate(count=Count("id")).order_by():
+        gauges.append(
+            (
+                "wallis_orders",
+                "Orders by status.",
+                {"status": row["status"]},
+                row["count"],
+            )
+        )
+    materials = get_reference_data(Material).labels()
+    backlog = (
+        Order.objects.filter(status=Order.READY_TO_PRINT, print_queue=None)
+        .values("material_id")
+        .annotate(count=Count("id"), area=Sum(F("width") * F("height")))
+        .order_by()
+    )
+    for row in backlog:
+        labels = {"material": materials.get(row["material_id"], row["material_id"])}
+        gauges.append(
+            (
+                "wallis_backlog_orders",
+                "Ready orders without a print queue by material.",
+                labels,
+                row["count"],
+            )
+        )
+        gauges.append(
+            (
+                "wallis_backlog_square_meters",
+                "Area of ready orders without a print queue by material.",
+                labels,
+                round((row["area"] or 0) / 10000, 2),
+            )
+        )
+    gauges.append(
+        (
+            "wallis_archived_orders",
+            "Orders moved to the archive.",
+            {},
+            ArchivedOrder.objects.count(),
+        )
+    )
+    return gauges
+
+
+def get_domain_gauges() -> list[tuple[str, str, dict, float]]:
+    """
+    Domain gauges are built with three aggregate queries at most once
+    per `METRICS_DOMAIN_GAUGES_TTL` seconds and shared by all processes
+    through the cache, so scrapes in between do not query the database.
+    """
+    gauges = cache.get(DOMAIN_GAUGES_KEY)
+    if gauges is None:
+        gauges = build_domain_gauges()
+        cache.set(
+            DOMAIN_GAUGES_KEY,
+            gauges,
+            timeout=getattr(settings, "METRICS_DOMAIN_GAUGES_TTL", 30),
+        )
+    return gauges
@@ -0,0 +1,281 @@
+import logging
+import random
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+
+from production import metrics
+from production.identity_map import IdentityMap
+from production.memory import profile_memory
+from production.nplusone import detect_nplusone
+from production.profiling import RequestProfile, get_profile_store
+from production.timing import RequestTiming
+
+logger = logging.getLogger(__name__)
+timing_logger = logging.getLogger("production.timing")
+memory_logger = logging.getLogger("production.memory")
+
+
+def resolve_request(request):
+    """URL match of a request before the handler resolved it, None for 404."""
+    try:
+        return resolve(request.path_info)
+    except Resolver404:
+        return None
+
+
+class IdentityMapMiddleware:
+    """
+    IdentityMapMiddleware:
+    - Attaches a fresh `IdentityMap` to every request.
+    - Reports how many queries the map saved for the request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.identity_map = IdentityMap()
+        response = self.get_response(request)
+        stats = request.identity_map.as_dict()
+        if stats["saved_queries"]:
+            logger.info(
+                "Identity map saved %(saved_queries)s queries "
+                "(hits: %(hits)s, loaded: %(loaded)s in %(queries)s queries) "
+                "for %(path)s",
+                {**stats, "path": request.path},
+            )
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    ServerTimingMiddleware:
+    - Measures a sample of requests: SQL count and time,
+      template render time, view time and total time.
+    - Logs one structured line per measured request to `production.timing`
+      and adds a `Server-Timing` header in DEBUG or for staff users.
+    - `SERVER_TIMING_SAMPLE_RATE` (0..1) sets the share of measured requests,
+      with 0 the middleware removes itself from the stack.
+    - Should be the first middleware, so the total covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = float(getattr(settings, "SERVER_TIMING_SAMPLE_RATE", 0))
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timing = request.timing = RequestTiming()
+        with timing.instrument():
+            response = self.get_response(request)
+        timing.finish_view()
+
+        if settings.DEBUG or getattr(request, "user", None) and request.user.is_staff:
+            response["Server-Timing"] = timing.server_timing()
+        self.log(request, response, timing)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, "timing", None)
+        if timing is not None:
+            timing.start_view()
+
+    def process_template_response(self, request, response):
+        timing = getattr(request, "timing", None)
+        if timing is not None:
+            timing.finish_view()
+        return response
+
+    @staticmethod
+    def log(request, response, timing: RequestTiming) -> None:
+        match = request.resolver_match
+        data = {
+            "method": request.method,
+            "path": request.path,
+            "url_name": match.view_name if match else None,
+            "status": response.status_code,
+            **timing.as_dict(),
+        }
+        timing_logger.info(
+            " ".join(f"{key}={value}" for key, value in data.items()),
+            extra={"timing": data},
+        )
+
+
+class MetricsMiddleware:
+    """
+    MetricsMiddleware:
+    - Records latency, SQL query count and SQL time of every request
+      by URL name, and identity map hits, into the metrics registry.
+    - Reuses the timing of `ServerTimingMiddleware` for sampled requests.
+    - Disabled unless `METRICS_ENABLED`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, "METRICS_ENABLED", False):
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        timing = getattr(request, "timing", None)
+        if timing is None:
+            timing = RequestTiming()
+            with timing.instrument():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        url_name = match.view_name if match else "unresolved"
+        metrics.http_requests.inc(
+            url_name=url_name,
+            method=request.method,
+            status=response.status_code,
+        )
+        metrics.http_request_duration.observe(timing.total_time, url_name=url_name)
+        metrics.db_queries.observe(timing.db_queries, url_name=url_name)
+        metrics.db_duration.observe(timing.db_time, url_name=url_name)
+
+        identity_map = getattr(request, "identity_map", None)
+        if identity_map is not None:
+            if identity_map.hits:
+                metrics.cache_requests.inc(
+                    identity_map.hits, cache="identity_map", result="hit"
+                )
+            if identity_map.loaded:
+                metrics.cache_requests.inc(
+                    identity_map.loaded, cache="identity_map", result="miss"
+                )
+        return response
+
+
+class NPlusOneMiddleware:
+    """
+    NPlusOneMiddleware:
+    - Runs every request inside `detect_nplusone`.
+    - `NPLUSONE_MODE` "log" logs a warning, "raise" raises `NPlusOneError`,
+      unset removes the middleware (production).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.mode = getattr(settings, "NPLUSONE_MODE", None)
+        if self.mode not in ("log", "raise"):
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        with detect_nplusone(
+            raise_error=self.mode == "raise",
+            label=f"{request.method} {request.path}",
+        ):
+            return self.get_response(request)
+
+
+class ProfilerMiddleware:
+    """
+    ProfilerMiddleware:
+    - Samples the Python stack of chosen requests and stores
+      a collapsed-stack file per request (see `production.profiling`).
+    - A request is profiled if a staff user sends `X-Profile: 1`,
+      if its URL name is in `PROFILER_URL_NAMES`,
+      or it is in the `PROFILER_SLOW_SAMPLE_RATE` share of requests
+      sampled to catch requests slower than `PROFILER_SLOW_MS`
+      (kept only if the request was slower).
+    - At most `PROFILER_MAX_CONCURRENT` requests per process are profiled,
+      others run unprofiled. Disabled unless `PROFILER_ENABLED`.
+    - Must follow `AuthenticationMiddleware`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, "PROFILER_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.url_names = set(getattr(settings, "PROFILER_URL_NAMES", ()))
+        self.slow_ms = getattr(settings, "PROFILER_SLOW_MS", None)
+        self.slow_sample_rate = getattr(settings, "PROFILER_SLOW_SAMPLE_RATE", 0)
+
+    def __call__(self, request):
+        request.profile = None
+        try:
+            return self.get_response(request)
+        finally:
+            if request.profile is not None:
+                self.finish(request, request.profile)
+
+    def trigger(self, request) -> Optional[str]:
+        if request.headers.get("X-Profile") == "1" and request.user.is_staff:
+            return "header"
+        if request.resolver_match.view_name in self.url_names:
+            return "url"
+        if self.slow_ms and random.random() < self.slow_sample_rate:
+            return "slow"
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trigger = self.trigger(request)
+        if trigger is not None:
+            request.profile = RequestProfile.start(trigger)
+
+    def finish(self, request, profile: RequestProfile) -> None:
+        duration = profile.stop()
+        if profile.trigger == "slow" and duration * 1000 < self.slow_ms:
+            return
+        if not profile.sampler.samples:
+            return
+        path = get_profile_store().save(
+            profile.sampler.collapsed(),
+            profile.trigger,
+            request.resolver_match.view_name,
+            duration,
+        )
+        logger.info(
+            "Profiled %s (%s, %.0fms, %s samples): %s",
+            request.path,
+            profile.trigger,
+            duration * 1000,
+            profile.sampler.samples,
+            path.name,
+        )
+
+
+class MemoryProfilerMiddleware:
+    """
+    MemoryProfilerMiddleware:
+    - Measures the views of `MEMORY_PROFILER_URL_NAMES` with tracemalloc:
+      peak allocation and the lines holding the most memory at the end.
+    - Logs the report to `production.memory` and observes the peak
+      in the `wallis_request_memory_peak_bytes` histogram.
+    - One request per process is measured at a time, the others are not.
+      Without URL names the middleware removes itself from the stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.url_names = set(getattr(settings, "MEMORY_PROFILER_URL_NAMES", ()))
+        self.top = getattr(settings, "MEMORY_PROFILER_TOP", 10)
+        if not self.url_names:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        match = resolve_request(request)
+        if match is None or match.view_name not in self.url_names:
+            return self.get_response(request)
+        with profile_memory(top=self.top) as profile:
+            response = self.get_response(request)
+        if profile is not None:
+            metrics.memory_peak.observe(profile.peak, url_name=match.view_name)
+            memory_logger.info(
+                "Memory of %s %s: %s",
+                request.method,
+                request.path,
+                profile.report(),
+                extra={"memory": {"url_name": match.view_name, **profile.as_dict()}},
+            )
+        return response
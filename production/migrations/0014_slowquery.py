@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-19 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("production", "0013_alter_printer_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlowQuery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fingerprint_hash", models.CharField(max_length=40, unique=True)),
+                ("fingerprint", models.TextField()),
+                ("sql", models.TextField()),
+                ("explain", models.TextField(blank=True)),
+                ("origin", models.CharField(blank=True, max_length=255)),
+                ("view_name", models.CharField(blank=True, max_length=255)),
+                ("count", models.PositiveIntegerField(default=1)),
+                ("total_ms", models.FloatField(default=0)),
+                ("max_ms", models.FloatField(default=0)),
+                ("first_seen", models.DateTimeField(auto_now_add=True)),
+                ("last_seen", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "slow queries",
+                "ordering": ["-total_ms"],
+            },
+        ),
+    ]
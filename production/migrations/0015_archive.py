@@ -0,0 +1,145 @@
+# Generated by Django 5.1.4 on 2026-10-19 05:37
+
+import django.db.models.deletion
+import production.mixins
+import production.status_objects
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("production", "0014_slowquery"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedPrintQueue",
+            fields=[
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("ready_to_print", "Ready to Print"),
+                            ("in_progress", "In Progress"),
+                            ("problem", "Problem"),
+                            ("done", "Done"),
+                        ],
+                        default="ready_to_print",
+                        max_length=50,
+                    ),
+                ),
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("creation_time", models.DateTimeField()),
+                ("archived_at", models.DateTimeField()),
+                (
+                    "material",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_print_queues",
+                        to="production.material",
+                    ),
+                ),
+                (
+                    "printer",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_print_queues",
+                        to="production.printer",
+                    ),
+                ),
+                (
+                    "workplace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_print_queues",
+                        to="production.workplace",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["creation_time"],
+                "abstract": False,
+            },
+            bases=(production.status_objects.PrintStatusMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name="ArchivedOrder",
+            fields=[
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("ready_to_print", "Ready to Print"),
+                            ("in_progress", "In Progress"),
+                            ("problem", "Problem"),
+                            ("done", "Done"),
+                        ],
+                        default="ready_to_print",
+                        max_length=50,
+                    ),
+                ),
+                ("owner_full_name", models.CharField(max_length=255)),
+                ("manager", models.CharField(default="AutoCreate", max_length=255)),
+                (
+                    "country_post",
+                    models.CharField(default="ukr-Nova Post", max_length=255),
+                ),
+                ("performing_time", models.DateTimeField(blank=True, null=True)),
+                ("image_name", models.CharField(max_length=255)),
+                ("width", models.IntegerField()),
+                ("height", models.IntegerField()),
+                ("comment", models.CharField(blank=True, max_length=255, null=True)),
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("code", models.CharField(db_index=True, max_length=100)),
+                ("creation_time", models.DateTimeField()),
+                ("archived_at", models.DateTimeField()),
+                (
+                    "material",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_orders",
+                        to="production.material",
+                    ),
+                ),
+                (
+                    "performer",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_orders",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "print_queue",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="orders",
+                        to="production.archivedprintqueue",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["creation_time"],
+                "abstract": False,
+                "indexes": [
+                    models.Index(
+                        fields=["status", "performing_time"],
+                        name="production__status_5d15a1_idx",
+                    )
+                ],
+            },
+            bases=(
+                production.status_objects.PrintStatusMixin,
+                models.Model,
+                production.mixins.ModelAbsoluteUrlMixin,
+            ),
+        ),
+    ]
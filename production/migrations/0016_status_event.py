@@ -0,0 +1,112 @@
+# Generated by Django 5.1.4 on 2026-10-19 05:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("production", "0015_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatusEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("order", "Order"), ("print_queue", "Print queue")],
+                        max_length=20,
+                    ),
+                ),
+                ("order_id", models.BigIntegerField(blank=True, null=True)),
+                ("print_queue_id", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "from_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("ready_to_print", "Ready to Print"),
+                            ("in_progress", "In Progress"),
+                            ("problem", "Problem"),
+                            ("done", "Done"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                (
+                    "to_status",
+                    models.CharField(
+                        choices=[
+                            ("ready_to_print", "Ready to Print"),
+                            ("in_progress", "In Progress"),
+                            ("problem", "Problem"),
+                            ("done", "Done"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="status_events",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "printer",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="status_events",
+                        to="production.printer",
+                    ),
+                ),
+                (
+                    "workplace",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="status_events",
+                        to="production.workplace",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["at", "id"],
+                "indexes": [
+                    models.Index(fields=["at"], name="production__at_3e7612_idx"),
+                    models.Index(
+                        fields=["to_status", "at"],
+                        name="production__to_stat_b66574_idx",
+                    ),
+                    models.Index(
+                        fields=["order_id", "at"], name="production__order_i_dbecf1_idx"
+                    ),
+                    models.Index(
+                        fields=["print_queue_id", "at"],
+                        name="production__print_q_0d9bf2_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
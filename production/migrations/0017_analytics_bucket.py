@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-19 05:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("production", "0016_status_event"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalyticsBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dimension", models.CharField(max_length=20)),
+                ("metric", models.CharField(max_length=30)),
+                ("day", models.DateField()),
+                ("key", models.BigIntegerField(default=0)),
+                ("bucket", models.PositiveSmallIntegerField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("total_seconds", models.FloatField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dimension", "metric", "day", "key", "bucket"),
+                        name="unique_analytics_bucket",
+                    )
+                ],
+            },
+        ),
+    ]
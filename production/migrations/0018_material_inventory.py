@@ -0,0 +1,152 @@
+# Generated by Django 5.1.4 on 2026-10-19 05:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("production", "0017_analytics_bucket"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MaterialLedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("receipt", "Receipt"),
+                            ("consumption", "Consumption"),
+                            ("adjustment", "Adjustment"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("area", models.FloatField()),
+                (
+                    "print_queue_id",
+                    models.BigIntegerField(blank=True, db_index=True, null=True),
+                ),
+                ("at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name_plural": "material ledger entries",
+                "ordering": ["at", "id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="MaterialRoll",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("area", models.FloatField()),
+                ("remaining_area", models.FloatField()),
+                (
+                    "received_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "ordering": ["received_at", "id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="MaterialStock",
+            fields=[
+                (
+                    "material",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stock",
+                        serialize=False,
+                        to="production.material",
+                    ),
+                ),
+                ("rolls", models.IntegerField(default=0)),
+                ("remaining_area", models.FloatField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "material", "width", "height"],
+                name="order_backlog_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="materialledgerentry",
+            name="by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="ledger_entries",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="materialledgerentry",
+            name="material",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="ledger_entries",
+                to="production.material",
+            ),
+        ),
+        migrations.AddField(
+            model_name="materialroll",
+            name="material",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="rolls",
+                to="production.material",
+            ),
+        ),
+        migrations.AddField(
+            model_name="materialledgerentry",
+            name="roll",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="ledger_entries",
+                to="production.materialroll",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="materialroll",
+            index=models.Index(
+                fields=["material", "received_at"],
+                name="production__materia_853fdf_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="materialledgerentry",
+            index=models.Index(
+                fields=["material", "kind", "at"], name="production__materia_67b643_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:04
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("production", "0018_material_inventory"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="printer",
+            name="speed",
+            field=models.FloatField(
+                default=10,
+                help_text="Print speed, m² per hour.",
+                validators=[django.core.validators.MinValueValidator(0.1)],
+            ),
+        ),
+    ]
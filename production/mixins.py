@@ -5,12 +5,16 @@ from django.core.exceptions import ImproperlyConfigured
 from django.db import transaction, models
 from django.db.models import QuerySet
 from django.http import HttpResponseRedirect, Http404
-from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.views import generic
 
+from production.fields import EvaluatedModelChoiceField
+from production.identity_map import IdentityMap, get_identity_map
 from production.services import (
+    ClaimConflict,
+    can_operate_workplace,
     filter_queryset_by_instance,
+    is_workplace_worker,
     model_name_to_field,
     set_remove_foreign_by_cleaned_data_and_instance,
 )
@@ -117,25 +121,107 @@ class InstanceCacheMixin:
     model = None
     kwargs = {}
 
+    def get_identity_map(self) -> IdentityMap:
+        """
+        Return identity map of the current request,
+        or of the view itself when it is used without a request.
+        """
+        request = getattr(self, "request", None)
+        if request is not None:
+            return get_identity_map(request)
+        if not hasattr(self, "_identity_map"):
+            self._identity_map = IdentityMap()
+        return self._identity_map
+
     def cache_instance(self, model):
         """
         Cache Model instance from url kwargs for avoid query
         duplication when multiple calls for instance are made.
+        (!) Instance is resolved through the request identity map,
+        so other lookups of the same object reuse it.
         """
         cache_name = f"{model_name_to_field(self.model)}_cached"
         if not hasattr(self, cache_name):
-            setattr(self, cache_name, get_object_or_404(model, pk=self.kwargs["pk"]))
+            setattr(
+                self,
+                cache_name,
+                self.get_identity_map().get_or_404(model, self.kwargs["pk"]),
+            )
         return getattr(self, cache_name)
 
 
+class WorkplacePermissionMixin:
+    """
+    WorkplacePermissionMixin:
+    - Adds `is_workplace_worker` and `can_operate_workplace` flags
+      to the context, computed once per request from `user.workplace_id`.
+    - Templates use the flags instead of `user in workplace.workers.all`,
+      so detail pages do not scale with the workplace headcount.
+    """
+
+    def get_permission_workplace(self):
+        raise ImproperlyConfigured(
+            f"{self.__class__.__name__} must define `get_permission_workplace`."
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        user = self.request.user
+        workplace = self.get_permission_workplace()
+        context["is_workplace_worker"] = is_workplace_worker(user, workplace)
+        context["can_operate_workplace"] = can_operate_workplace(user, workplace)
+        return context
+
+
 class PostApproveMixin(generic.FormView):
+    """
+    PostApproveMixin:
+    - Saves the form only when the "approve" button was pressed,
+      otherwise re-renders it (e.g. after a pseudo dynamic field change).
+    - The form is built and cleaned once per request and the same instance
+      is passed to the context, so `get_context_data` must not rebuild it
+      when `form` is given.
+    - Objects taken by a concurrent save are reported as a form error.
+    """
+
     def post(self, request, *args, **kwargs):
-        form = self.get_context_data()["form"]
+        form = self.get_form()
         if "approve" in request.POST and form.is_valid():
-            return self.form_valid(form)
+            try:
+                return self.form_valid(form)
+            except ClaimConflict as conflict:
+                form.add_error(None, str(conflict))
         return self.form_invalid(form)
 
 
+class ClaimConflictMixin:
+    """
+    ClaimConflictMixin:
+    - For create and update views of forms with `FormSaveForeignMixin`.
+    - Objects taken by a concurrent save are reported as a form error
+      instead of a server error.
+    """
+
+    def form_valid(self, form):
+        try:
+            return super().form_valid(form)
+        except ClaimConflict as conflict:
+            form.add_error(None, str(conflict))
+            return self.form_invalid(form)
+
+
+class StatusEventAuthorMixin:
+    """
+    StatusEventAuthorMixin:
+    - Makes the request user the author of status events
+      logged when the form instance is saved.
+    """
+
+    def form_valid(self, form):
+        form.instance.changed_by = self.request.user
+        return super().form_valid(form)
+
+
 class FormSaveForeignMixin(forms.ModelForm):
     """
     A mixin that ensures foreign key relations
@@ -166,22 +252,46 @@ class FormSaveForeignMixin(forms.ModelForm):
     def save(self, commit=True):
         """
         Save the instance and update related models.
+        On `ClaimConflict` the transaction is rolled back,
+        a new instance is left unsaved.
         """
         self._validate_related_models()
         instance = super().save(commit=False)
         if commit:
-            with transaction.atomic():
-                instance.save()
-                for model in self.related_models:
-                    set_remove_foreign_by_cleaned_data_and_instance(
-                        model_to_update=model,
-                        cleaned_data=self.cleaned_data,
-                        instance=instance,
-                    )
+            adding = instance._state.adding
+            try:
+                with transaction.atomic():
+                    instance.save()
+                    for model in self.related_models:
+                        set_remove_foreign_by_cleaned_data_and_instance(
+                            model_to_update=model,
+                            cleaned_data=self.cleaned_data,
+                            instance=instance,
+                        )
+            except ClaimConflict:
+                if adding:
+                    instance.pk = None
+                    instance._state.adding = True
+                raise
         return instance
 
 
 class FormFieldMixin:
+    identity_map: Optional[IdentityMap] = None
+
+    def get_identity_map(self) -> IdentityMap:
+        """
+        Return identity map passed by the view,
+        forms built outside of a request get their own one.
+        """
+        if self.identity_map is None:
+            self.identity_map = IdentityMap()
+        return self.identity_map
+
+    def resolve_related(self, instance: models.Model, field_name: str):
+        """Return ForeignKey object of instance through the identity map."""
+        return self.get_identity_map().resolve(instance, field_name)
+
     def get_field(self, field_name: str) -> Optional[forms.Field]:
         """Return a form field by its name,
         if it exists and is instance of forms.Field."""
@@ -263,6 +373,19 @@ class FormFieldMixin:
             ),
         )
 
+    def get_field_object(self, field: forms.Field, pk: int) -> models.Model:
+        """
+        Return object by id from field query set.
+        Evaluated fields pick it from their choices,
+        so rendering the field does not query it again.
+        The object must be one of the field choices, the instance
+        already known to the identity map is returned for it.
+        """
+        identity_map = self.get_identity_map()
+        if isinstance(field, EvaluatedModelChoiceField):
+            return identity_map.add(field.to_python(pk))
+        return identity_map.add(field.queryset.get(**{"id": pk}))
+
     @property
     def initial_context(self):
         """
@@ -282,9 +405,8 @@ class FormFieldMixin:
                 else:
                     if hasattr(field, "queryset"):
                         if isinstance(initial_field_data, int):
-                            queryset = getattr(field, "queryset")
-                            fields[field_name] = queryset.get(
-                                **{"id": initial_field_data}
+                            fields[field_name] = self.get_field_object(
+                                field, initial_field_data
                             )
             return fields
         raise ImproperlyConfigured(
@@ -1,8 +1,12 @@
 from django.contrib.auth.models import AbstractUser
-from django.core.validators import RegexValidator
-from django.db import models
+from django.core.exceptions import ImproperlyConfigured
+from django.core.validators import MinValueValidator, RegexValidator
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 from production.mixins import ModelAbsoluteUrlMixin
+from production.services import status_changed
 from django.conf import settings
 
 from production.calculations import PrintQueueSummary
@@ -83,6 +87,11 @@ class Printer(
     )
     name = models.CharField(max_length=100, unique=False)
     model = models.CharField(max_length=100, unique=True)
+    speed = models.FloatField(
+        default=10,
+        validators=[MinValueValidator(0.1)],
+        help_text="Print speed, m² per hour.",
+    )
     materials = models.ManyToManyField(Material, related_name="printers")
     workplace = models.ForeignKey(
         Workplace,
@@ -103,13 +112,170 @@ class Printer(
     def full_name(self):
         return f"{self.name} {self.model}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_status = self.status
+
+    @property
+    def was_active(self) -> bool:
+        """The printer was active when it was loaded or last saved."""
+        return getattr(self, "_loaded_status", None) in (self.ACTIVE, None)
+
+
+class StatusHistoryQuerySet(models.QuerySet):
+    def change_status(self, status: str, by=None, batch_size: int = 1000, **fields):
+        """
+        Set the status and other fields of the objects not in the status yet
+        with batched UPDATEs and log a `StatusEvent` for every one of them
+        with `bulk_create`, in one transaction.
+        Returns the number of changed objects.
+        """
+        model = self.model
+        model.check_status_event_config()
+        at = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                self.exclude(status=status)
+                .select_for_update(of=("self",))
+                .values_list(
+                    "pk",
+                    "status",
+                    "creation_time",
+                    "material_id",
+                    *model.status_event_lookups,
+                )
+            )
+            pks = [row[0] for row in rows]
+            for start in range(0, len(pks), batch_size):
+                model.objects.filter(pk__in=pks[start : start + batch_size]).update(
+                    status=status, **fields
+                )
+            transitions = [
+                (
+                    StatusEvent.for_transition(
+                        model.status_event_kind,
+                        pk,
+                        from_status,
+                        status,
+                        related,
+                        by=by,
+                        at=at,
+                    ),
+                    creation_time,
+                    material_id,
+                )
+                for pk, from_status, creation_time, material_id, *related in rows
+            ]
+            StatusEvent.objects.bulk_create(
+                [event for event, *_ in transitions], batch_size=batch_size
+            )
+            status_changed.send(sender=model, transitions=transitions)
+        return len(rows)
+
+
+class StatusHistoryMixin:
+    """
+    StatusHistoryMixin:
+    - Logs a `StatusEvent` when an object is created or saved
+      with another status than it was loaded with,
+      in the transaction of the save.
+    - The author is taken from the `changed_by` attribute set by the view.
+    - `objects.change_status()` is the bulk version for mass transitions.
+    - Both send `status_changed` in the transaction.
+    - Subclasses declare `status_event_kind` and `status_event_lookups`,
+      a model missing them fails on its first save.
+    """
+
+    status_event_kind: str = ""
+    # Lookups of the event print queue, workplace and printer ids.
+    status_event_lookups: tuple[str, str, str] = ()
+    changed_by = None
+
+    @classmethod
+    def check_status_event_config(cls) -> None:
+        if not cls.status_event_kind or len(cls.status_event_lookups) != 3:
+            raise ImproperlyConfigured(
+                f"{cls.__name__} must define `status_event_kind` and the three "
+                "`status_event_lookups` of its status events."
+            )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def status_event_related(self) -> tuple:
+        """Values of `status_event_lookups`, None past an empty relation."""
+        values = []
+        for lookup in self.status_event_lookups:
+            value = self
+            for name in lookup.split("__"):
+                value = getattr(value, name)
+                if value is None:
+                    break
+            values.append(value)
+        return tuple(values)
+
+    def save(self, *args, **kwargs):
+        self.check_status_event_config()
+        update_fields = kwargs.get("update_fields")
+        from_status = getattr(self, "_loaded_status", None)
+        if (update_fields is not None and "status" not in update_fields) or (
+            not self._state.adding and from_status == self.status
+        ):
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            event = StatusEvent.for_transition(
+                self.status_event_kind,
+                self.pk,
+                from_status,
+                self.status,
+                self.status_event_related(),
+                by=self.changed_by,
+            )
+            event.save()
+            status_changed.send(
+                sender=type(self),
+                transitions=[(event, self.creation_time, self.material_id)],
+            )
+        self._loaded_status = self.status
+
+
+class PrintQueueBase(PrintStatusMixin, models.Model):
+    """Fields and behaviour shared by live and archived print queues."""
 
-class PrintQueue(PrintStatusMixin, models.Model, ModelAbsoluteUrlMixin):
     status = models.CharField(
         max_length=50,
         choices=PrintStatusMixin.STATUS_CHOICES,
         default=PrintStatusMixin.READY_TO_PRINT,
     )
+    creation_time = models.DateTimeField(
+        auto_now_add=True,
+    )
+    is_archived = False
+
+    class Meta:
+        abstract = True
+        ordering = ["creation_time"]
+
+    def __str__(self):
+        return f"#{self.id}"
+
+    @cached_property
+    def summary(self) -> PrintQueueSummary:
+        orders = self.orders.all()
+        return PrintQueueSummary(orders, self.material)
+
+
+class PrintQueue(StatusHistoryMixin, PrintQueueBase, ModelAbsoluteUrlMixin):
     material = models.ForeignKey(
         Material,
         on_delete=models.CASCADE,
@@ -120,9 +286,6 @@ class PrintQueue(PrintStatusMixin, models.Model, ModelAbsoluteUrlMixin):
         related_name="print_queues",
         on_delete=models.CASCADE,
     )
-    creation_time = models.DateTimeField(
-        auto_now_add=True,
-    )
     printer = models.ForeignKey(
         Printer,
         related_name="print_queues",
@@ -131,24 +294,15 @@ class PrintQueue(PrintStatusMixin, models.Model, ModelAbsoluteUrlMixin):
         null=True,
     )
     view_name = "production:print-queue-detail"
+    status_event_kind = "print_queue"
+    status_event_lookups = ("pk", "workplace_id", "printer_id")
 
-    class Meta:
-        ordering = ["creation_time"]
-
-    def __str__(self):
-        return f"#{self.id}"
+    objects = StatusHistoryQuerySet.as_manager()
 
-    @property
-    def summary(self) -> PrintQueueSummary:
-        orders = self.orders.all()
-        return PrintQueueSummary(orders, self.material)
 
+class OrderBase(PrintStatusMixin, models.Model):
+    """Fields and behaviour shared by live and archived orders."""
 
-class Order(
-    PrintStatusMixin,
-    models.Model,
-    ModelAbsoluteUrlMixin,
-):
     status = models.CharField(
         max_length=50,
         choices=PrintStatusMixin.STATUS_CHOICES,
@@ -167,33 +321,17 @@ class Order(
     )
     owner_full_name = models.CharField(max_length=255)
     manager = models.CharField(max_length=255, default="AutoCreate")
-    performer = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        related_name="orders",
-        on_delete=models.CASCADE,
-        null=True,
-        blank=True,
-    )
     country_post = models.CharField(max_length=255, default="ukr-Nova Post")
     creation_time = models.DateTimeField(auto_now_add=True)
     performing_time = models.DateTimeField(null=True, blank=True)
     image_name = models.CharField(max_length=255)
-    material = models.ForeignKey(
-        Material, related_name="orders", on_delete=models.CASCADE
-    )
     width = models.IntegerField()
     height = models.IntegerField()
     comment = models.CharField(max_length=255, blank=True, null=True)
-    print_queue = models.ForeignKey(
-        PrintQueue,
-        related_name="orders",
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True,
-    )
-    view_name = "production:order-detail"
+    is_archived = False
 
     class Meta:
+        abstract = True
         ordering = ["creation_time"]
 
     def __str__(self):
@@ -227,3 +365,362 @@ class Order(
     @property
     def wide_tile_width(self) -> float:
         return self.narrow_tile_width * 2
+
+
+class Order(StatusHistoryMixin, OrderBase, ModelAbsoluteUrlMixin):
+    performer = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="orders",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    material = models.ForeignKey(
+        Material, related_name="orders", on_delete=models.CASCADE
+    )
+    print_queue = models.ForeignKey(
+        PrintQueue,
+        related_name="orders",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    view_name = "production:order-detail"
+    status_event_kind = "order"
+    status_event_lookups = (
+        "print_queue_id",
+        "print_queue__workplace_id",
+        "print_queue__printer_id",
+    )
+
+    objects = StatusHistoryQuerySet.as_manager()
+
+    class Meta(OrderBase.Meta):
+        indexes = [
+            # Backlog area by material is read from the index alone.
+            models.Index(
+                fields=["status", "material", "width", "height"],
+                name="order_backlog_idx",
+            )
+        ]
+
+
+class ArchivedPrintQueue(PrintQueueBase):
+    """
+    ArchivedPrintQueue:
+    - A done print queue moved out of `PrintQueue` by `archive_done`,
+      with its id, so the live table holds only live work.
+    - A deleted printer keeps its archived queues.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    creation_time = models.DateTimeField()
+    material = models.ForeignKey(
+        Material,
+        on_delete=models.CASCADE,
+        related_name="archived_print_queues",
+    )
+    workplace = models.ForeignKey(
+        Workplace,
+        related_name="archived_print_queues",
+        on_delete=models.CASCADE,
+    )
+    printer = models.ForeignKey(
+        Printer,
+        related_name="archived_print_queues",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
+    archived_at = models.DateTimeField()
+    is_archived = True
+
+
+class ArchivedOrder(OrderBase, ModelAbsoluteUrlMixin):
+    """
+    ArchivedOrder:
+    - A done order moved out of `Order` by `archive_done` with its id,
+      so `OrderDetailView` still opens it by the same URL.
+    - Codes are unique among live orders only.
+    - A deleted worker keeps the orders they performed.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    code = models.CharField(max_length=100, db_index=True)
+    creation_time = models.DateTimeField()
+    performer = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="archived_orders",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    material = models.ForeignKey(
+        Material, related_name="archived_orders", on_delete=models.CASCADE
+    )
+    print_queue = models.ForeignKey(
+        ArchivedPrintQueue,
+        related_name="orders",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    archived_at = models.DateTimeField()
+    is_archived = True
+    view_name = "production:order-detail"
+
+    class Meta(OrderBase.Meta):
+        indexes = [models.Index(fields=["status", "performing_time"])]
+
+
+class SlowQuery(models.Model):
+    """
+    SlowQuery:
+    - Queries slower than `SLOW_QUERY_THRESHOLD_MS`,
+      deduplicated by normalized SQL fingerprint.
+    - Keeps the plan of the first occurrence and the code
+      and view that ran it, counts and times of all occurrences.
+    """
+
+    fingerprint_hash = models.CharField(max_length=40, unique=True)
+    fingerprint = models.TextField()
+    sql = models.TextField()
+    explain = models.TextField(blank=True)
+    origin = models.CharField(max_length=255, blank=True)
+    view_name = models.CharField(max_length=255, blank=True)
+    count = models.PositiveIntegerField(default=1)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-total_ms"]
+        verbose_name_plural = "slow queries"
+
+    def __str__(self):
+        return self.fingerprint[:100]
+
+    @property
+    def average_ms(self) -> float:
+        return round(self.total_ms / self.count, 2) if self.count else 0.0
+
+
+class StatusEvent(models.Model):
+    """
+    StatusEvent:
+    - Append-only log of order and print queue status transitions,
+      written in the transaction of the transition.
+    - Order and queue ids are plain integers, so events outlive
+      archived and deleted orders; workplace and printer
+      are the ones of the queue at the time of the transition.
+    - `from_status` is empty for created objects.
+    """
+
+    ORDER = "order"
+    PRINT_QUEUE = "print_queue"
+    KIND_CHOICES = [
+        (ORDER, "Order"),
+        (PRINT_QUEUE, "Print queue"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    order_id = models.BigIntegerField(null=True, blank=True)
+    print_queue_id = models.BigIntegerField(null=True, blank=True)
+    from_status = models.CharField(
+        max_length=50, choices=PrintStatusMixin.STATUS_CHOICES, blank=True
+    )
+    to_status = models.CharField(max_length=50, choices=PrintStatusMixin.STATUS_CHOICES)
+    at = models.DateTimeField(default=timezone.now)
+    by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="status_events",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    workplace = models.ForeignKey(
+        Workplace,
+        related_name="status_events",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    printer = models.ForeignKey(
+        Printer,
+        related_name="status_events",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ["at", "id"]
+        indexes = [
+            models.Index(fields=["at"]),
+            models.Index(fields=["to_status", "at"]),
+            models.Index(fields=["order_id", "at"]),
+            models.Index(fields=["print_queue_id", "at"]),
+        ]
+
+    def __str__(self):
+        subject = self.order_id if self.kind == self.ORDER else self.print_queue_id
+        return f"{self.kind} #{subject}: {self.from_status or '-'} -> {self.to_status}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Status events are append-only.")
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def for_transition(
+        cls,
+        kind: str,
+        pk: int,
+        from_status: str | None,
+        to_status: str,
+        related: tuple,
+        by=None,
+        at=None,
+    ) -> "StatusEvent":
+        print_queue_id, workplace_id, printer_id = related
+        return cls(
+            kind=kind,
+            order_id=pk if kind == cls.ORDER else None,
+            print_queue_id=print_queue_id,
+            from_status=from_status or "",
+            to_status=to_status,
+            at=at or timezone.now(),
+            by=by,
+            workplace_id=workplace_id,
+            printer_id=printer_id,
+        )
+
+
+class AnalyticsBucket(models.Model):
+    """
+    AnalyticsBucket:
+    - Streaming aggregate of lead and cycle times: number and total
+      duration of done transitions per dimension value, day
+      and duration bucket.
+    - Updated by `production.analytics` in the transaction
+      of the transition, read by the analytics page.
+    - `key` is the workplace, printer, material or worker id, 0 for "all".
+    """
+
+    dimension = models.CharField(max_length=20)
+    metric = models.CharField(max_length=30)
+    day = models.DateField()
+    key = models.BigIntegerField(default=0)
+    bucket = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dimension", "metric", "day", "key", "bucket"],
+                name="unique_analytics_bucket",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.dimension}={self.key} {self.day} [{self.bucket}]"
+
+
+class MaterialRoll(models.Model):
+    """
+    MaterialRoll:
+    - A roll of material in stock, `area` and `remaining_area` in m²
+      as `Order.square_meters` and `Material.winding`.
+    - Finished print queues consume the oldest rolls first.
+    """
+
+    material = models.ForeignKey(
+        Material, related_name="rolls", on_delete=models.CASCADE
+    )
+    area = models.FloatField()
+    remaining_area = models.FloatField()
+    received_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["received_at", "id"]
+        indexes = [models.Index(fields=["material", "received_at"])]
+
+    def __str__(self):
+        return f"{self.material_id} #{self.id}: {self.remaining_area}/{self.area} m²"
+
+    @property
+    def is_empty(self) -> bool:
+        return self.remaining_area <= 0
+
+
+class MaterialStock(models.Model):
+    """
+    MaterialStock:
+    - Running totals of the rolls of one material, changed with `F()`
+      expressions by every ledger entry, so a stock check reads one row.
+    - Materials without a row are not tracked.
+    """
+
+    material = models.OneToOneField(
+        Material, related_name="stock", on_delete=models.CASCADE, primary_key=True
+    )
+    rolls = models.IntegerField(default=0)
+    remaining_area = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.material_id}: {self.rolls} rolls, {self.remaining_area} m²"
+
+
+class MaterialLedgerEntry(models.Model):
+    """
+    MaterialLedgerEntry:
+    - Append-only log of roll receipts, consumption by print queues
+      and manual adjustments, `area` is signed (m²).
+    """
+
+    RECEIPT = "receipt"
+    CONSUMPTION = "consumption"
+    ADJUSTMENT = "adjustment"
+    KIND_CHOICES = [
+        (RECEIPT, "Receipt"),
+        (CONSUMPTION, "Consumption"),
+        (ADJUSTMENT, "Adjustment"),
+    ]
+
+    material = models.ForeignKey(
+        Material, related_name="ledger_entries", on_delete=models.CASCADE
+    )
+    roll = models.ForeignKey(
+        MaterialRoll,
+        related_name="ledger_entries",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    area = models.FloatField()
+    print_queue_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    at = models.DateTimeField(default=timezone.now)
+    by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="ledger_entries",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ["at", "id"]
+        verbose_name_plural = "material ledger entries"
+        indexes = [models.Index(fields=["material", "kind", "at"])]
+
+    def __str__(self):
+        return f"{self.kind} {self.area:+} m² of {self.material_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Ledger entries are append-only.")
+        super().save(*args, **kwargs)
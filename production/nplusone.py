@@ -0,0 +1,108 @@
+import logging
+import sys
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.db import connections
+
+from production.slow_queries import is_recording
+from production.sql import fingerprint_sql, is_transaction_statement, query_origin
+
+logger = logging.getLogger(__name__)
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def template_origin(frame=None) -> Optional[str]:
+    """
+    Template name and line of the innermost template node
+    being rendered on the stack, e.g. `production/print_queue_list.html:46`.
+    """
+    frame = frame or sys._getframe(1)
+    while frame is not None:
+        if frame.f_code.co_name == "render_annotated":
+            node = frame.f_locals.get("self")
+            origin = getattr(node, "origin", None)
+            token = getattr(node, "token", None)
+            if origin is not None and token is not None:
+                return f"{origin.template_name or origin.name}:{token.lineno}"
+        frame = frame.f_back
+    return None
+
+
+class NPlusOneDetector:
+    """
+    NPlusOneDetector:
+    - Database execute wrapper fingerprinting the SQL of one request or block.
+    - A shape executed at least `threshold` times with different parameters
+      is an N+1: one query per row instead of one query for all rows.
+    - Points to the template line and the project function
+      that ran the repeated query.
+    """
+
+    def __init__(self, threshold: Optional[int] = None) -> None:
+        self.threshold = threshold or getattr(settings, "NPLUSONE_THRESHOLD", 3)
+        self.counts: dict[str, int] = defaultdict(int)
+        self.params: dict[str, set] = defaultdict(set)
+        self.locations: dict[str, set] = defaultdict(set)
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        # Queries of the slow query log are not part of the code being checked.
+        if not many and not is_transaction_statement(sql) and not is_recording():
+            fingerprint = fingerprint_sql(sql)
+            self.counts[fingerprint] += 1
+            self.params[fingerprint].add(repr(params))
+            # The first query is the "1", its repetitions are the "N".
+            if self.counts[fingerprint] > 1:
+                self.locations[fingerprint].add((template_origin(), query_origin()))
+        return result
+
+    def findings(self) -> list[dict]:
+        return [
+            {
+                "fingerprint": fingerprint,
+                "count": count,
+                "locations": sorted(
+                    self.locations[fingerprint], key=lambda item: str(item)
+                ),
+            }
+            for fingerprint, count in self.counts.items()
+            if count >= self.threshold and len(self.params[fingerprint]) > 1
+        ]
+
+    def report(self) -> str:
+        lines = []
+        for finding in self.findings():
+            lines.append(f"{finding['count']} x {finding['fingerprint']}")
+            for template, origin in finding["locations"]:
+                lines.append(
+                    f"    at {template or '-'} (python: {origin or 'framework code'})"
+                )
+        return "\n".join(lines)
+
+
+@contextmanager
+def detect_nplusone(
+    threshold: Optional[int] = None,
+    raise_error: bool = False,
+    label: str = "",
+) -> Iterator[NPlusOneDetector]:
+    """
+    Detect N+1 queries in the block, log a warning for them
+    or raise `NPlusOneError` (e.g. to fail a test).
+    """
+    detector = NPlusOneDetector(threshold)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
+    if detector.findings():
+        message = f"N+1 queries{f' in {label}' if label else ''}:\n{detector.report()}"
+        if raise_error:
+            raise NPlusOneError(message)
+        logger.warning(message)
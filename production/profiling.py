@@ -0,0 +1,201 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+
+PROFILE_NAME = re.compile(
+    r"^(?P<stamp>\d{8}-\d{6}-\d{6})_(?P<trigger>header|url|slow)_"
+    r"(?P<view>[\w.-]+)_(?P<duration>\d+)ms\.collapsed$"
+)
+
+# A process runs at most PROFILER_MAX_CONCURRENT sampling threads,
+# requests triggered while all are busy are not profiled.
+_running = threading.BoundedSemaphore(getattr(settings, "PROFILER_MAX_CONCURRENT", 1))
+
+
+def frame_name(frame) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}".replace(";", ":")
+
+
+def collapse_stack(frame) -> str:
+    """Stack of the frame from the root, `root;caller;function`."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """
+    StackSampler:
+    - Background thread sampling the Python stack of one thread
+      every `interval` seconds.
+    - Stacks are counted as collapsed stacks (`root;caller;function count`),
+      the input format of flamegraph.pl, speedscope and most flame graph tools.
+    - Stops sampling after `max_samples`, so a hung request
+      costs at most `max_samples` stacks of memory.
+    """
+
+    def __init__(
+        self,
+        thread_id: Optional[int] = None,
+        interval: float = 0.005,
+        max_samples: int = 6000,
+    ) -> None:
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.max_samples = max_samples
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            self.stacks[collapse_stack(frame)] += 1
+            self.samples += 1
+            if self.samples >= self.max_samples:
+                break
+            del frame
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+class ProfileStore:
+    """
+    ProfileStore:
+    - Directory of collapsed-stack files, one per profiled request.
+    - Trigger, URL name and duration are kept in the file name,
+      so listing does not read the files.
+    - After every save the oldest files are removed
+      above `max_files` or `max_bytes`.
+    """
+
+    def __init__(self, directory, max_files: int = 200, max_bytes: int = 50 << 20):
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+
+    def save(self, collapsed: str, trigger: str, view_name: str, duration: float):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        view = re.sub(r"[^\w.-]", "-", view_name or "unresolved")
+        name = f"{stamp}_{trigger}_{view}_{round(duration * 1000)}ms.collapsed"
+        path = self.directory / name
+        temporary = path.with_suffix(f".{os.getpid()}.tmp")
+        temporary.write_text(collapsed)
+        os.replace(temporary, path)
+        self.prune()
+        return path
+
+    def files(self) -> list[Path]:
+        """Profiles from the newest."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            (
+                path
+                for path in self.directory.iterdir()
+                if PROFILE_NAME.match(path.name)
+            ),
+            key=lambda path: path.name,
+            reverse=True,
+        )
+
+    def prune(self) -> None:
+        total = 0
+        for index, path in enumerate(self.files()):
+            try:
+                total += path.stat().st_size
+                if index >= self.max_files or total > self.max_bytes:
+                    path.unlink()
+            except FileNotFoundError:
+                continue
+
+    def list(self) -> list[dict]:
+        profiles = []
+        for path in self.files():
+            match = PROFILE_NAME.match(path.name)
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                continue
+            profiles.append(
+                {
+                    "name": path.name,
+                    "created": datetime.strptime(match["stamp"], "%Y%m%d-%H%M%S-%f"),
+                    "trigger": match["trigger"],
+                    "view_name": match["view"],
+                    "duration_ms": int(match["duration"]),
+                    "size": size,
+                }
+            )
+        return profiles
+
+    def path(self, name: str) -> Optional[Path]:
+        """Path of a listed profile, None for any other name."""
+        if not PROFILE_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+
+def get_profile_store() -> ProfileStore:
+    return ProfileStore(
+        settings.PROFILER_DIR,
+        max_files=getattr(settings, "PROFILER_MAX_FILES", 200),
+        max_bytes=getattr(settings, "PROFILER_MAX_BYTES", 50 << 20),
+    )
+
+
+class RequestProfile:
+    """Sampler of one request, started only if a profiling slot is free."""
+
+    def __init__(self, trigger: str) -> None:
+        self.trigger = trigger
+        self.started = time.perf_counter()
+        self.sampler = StackSampler(
+            interval=getattr(settings, "PROFILER_INTERVAL_MS", 5) / 1000,
+            max_samples=getattr(settings, "PROFILER_MAX_SAMPLES", 6000),
+        )
+
+    @classmethod
+    def start(cls, trigger: str) -> Optional["RequestProfile"]:
+        if not _running.acquire(blocking=False):
+            return None
+        profile = cls(trigger)
+        profile.sampler.start()
+        return profile
+
+    def stop(self) -> float:
+        """Stop sampling, return the profiled duration in seconds."""
+        try:
+            self.sampler.stop()
+        finally:
+            _running.release()
+        return time.perf_counter() - self.started
@@ -0,0 +1,247 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from django.db import transaction
+
+from production.calculations import PrintQueueSummary
+from production.models import Material, Order, PrintQueue, Workplace
+from production.scheduling import schedule_queues
+
+# Queues filled below this share of the winding are merged into others.
+MERGE_BELOW = 0.5
+
+
+def order_key(order: Order) -> tuple:
+    return order.creation_time, order.pk
+
+
+@dataclass
+class QueuePlan:
+    """Orders of one queue, `queue_id` is None for a queue to create."""
+
+    queue_id: Optional[int]
+    orders: list[Order] = field(default_factory=list)
+
+    @property
+    def area(self) -> float:
+        return sum(order.square_meters for order in self.orders)
+
+    @property
+    def tiles(self) -> int:
+        return sum(order.tiles_count for order in self.orders)
+
+
+@dataclass
+class RebalancePlan:
+    """
+    RebalancePlan:
+    - Ready print queues of one workplace and material
+      before and after rebalancing, oldest queue first.
+    - Summaries are those of the print queue forms.
+    """
+
+    material: Material
+    before: list[QueuePlan]
+    after: list[QueuePlan]
+
+    @property
+    def moves(self) -> dict[int, Optional[int]]:
+        """{order id: index of its queue in `after`} of the moved orders."""
+        queues = {
+            order.pk: queue.queue_id for queue in self.before for order in queue.orders
+        }
+        return {
+            order.pk: index
+            for index, queue in enumerate(self.after)
+            for order in queue.orders
+            if queue.queue_id is None or queues[order.pk] != queue.queue_id
+        }
+
+    @property
+    def removed(self) -> list[int]:
+        kept = {queue.queue_id for queue in self.after}
+        return [queue.queue_id for queue in self.before if queue.queue_id not in kept]
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.moves)
+
+    def summaries(self, queues: Iterable[QueuePlan]) -> list[dict]:
+        return [
+            {
+                "queue": queue.queue_id,
+                "orders": len(queue.orders),
+                **PrintQueueSummary(queue.orders, self.material).as_dict(),
+            }
+            for queue in queues
+        ]
+
+    def as_dict(self) -> dict:
+        return {
+            "material": self.material.name,
+            "moved_orders": len(self.moves),
+            "removed_queues": self.removed,
+            "new_queues": sum(queue.queue_id is None for queue in self.after),
+            "queues": {
+                "before": self.summaries(self.before),
+                "after": self.summaries(self.after),
+            },
+        }
+
+
+def first_fit(
+    order: Order, queues: Iterable[QueuePlan], winding: float
+) -> Optional[QueuePlan]:
+    area = order.square_meters
+    for queue in queues:
+        if queue.area + area <= winding:
+            return queue
+    return None
+
+
+def plan_material(material: Material, before: list[QueuePlan]) -> RebalancePlan:
+    """
+    Plan the queues of one material:
+    - split: a queue keeps its oldest orders fitting the winding,
+      the rest are placed in other queues with room, oldest order first,
+      or in new queues;
+    - merge: the newest queues filled below `MERGE_BELOW` of the winding
+      are emptied into older ones if all their orders fit;
+    - tiles: two queues with odd tile counts are made even by moving
+      an order with an odd tile count from one to the other, if it fits.
+    An order larger than the winding stays alone in its queue.
+    """
+    winding = material.winding
+    after = [QueuePlan(queue.queue_id) for queue in before]
+    overflow = []
+    for source, target in zip(before, after):
+        for order in sorted(source.orders, key=order_key):
+            if not target.orders or target.area + order.square_meters <= winding:
+                target.orders.append(order)
+            else:
+                overflow.append(order)
+
+    for index in reversed(range(len(after))):
+        queue = after[index]
+        if not queue.orders or queue.area >= winding * MERGE_BELOW:
+            continue
+        # Only older queues receive the orders, the oldest queue survives.
+        others = [other for other in after[:index] if other.orders]
+        placed = []
+        for order in sorted(queue.orders, key=order_key):
+            target = first_fit(order, others, winding)
+            if target is None:
+                break
+            target.orders.append(order)
+            placed.append((target, order))
+        if len(placed) == len(queue.orders):
+            queue.orders = []
+        else:
+            for target, order in placed:
+                target.orders.remove(order)
+
+    after = [queue for queue in after if queue.orders]
+    for order in sorted(overflow, key=order_key):
+        target = first_fit(order, after, winding)
+        if target is None:
+            target = QueuePlan(None)
+            after.append(target)
+        target.orders.append(order)
+
+    odd = [queue for queue in after if queue.tiles % 2]
+    while len(odd) > 1:
+        queue = odd.pop(0)
+        for other in odd:
+            order = next(
+                (
+                    order
+                    for order in sorted(other.orders, key=order_key, reverse=True)
+                    if order.tiles_count % 2
+                    and queue.area + order.square_meters <= winding
+                ),
+                None,
+            )
+            if order is not None:
+                other.orders.remove(order)
+                queue.orders.append(order)
+                odd.remove(other)
+                break
+
+    for queue in after:
+        queue.orders.sort(key=order_key)
+    return RebalancePlan(material, before, [queue for queue in after if queue.orders])
+
+
+def rebalance_workplace(
+    workplace: Workplace,
+    materials: Optional[Iterable[int]] = None,
+    apply: bool = False,
+    by=None,
+) -> list[RebalancePlan]:
+    """
+    Plan the ready print queues of the workplace per material (optionally
+    of some materials only), with four queries. Without `apply` nothing
+    is written, it is the preview. With `apply` the queues are locked
+    and the plans are written in one transaction: new queues are created,
+    orders are moved with one UPDATE per target queue and emptied queues
+    are deleted with one DELETE. New queues are scheduled on printers.
+    """
+    queues = PrintQueue.objects.filter(
+        workplace=workplace, status=PrintQueue.READY_TO_PRINT
+    )
+    if materials is not None:
+        queues = queues.filter(material_id__in=list(materials))
+    with transaction.atomic():
+        if apply:
+            queues = queues.select_for_update()
+        queue_rows = list(
+            queues.order_by("creation_time", "id").values_list("pk", "material_id")
+        )
+        orders = defaultdict(list)
+        for order in Order.objects.select_related("material").filter(
+            print_queue_id__in=[pk for pk, _ in queue_rows]
+        ):
+            orders[order.print_queue_id].append(order)
+        material_objects = Material.objects.in_bulk(
+            {material_id for _, material_id in queue_rows}
+        )
+        groups = defaultdict(list)
+        for pk, material_id in queue_rows:
+            groups[material_id].append(QueuePlan(pk, orders[pk]))
+        plans = [
+            plan_material(material_objects[material_id], before)
+            for material_id, before in groups.items()
+        ]
+        if apply:
+            new_queues = []
+            for plan in plans:
+                new_queues += apply_plan(workplace, plan, by)
+            if new_queues:
+                schedule_queues(new_queues)
+    return plans
+
+
+def apply_plan(workplace: Workplace, plan: RebalancePlan, by=None) -> list[int]:
+    """Write the plan, returns ids of the created queues."""
+    if not plan.changed:
+        return []
+    created = []
+    queue_ids = []
+    for queue in plan.after:
+        if queue.queue_id is None:
+            new_queue = PrintQueue(material=plan.material, workplace=workplace)
+            new_queue.changed_by = by
+            new_queue.save()
+            created.append(new_queue.pk)
+            queue_ids.append(new_queue.pk)
+        else:
+            queue_ids.append(queue.queue_id)
+    targets = defaultdict(list)
+    for order_id, index in plan.moves.items():
+        targets[queue_ids[index]].append(order_id)
+    for queue_id, order_ids in targets.items():
+        Order.objects.filter(pk__in=order_ids).update(print_queue_id=queue_id)
+    if plan.removed:
+        PrintQueue.objects.filter(pk__in=plan.removed).delete()
+    return created
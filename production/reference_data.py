@@ -0,0 +1,87 @@
+from threading import Lock
+from typing import Optional, Type
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import models
+
+from production.metrics import cache_requests
+from production.versioning import SharedVersion
+
+REFERENCE_MODELS = [
+    "production.Material",
+    "production.Workplace",
+    "production.Printer",
+]
+
+
+class ReferenceData:
+    """
+    ReferenceData:
+    - Versioned cache of (pk, label) choices of a small reference table.
+    - Choices are kept in the shared cache under the current version
+      and in a local copy of the process, so rendering
+      a choice list does not hit the database.
+    - Saving or deleting an object bumps the version in every process.
+    """
+
+    def __init__(self, model: Type[models.Model]) -> None:
+        self.model = model
+        self.version = SharedVersion(f"reference_data:{model._meta.label_lower}")
+        self._local: Optional[tuple[str, list[tuple[int, str]]]] = None
+        self._lock = Lock()
+
+    def data_key(self, version: str) -> str:
+        return f"wallis:reference_data:{self.model._meta.label_lower}:{version}"
+
+    def build_choices(self) -> list[tuple[int, str]]:
+        return [(obj.pk, str(obj)) for obj in self.model._default_manager.all()]
+
+    def choices(self) -> list[tuple[int, str]]:
+        version = self.version.get()
+        local = self._local
+        if local is not None and local[0] == version:
+            cache_requests.inc(cache="reference_data", result="hit")
+            return local[1]
+        with self._lock:
+            choices = cache.get(self.data_key(version))
+            if choices is None:
+                cache_requests.inc(cache="reference_data", result="miss")
+                choices = self.build_choices()
+                cache.set(self.data_key(version), choices, timeout=None)
+            else:
+                cache_requests.inc(cache="reference_data", result="hit")
+            self._local = (version, choices)
+        return choices
+
+    def labels(self) -> dict[int, str]:
+        return dict(self.choices())
+
+    def invalidate(self) -> None:
+        self._local = None
+        self.version.invalidate()
+
+
+_registry: dict[Type[models.Model], ReferenceData] = {}
+
+
+def is_reference_model(model: Type[models.Model]) -> bool:
+    return model._meta.label in REFERENCE_MODELS
+
+
+def get_reference_data(model: Type[models.Model] | str) -> ReferenceData:
+    if isinstance(model, str):
+        model = apps.get_model(model)
+    model = model._meta.concrete_model
+    if model not in _registry:
+        _registry[model] = ReferenceData(model)
+    return _registry[model]
+
+
+def reference_choices(model_label: str):
+    """Return callable choices for ChoiceField/ChoiceFilter."""
+
+    def choices() -> list[tuple[int, str]]:
+        return get_reference_data(model_label).choices()
+
+    return choices
@@ -0,0 +1,251 @@
+import math
+import statistics
+import time
+from html import escape
+from typing import Callable, Iterable, Optional
+
+from django.test import Client
+from django.urls import reverse
+
+from production.memory import MemoryProfile
+from production.models import Material, Order, Printer, PrintQueue, Worker, Workplace
+from production.synthetic import SyntheticDataGenerator, clear_production_data
+from production.timing import RequestTiming
+from production.urls import urlpatterns
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# Model of the `pk` URL argument by URL name prefix, the longest prefix wins.
+PK_MODELS = {
+    "worker": Worker,
+    "workplace": Workplace,
+    "material": Material,
+    "printer": Printer,
+    "print-queue-create": Workplace,
+    "print-queue": PrintQueue,
+    "order": Order,
+}
+
+# Actions redirecting instead of rendering a page.
+SKIPPED_URL_NAMES = {"change-order-status"}
+
+
+def growth_exponent(sizes: list[int], values: list[float]) -> Optional[float]:
+    """
+    Slope of the least squares line through (log size, log value):
+    ~0 for pages independent of the table size, ~1 for linear growth.
+    """
+    points = [
+        (math.log(size), math.log(max(value, 1e-9)))
+        for size, value in zip(sizes, values)
+        if size > 0
+    ]
+    if len(points) < 2:
+        return None
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return None
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+    return round(slope, 2)
+
+
+def page_urls(url_names: Optional[Iterable[str]] = None) -> dict[str, str]:
+    """URL of every page of `production/urls.py` on the current data."""
+    urls = {}
+    for pattern in urlpatterns:
+        if pattern.name in SKIPPED_URL_NAMES:
+            continue
+        name = f"production:{pattern.name}"
+        if url_names and name not in url_names:
+            continue
+        if "pk" not in pattern.pattern.converters:
+            urls[name] = reverse(name)
+            continue
+        prefix = max(
+            (prefix for prefix in PK_MODELS if pattern.name.startswith(prefix)),
+            key=len,
+        )
+        instance = PK_MODELS[prefix].objects.order_by("pk").first()
+        if instance is not None:
+            urls[name] = reverse(name, kwargs={"pk": instance.pk})
+    return urls
+
+
+class ScaleCurve:
+    """
+    ScaleCurve:
+    - Regenerates the production data with `SyntheticDataGenerator`
+      for every size (number of orders) and renders every page.
+    - Records median latency, query count and tracemalloc peak
+      of every page at every size.
+    - Growth exponents tell which pages are O(1) in the table size.
+    """
+
+    def __init__(
+        self,
+        user: Worker,
+        sizes: Iterable[int] = SIZES,
+        url_names: Optional[Iterable[str]] = None,
+        repeat: int = 3,
+        seed: int = 1,
+        host: str = "localhost",
+        log: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.user = user
+        self.sizes = sorted(sizes)
+        self.url_names = set(url_names) if url_names else None
+        self.repeat = repeat
+        self.seed = seed
+        self.host = host
+        self.log = log or (lambda message: None)
+        self.results: dict[str, dict[int, dict]] = {}
+
+    def load(self, size: int) -> None:
+        started = time.perf_counter()
+        clear_production_data()
+        SyntheticDataGenerator(
+            seed=self.seed, orders=size, queues=max(size // 20, 1)
+        ).generate()
+        self.log(f"{size} orders generated in {time.perf_counter() - started:.1f}s")
+
+    def measure_page(self, client: Client, url: str) -> dict:
+        client.get(url)  # warm up templates and caches
+        timings = []
+        for _ in range(self.repeat):
+            timing = RequestTiming()
+            with timing.instrument():
+                response = client.get(url)
+            timings.append(timing)
+        with MemoryProfile(top=0).measure() as memory:
+            client.get(url)
+        return {
+            "status": response.status_code,
+            "latency_ms": round(
+                statistics.median(timing.total_time for timing in timings) * 1000, 2
+            ),
+            "db_ms": round(
+                statistics.median(timing.db_time for timing in timings) * 1000, 2
+            ),
+            "queries": timings[-1].db_queries,
+            "peak_kib": round(memory.peak / 1024, 1),
+        }
+
+    def run(self) -> dict[str, dict[int, dict]]:
+        for size in self.sizes:
+            self.load(size)
+            # The address is outside INTERNAL_IPS, so the debug toolbar is not rendered.
+            client = Client(HTTP_HOST=self.host, REMOTE_ADDR="192.0.2.1")
+            client.force_login(self.user)
+            for url_name, url in page_urls(self.url_names).items():
+                stats = self.measure_page(client, url)
+                self.results.setdefault(url_name, {})[size] = stats
+                self.log(
+                    f"{size} {url_name}: {stats['latency_ms']}ms, "
+                    f"{stats['queries']} queries, {stats['peak_kib']} KiB"
+                )
+        return self.results
+
+    def exponents(self) -> dict[str, dict[str, Optional[float]]]:
+        exponents = {}
+        for url_name, by_size in self.results.items():
+            sizes = sorted(by_size)
+            exponents[url_name] = {
+                metric: growth_exponent(
+                    sizes, [by_size[size][metric] for size in sizes]
+                )
+                for metric in ("latency_ms", "queries", "peak_kib")
+            }
+        return exponents
+
+    def as_dict(self) -> dict:
+        return {
+            "sizes": self.sizes,
+            "pages": {
+                url_name: {str(size): stats for size, stats in by_size.items()}
+                for url_name, by_size in self.results.items()
+            },
+            "exponents": self.exponents(),
+        }
+
+
+def format_exponent(exponent: Optional[float]) -> str:
+    return "-" if exponent is None else f"{exponent:+.2f}"
+
+
+def format_table(curve: ScaleCurve) -> str:
+    size_columns = "".join(f"{size:>12}" for size in curve.sizes)
+    header = f"{'page':<36}{size_columns} {'ms exp':>7} {'sql exp':>7} {'mem exp':>7}"
+    lines = ["Median latency (ms) by orders, growth exponents:", header]
+    lines.append("-" * len(header))
+    exponents = curve.exponents()
+    for url_name, by_size in curve.results.items():
+        values = "".join(
+            f"{by_size[size]['latency_ms'] if size in by_size else '-':>12}"
+            for size in curve.sizes
+        )
+        page = exponents[url_name]
+        lines.append(
+            f"{url_name:<36}{values}"
+            f" {format_exponent(page['latency_ms']):>7}"
+            f" {format_exponent(page['queries']):>7}"
+            f" {format_exponent(page['peak_kib']):>7}"
+        )
+    return "\n".join(lines)
+
+
+def svg_chart(url_name: str, by_size: dict[int, dict], width=360, height=200) -> str:
+    """Log-log chart of latency by number of orders."""
+    sizes = sorted(by_size)
+    values = [max(by_size[size]["latency_ms"], 0.01) for size in sizes]
+    x_min, x_max = math.log10(sizes[0]), math.log10(sizes[-1])
+    y_min, y_max = math.log10(min(values)), math.log10(max(values))
+    x_span, y_span = (x_max - x_min) or 1, (y_max - y_min) or 1
+    margin = 40
+
+    def point(size, value):
+        x = margin + (math.log10(size) - x_min) / x_span * (width - 2 * margin)
+        y = (
+            height
+            - margin
+            - (math.log10(value) - y_min) / y_span * (height - 2 * margin)
+        )
+        return round(x, 1), round(y, 1)
+
+    points = [point(size, value) for size, value in zip(sizes, values)]
+    labels = "".join(
+        f'<circle cx="{x}" cy="{y}" r="3"/>'
+        f'<text x="{x}" y="{y - 8}" text-anchor="middle">{value}ms</text>'
+        f'<text x="{x}" y="{height - margin + 16}" text-anchor="middle">{size}</text>'
+        for (x, y), size, value in zip(points, sizes, values)
+    )
+    polyline = " ".join(f"{x},{y}" for x, y in points)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-size="10" font-family="sans-serif">'
+        f'<text x="{margin}" y="14" font-size="12">{escape(url_name)}</text>'
+        f'<polyline points="{polyline}" fill="none" stroke="#4caf50" '
+        f'stroke-width="2"/>{labels}</svg>'
+    )
+
+
+def render_html(curve: ScaleCurve) -> str:
+    exponents = curve.exponents()
+    sections = []
+    for url_name, by_size in curve.results.items():
+        page = exponents[url_name]
+        sections.append(
+            f"<section><h2>{escape(url_name)}</h2>"
+            f"<p>Growth exponents: latency {format_exponent(page['latency_ms'])}, "
+            f"queries {format_exponent(page['queries'])}, "
+            f"memory {format_exponent(page['peak_kib'])}</p>"
+            f"{svg_chart(url_name, by_size)}</section>"
+        )
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        "<title>Scale curve</title></head><body><h1>Scale curve</h1>"
+        "<p>Median latency by number of orders (log-log).</p>"
+        + "".join(sections)
+        + "</body></html>"
+    )
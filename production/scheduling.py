@@ -0,0 +1,451 @@
+import heapq
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import F, Q, QuerySet, Sum
+
+from production.capabilities import CapabilityIndex, get_capability_index
+from production.models import Material, Order, Printer, PrintQueue, StatusEvent
+from production.reference_data import get_reference_data
+from production.utils import batched
+
+# Queues keep their printer busy until they are done.
+SCHEDULED_STATUSES = (
+    PrintQueue.READY_TO_PRINT,
+    PrintQueue.IN_PROGRESS,
+    PrintQueue.PROBLEM,
+)
+HOUR = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+
+class PrinterSchedule:
+    """
+    PrinterSchedule:
+    - Estimated print time (seconds) of the unfinished queues of every
+      active printer, the area of a queue divided by the printer speed.
+    - A heap of (load, printer) per (material, workplace) returns the least
+      loaded printer able to print a queue in O(log n), entries made stale
+      by a later change of the load are dropped when they reach the top.
+      The heap of (material, None) holds the printers of every workplace.
+    - Loads are read with one aggregate query and then kept up to date
+      by `add`/`remove`, planning many queues does not recompute them.
+    """
+
+    def __init__(
+        self,
+        speeds: dict[int, float],
+        loads: dict[int, float],
+        index: CapabilityIndex,
+    ) -> None:
+        self.speeds = speeds
+        self.loads = {printer_id: loads.get(printer_id, 0.0) for printer_id in speeds}
+        self.heaps: dict[tuple[int, Optional[int]], list] = defaultdict(list)
+        self.keys: dict[int, list[tuple[int, Optional[int]]]] = {}
+        for printer_id in speeds:
+            workplace_id = index.printer_workplace.get(printer_id)
+            self.keys[printer_id] = []
+            if workplace_id is None:
+                # Queues belong to workplaces, printers without one get none.
+                continue
+            for material_id in index.printer_materials.get(printer_id, ()):
+                self.keys[printer_id] += [
+                    (material_id, workplace_id),
+                    (material_id, None),
+                ]
+            self.push(printer_id)
+
+    @classmethod
+    def build(
+        cls,
+        printer_ids: Optional[Iterable[int]] = None,
+        statuses: Iterable[str] = SCHEDULED_STATUSES,
+    ) -> "PrinterSchedule":
+        """
+        Schedule of the active printers (all or the given ones)
+        loaded with their queues in the statuses.
+        """
+        printers = Printer.objects.filter(status=Printer.ACTIVE)
+        if printer_ids is not None:
+            printer_ids = list(printer_ids)
+            printers = printers.filter(pk__in=printer_ids)
+        speeds = dict(printers.values_list("pk", "speed"))
+        areas = printer_areas(printer_ids, statuses)
+        loads = {
+            printer_id: area / speeds[printer_id] * HOUR
+            for printer_id, area in areas.items()
+            if printer_id in speeds
+        }
+        return cls(speeds, loads, get_capability_index())
+
+    def push(self, printer_id: int) -> None:
+        entry = (self.loads[printer_id], printer_id)
+        for key in self.keys[printer_id]:
+            heapq.heappush(self.heaps[key], entry)
+
+    def estimate(self, printer_id: int, area: float) -> float:
+        """Seconds the printer needs to print the area (m²)."""
+        return area / self.speeds[printer_id] * HOUR
+
+    def add(self, printer_id: int, area: float) -> None:
+        self.loads[printer_id] += self.estimate(printer_id, area)
+        self.push(printer_id)
+
+    def remove(self, printer_id: int, area: float) -> None:
+        self.loads[printer_id] = max(
+            self.loads[printer_id] - self.estimate(printer_id, area), 0.0
+        )
+        self.push(printer_id)
+
+    def least_loaded(
+        self, material_id: int, workplace_id: Optional[int]
+    ) -> Optional[int]:
+        heap = self.heaps.get((material_id, workplace_id))
+        while heap:
+            load, printer_id = heap[0]
+            if load == self.loads[printer_id]:
+                return printer_id
+            heapq.heappop(heap)
+        return None
+
+    def assign(
+        self, material_id: int, workplace_id: Optional[int], area: float
+    ) -> Optional[int]:
+        """
+        Put the queue on the least loaded printer of the workplace
+        (of any workplace if it is None) supporting the material,
+        None if there is no such printer.
+        """
+        printer_id = self.least_loaded(material_id, workplace_id)
+        if printer_id is not None:
+            self.add(printer_id, area)
+        return printer_id
+
+
+def queue_areas(queues: QuerySet) -> dict[int, float]:
+    """Area (m²) of the orders of the print queues, one aggregate query."""
+    rows = (
+        Order.objects.filter(print_queue__in=queues)
+        .values("print_queue_id")
+        .annotate(area=Sum(F("width") * F("height")))
+        .order_by()
+    )
+    return {row["print_queue_id"]: (row["area"] or 0) / 10000 for row in rows}
+
+
+def printer_areas(
+    printer_ids: Optional[Iterable[int]] = None,
+    statuses: Iterable[str] = SCHEDULED_STATUSES,
+) -> dict[int, float]:
+    """Area (m²) of the orders in queues of the printers, one aggregate query."""
+    orders = Order.objects.filter(
+        print_queue__status__in=list(statuses), print_queue__printer__isnull=False
+    )
+    if printer_ids is not None:
+        orders = orders.filter(print_queue__printer_id__in=list(printer_ids))
+    rows = (
+        orders.values("print_queue__printer_id")
+        .annotate(area=Sum(F("width") * F("height")))
+        .order_by()
+    )
+    return {row["print_queue__printer_id"]: (row["area"] or 0) / 10000 for row in rows}
+
+
+def save_assignments(
+    assignments: dict[int, int],
+    workplaces: Optional[dict[int, int]] = None,
+    batch_size: int = 1000,
+) -> None:
+    """
+    Write {queue id: printer id} and moves of queues to other
+    {queue id: workplace id} with one UPDATE per target and batch.
+    """
+    workplaces = workplaces or {}
+    queues = defaultdict(list)
+    for queue_id, printer_id in assignments.items():
+        queues[printer_id, workplaces.get(queue_id)].append(queue_id)
+    for (printer_id, workplace_id), queue_ids in queues.items():
+        fields = {"printer_id": printer_id}
+        if workplace_id is not None:
+            fields["workplace_id"] = workplace_id
+        for batch in batched(queue_ids, batch_size):
+            PrintQueue.objects.filter(pk__in=batch).update(**fields)
+
+
+def assign_queues(
+    schedule: PrinterSchedule, rows: Iterable[tuple], areas: dict[int, float]
+) -> dict[int, int]:
+    """
+    Assign (pk, material_id, workplace_id, printer_id) rows in their order.
+    Returns {queue id: printer id} of the queues whose printer changed.
+    """
+    assignments = {}
+    for pk, material_id, workplace_id, printer_id in rows:
+        new_printer_id = schedule.assign(material_id, workplace_id, areas.get(pk, 0))
+        if new_printer_id is not None and new_printer_id != printer_id:
+            assignments[pk] = new_printer_id
+    return assignments
+
+
+def plan_queues(replan: bool = False) -> dict[int, int]:
+    """
+    Assign ready print queues without a printer, oldest first,
+    to the least loaded active printer of their workplace supporting
+    their material.
+    With `replan` assigned ready queues are planned again as well,
+    queues in progress or with a problem keep their printer.
+    Returns {queue id: printer id} of the changed queues.
+    """
+    queues = PrintQueue.objects.filter(status=PrintQueue.READY_TO_PRINT)
+    statuses = SCHEDULED_STATUSES
+    if replan:
+        statuses = (PrintQueue.IN_PROGRESS, PrintQueue.PROBLEM)
+    else:
+        queues = queues.filter(printer__isnull=True)
+    with transaction.atomic():
+        rows = list(
+            queues.select_for_update()
+            .order_by("creation_time", "id")
+            .values_list("pk", "material_id", "workplace_id", "printer_id")
+        )
+        if not rows:
+            return {}
+        schedule = PrinterSchedule.build(statuses=statuses)
+        assignments = assign_queues(schedule, rows, queue_areas(queues))
+        save_assignments(assignments)
+    return assignments
+
+
+def schedule_queues(queue_ids: Iterable[int]) -> dict[int, int]:
+    """
+    Assign the given ready queues without a printer, e.g. after orders
+    were added to them. Only the printers able to print them are read,
+    the cost does not grow with the number of printers and queues.
+    """
+    queues = PrintQueue.objects.filter(
+        pk__in=list(queue_ids),
+        status=PrintQueue.READY_TO_PRINT,
+        printer__isnull=True,
+    )
+    with transaction.atomic():
+        rows = list(
+            queues.select_for_update()
+            .order_by("creation_time", "id")
+            .values_list("pk", "material_id", "workplace_id", "printer_id")
+        )
+        index = get_capability_index()
+        printer_ids = set()
+        for _, material_id, workplace_id, _ in rows:
+            printer_ids |= index.printers_for_material(material_id, workplace_id)
+        if not printer_ids:
+            return {}
+        schedule = PrinterSchedule.build(printer_ids)
+        assignments = assign_queues(schedule, rows, queue_areas(queues))
+        save_assignments(assignments)
+    return assignments
+
+
+def rebalance_printer(printer_id: int) -> dict[int, int]:
+    """
+    Move ready queues to the printer, e.g. after it finished a queue,
+    from the most loaded printers of its workplace sharing a material
+    while that makes the moved queue finish earlier.
+    The newest queue of a printer moves first, so older queues keep
+    their place. Only the neighbouring printers are read.
+    """
+    index = get_capability_index()
+    workplace_id = index.printer_workplace.get(printer_id)
+    if index.printer_status.get(printer_id) != Printer.ACTIVE or workplace_id is None:
+        return {}
+    materials = index.printer_materials[printer_id]
+    peers = set()
+    for material_id in materials:
+        peers |= index.printers_for_material(material_id, workplace_id)
+    peers.discard(printer_id)
+    if not peers:
+        return {}
+    queues = PrintQueue.objects.filter(
+        printer_id__in=peers,
+        status=PrintQueue.READY_TO_PRINT,
+        material_id__in=materials,
+        workplace_id=workplace_id,
+    )
+    with transaction.atomic():
+        rows = list(
+            queues.select_for_update()
+            .order_by("creation_time", "id")
+            .values_list("pk", "printer_id")
+        )
+        if not rows:
+            return {}
+        schedule = PrinterSchedule.build(peers | {printer_id})
+        areas = queue_areas(queues)
+        movable = defaultdict(list)
+        for pk, peer_id in rows:
+            if peer_id in schedule.loads:
+                movable[peer_id].append(pk)
+        heap = [(-schedule.loads[peer_id], peer_id) for peer_id in movable]
+        heapq.heapify(heap)
+        assignments = {}
+        while heap:
+            _, peer_id = heapq.heappop(heap)
+            pk = movable[peer_id][-1]
+            area = areas.get(pk, 0)
+            finish = schedule.loads[printer_id] + schedule.estimate(printer_id, area)
+            if finish >= schedule.loads[peer_id]:
+                continue
+            schedule.remove(peer_id, area)
+            schedule.add(printer_id, area)
+            assignments[movable[peer_id].pop()] = printer_id
+            if movable[peer_id]:
+                heapq.heappush(heap, (-schedule.loads[peer_id], peer_id))
+        save_assignments(assignments)
+    return assignments
+
+
+def rebalance_finished(transitions: Iterable[tuple]) -> None:
+    """Printers of print queues moved to done take work from their neighbours."""
+    printer_ids = {
+        event.printer_id
+        for event, _, _ in transitions
+        if event.kind == StatusEvent.PRINT_QUEUE
+        and event.to_status == PrintQueue.DONE
+        and event.printer_id is not None
+    }
+    for printer_id in sorted(printer_ids):
+        rebalance_printer(printer_id)
+
+
+@dataclass
+class Failover:
+    """
+    Failover:
+    - Summary of the ready queues moved away from a printer in maintenance.
+    - `moved` items are dicts of queue, printer and workplace ids,
+      `stranded` are ids of queues no active printer can print.
+    """
+
+    printer_id: int
+    moved: list[dict] = field(default_factory=list)
+    stranded: list[int] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.moved or self.stranded)
+
+    def __str__(self) -> str:
+        other_workplace = sum(
+            item["from_workplace"] != item["to_workplace"] for item in self.moved
+        )
+        text = (
+            f"Printer {self.printer_id} is in maintenance: "
+            f"{len(self.moved)} print queues moved, "
+            f"{other_workplace} of them to other workplaces"
+        )
+        if self.stranded:
+            text += f", {len(self.stranded)} have no active printer: " + ", ".join(
+                f"#{pk}" for pk in self.stranded
+            )
+        return text + "."
+
+
+def fail_over_printer(printer: Printer) -> Failover:
+    """
+    Move the ready queues of a printer that is not active, and the ready
+    queues without a printer of its workplace that no active printer there
+    supports any more, in one transaction.
+    A queue goes to the least loaded printer of its workplace able to print
+    it, otherwise of any workplace, together with its workplace.
+    The summary is logged to `production.scheduling`.
+    """
+    summary = Failover(printer.pk)
+    if printer.is_active:
+        return summary
+    index = get_capability_index()
+    lookup = Q(printer_id=printer.pk)
+    if printer.workplace_id is not None:
+        lookup |= Q(printer__isnull=True, workplace_id=printer.workplace_id) & ~Q(
+            material_id__in=index.materials_for_workplace(printer.workplace_id)
+        )
+    queues = PrintQueue.objects.filter(lookup, status=PrintQueue.READY_TO_PRINT)
+    with transaction.atomic():
+        rows = list(
+            queues.select_for_update()
+            .order_by("creation_time", "id")
+            .values_list("pk", "material_id", "workplace_id")
+        )
+        if not rows:
+            return summary
+        printer_ids = set()
+        for material_id in {material_id for _, material_id, _ in rows}:
+            printer_ids |= index.printers_for_material(material_id)
+        schedule = PrinterSchedule.build(printer_ids)
+        areas = queue_areas(queues)
+        assignments = {}
+        workplaces = {}
+        for pk, material_id, workplace_id in rows:
+            area = areas.get(pk, 0)
+            printer_id = schedule.assign(material_id, workplace_id, area)
+            if printer_id is None:
+                printer_id = schedule.assign(material_id, None, area)
+            if printer_id is None:
+                summary.stranded.append(pk)
+                continue
+            assignments[pk] = printer_id
+            to_workplace = index.printer_workplace[printer_id]
+            if to_workplace != workplace_id:
+                workplaces[pk] = to_workplace
+            summary.moved.append(
+                {
+                    "queue": pk,
+                    "to_printer": printer_id,
+                    "from_workplace": workplace_id,
+                    "to_workplace": to_workplace,
+                }
+            )
+        save_assignments(assignments, workplaces)
+    logger.warning("%s", summary)
+    return summary
+
+
+def printer_plan(printer: Printer) -> dict:
+    """
+    Unfinished queues of the printer in print order, queues in progress
+    first, with the estimated start and finish in hours from now.
+    """
+    rows = (
+        PrintQueue.objects.filter(printer=printer, status__in=SCHEDULED_STATUSES)
+        .values("pk", "status", "creation_time", "material_id")
+        .annotate(area=Sum(F("orders__width") * F("orders__height")))
+        .order_by()
+    )
+    rows = sorted(
+        rows,
+        key=lambda row: (
+            row["status"] != PrintQueue.IN_PROGRESS,
+            row["creation_time"],
+            row["pk"],
+        ),
+    )
+    materials = get_reference_data(Material).labels()
+    statuses = dict(PrintQueue.STATUS_CHOICES)
+    queues = []
+    hours = 0.0
+    for row in rows:
+        area = (row["area"] or 0) / 10000
+        start = hours
+        hours += area / printer.speed
+        queues.append(
+            {
+                "id": row["pk"],
+                "status": statuses[row["status"]],
+                "material": materials.get(row["material_id"]),
+                "area": round(area, 2),
+                "start_hours": round(start, 2),
+                "finish_hours": round(hours, 2),
+            }
+        )
+    return {"queues": queues, "load_hours": round(hours, 2)}
@@ -1,8 +1,21 @@
 from typing import Type, Any
-from django.db import models
+from django.db import connection, models
 from django.db.models import Q, QuerySet
+from django.dispatch import Signal
 
-from production.status_objects import PrintStatusMixin, PrinterStatusMixin
+from production.capabilities import get_capability_index, ids_of
+from production.status_objects import PrintStatusMixin
+
+
+# Sent after `set_remove_foreign_by_cleaned_data_and_instance`
+# updated ForeignKeys with queryset updates, which send no model signals.
+# Arguments: sender (updated model), objects, field_name.
+related_bulk_updated = Signal()
+
+# Sent in the transaction of status transitions logged by `StatusHistoryMixin`.
+# Arguments: sender (model), transitions: list of
+# (StatusEvent, creation_time, material_id) of the changed objects.
+status_changed = Signal()
 
 
 def model_name_to_field(model: Type[models.Model] | models.Model) -> str:
@@ -30,6 +43,66 @@ def filter_queryset_by_instance(
     return queryset.filter(**instance_none)
 
 
+class ClaimConflict(Exception):
+    """
+    ClaimConflict:
+    - Raised when some of the selected objects were given to another
+      instance after the form was shown, or are being given right now.
+    - Raised inside the transaction of the save, which is rolled back.
+    """
+
+    def __init__(self, model: Type[models.Model], instance: models.Model, count: int):
+        self.model = model
+        self.instance = instance
+        self.count = count
+        super().__init__(
+            f"{count} of the selected {model._meta.verbose_name_plural} "
+            f"were just taken by another {instance._meta.verbose_name}, "
+            "please select them again."
+        )
+
+
+def claim_related(
+    model_to_update: Type[models.Model],
+    objects: list[models.Model],
+    instance: models.Model,
+) -> None:
+    """
+    Set the ForeignKey of the objects to the instance with one conditional
+    UPDATE, only where it is still NULL. Rows locked by a concurrent claim
+    are skipped (`SELECT ... FOR UPDATE SKIP LOCKED`) instead of waited for.
+    SQLite has no row locks and one writer at a time, there the conditional
+    UPDATE alone is atomic. Raises `ClaimConflict` if any object was not free.
+    """
+    if not objects:
+        return
+    instance_name = model_name_to_field(instance)
+    free = model_to_update.objects.filter(
+        pk__in=[obj.pk for obj in objects], **{f"{instance_name}__isnull": True}
+    )
+    if connection.features.has_select_for_update_skip_locked:
+        free = model_to_update.objects.filter(
+            pk__in=free.select_for_update(skip_locked=True).values("pk")
+        )
+    claimed = free.update(**{instance_name: instance})
+    if claimed != len(objects):
+        raise ClaimConflict(model_to_update, instance, len(objects) - claimed)
+
+
+def release_related(
+    model_to_update: Type[models.Model],
+    objects: list[models.Model],
+    instance: models.Model,
+) -> None:
+    """Set the ForeignKey of the objects still pointing to the instance to NULL."""
+    if not objects:
+        return
+    instance_name = model_name_to_field(instance)
+    model_to_update.objects.filter(
+        pk__in=[obj.pk for obj in objects], **{instance_name: instance}
+    ).update(**{instance_name: None})
+
+
 def set_remove_foreign_by_cleaned_data_and_instance(
     model_to_update: Type[models.Model],
     cleaned_data: dict[str, QuerySet[models.Model]],
@@ -42,6 +115,9 @@ def set_remove_foreign_by_cleaned_data_and_instance(
     by checking which objects need to be added or removed.
     If the previously connected objects
     are not in the list of new objects, they will be disconnected.
+    New objects are claimed with `claim_related`, so an object taken
+    by another instance meanwhile raises `ClaimConflict` instead of
+    being silently moved.
     """
     target_related_name = model_to_plural_related_name(model_to_update)
     instance_name = model_name_to_field(instance)
@@ -53,25 +129,41 @@ def set_remove_foreign_by_cleaned_data_and_instance(
 
     exists_objects = getattr(instance, target_related_name).all()
 
-    to_update = []
-
-    for obj in exists_objects:
-        if obj not in new_objects:
-            setattr(obj, instance_name, None)
-            to_update.append(obj)
+    to_claim = [obj for obj in new_objects if obj not in exists_objects]
+    to_release = [obj for obj in exists_objects if obj not in new_objects]
 
-    for obj in new_objects:
-        if obj not in exists_objects:
-            setattr(obj, instance_name, instance)
-            to_update.append(obj)
+    claim_related(model_to_update, to_claim, instance)
+    release_related(model_to_update, to_release, instance)
 
-    model_to_update.objects.bulk_update(to_update, [instance_name])
+    for obj in to_claim:
+        setattr(obj, instance_name, instance)
+    for obj in to_release:
+        setattr(obj, instance_name, None)
+    to_update = to_release + to_claim
+    if to_update:
+        related_bulk_updated.send(
+            sender=model_to_update, objects=to_update, field_name=instance_name
+        )
 
 
 def filter_materials_by_printers(materials: QuerySet, printers: Any) -> QuerySet:
     return materials.filter(printers__in=printers).distinct()
 
 
+def filter_materials_by_workplace_active_printers(
+    materials: QuerySet,
+    workplace: Any,
+) -> QuerySet:
+    """
+    Filters materials supported by active printers of the workplace,
+    using the capability index instead of a many-to-many join.
+    """
+    material_ids = get_capability_index().materials_for_workplace(
+        getattr(workplace, "pk", workplace)
+    )
+    return materials.filter(pk__in=material_ids)
+
+
 def filter_orders_by_materials(
     orders: QuerySet,
     materials: QuerySet | list,
@@ -83,10 +175,14 @@ def filter_workplaces_by_active_printers_materials(
     workplaces: QuerySet,
     materials: QuerySet | list,
 ) -> QuerySet:
-    return workplaces.filter(
-        printers__materials__in=materials,
-        printers__status=PrinterStatusMixin.ACTIVE
-    ).distinct()
+    """
+    Filters workplaces that have an active printer supporting
+    any of the materials, using the capability index.
+    """
+    workplace_ids = get_capability_index().workplaces_for_materials(
+        ids_of(materials)
+    )
+    return workplaces.filter(pk__in=workplace_ids)
 
 
 def filter_orders_by_ready_or_problem_relative(
@@ -99,6 +195,25 @@ def filter_orders_by_ready_or_problem_relative(
     )
 
 
+def is_workplace_worker(user: Any, workplace: Any) -> bool:
+    """
+    Check workplace membership by the user's own `workplace_id`,
+    without loading workers of the workplace.
+    """
+    workplace_id = getattr(workplace, "pk", workplace)
+    return (
+        getattr(user, "is_authenticated", False)
+        and workplace_id is not None
+        and getattr(user, "workplace_id", None) == workplace_id
+    )
+
+
+def can_operate_workplace(user: Any, workplace: Any) -> bool:
+    return bool(getattr(user, "is_staff", False)) or is_workplace_worker(
+        user, workplace
+    )
+
+
 def get_week_time_scheme(week: list[int]) -> list[str]:
     week_days = [
         "Monday",
@@ -0,0 +1,104 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from production.analytics import record_transitions
+from production.inventory import post_queue_consumption
+from production.capabilities import (
+    invalidate_capability_index,
+    peek_capability_index,
+)
+from production.models import Material, Order, Printer, Workplace
+from production.reference_data import get_reference_data
+from production.scheduling import (
+    fail_over_printer,
+    rebalance_finished,
+    schedule_queues,
+)
+from production.services import related_bulk_updated, status_changed
+from production.slow_queries import install_slow_query_log
+
+
+@receiver(post_save, sender=Printer)
+def printer_saved(sender, instance, created, **kwargs):
+    index = peek_capability_index()
+    if index is None or (
+        index.knows_printer(instance.pk)
+        and not index.is_tracked(instance.pk, instance.status, instance.workplace_id)
+    ):
+        invalidate_capability_index()
+
+
+@receiver(post_save, sender=Printer)
+def printer_saved_fail_over(sender, instance, created, **kwargs):
+    # Only on the transition from active, in its own transaction
+    # once the status is committed.
+    if not created and instance.was_active and not instance.is_active:
+        transaction.on_commit(partial(fail_over_printer, instance))
+
+
+@receiver(post_delete, sender=Printer)
+def printer_deleted(sender, instance, **kwargs):
+    index = peek_capability_index()
+    if index is None or index.knows_printer(instance.pk):
+        invalidate_capability_index()
+
+
+@receiver(m2m_changed, sender=Printer.materials.through)
+def printer_materials_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_capability_index()
+
+
+@receiver(post_delete, sender=Material)
+@receiver(post_delete, sender=Workplace)
+def capability_related_deleted(sender, instance, **kwargs):
+    invalidate_capability_index()
+
+
+@receiver(related_bulk_updated, sender=Printer)
+def printers_bulk_updated(sender, objects, field_name, **kwargs):
+    index = peek_capability_index()
+    if index is None or any(index.knows_printer(printer.pk) for printer in objects):
+        invalidate_capability_index()
+
+
+@receiver(post_save, sender=Material)
+@receiver(post_save, sender=Workplace)
+@receiver(post_save, sender=Printer)
+@receiver(post_delete, sender=Material)
+@receiver(post_delete, sender=Workplace)
+@receiver(post_delete, sender=Printer)
+def reference_data_changed(sender, **kwargs):
+    get_reference_data(sender).invalidate()
+
+
+@receiver(connection_created)
+def database_connection_created(sender, connection, **kwargs):
+    install_slow_query_log(connection)
+
+
+@receiver(status_changed)
+def status_transitions_recorded(sender, transitions, **kwargs):
+    record_transitions(transitions)
+
+
+@receiver(status_changed)
+def status_transitions_consume_material(sender, transitions, **kwargs):
+    post_queue_consumption(transitions)
+
+
+@receiver(status_changed)
+def status_transitions_rebalance_printers(sender, transitions, **kwargs):
+    rebalance_finished(transitions)
+
+
+@receiver(related_bulk_updated, sender=Order)
+def orders_bulk_updated_schedule_queues(sender, objects, field_name, **kwargs):
+    if field_name == "print_queue":
+        queue_ids = {order.print_queue_id for order in objects if order.print_queue_id}
+        if queue_ids:
+            schedule_queues(queue_ids)
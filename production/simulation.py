@@ -0,0 +1,485 @@
+import heapq
+import random
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.utils import timezone
+
+from production.models import ArchivedOrder, Order, Printer, Workplace
+from production.synthetic import ORDER_HEIGHTS, ORDER_WIDTHS
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# Event kinds, in the order of the events of the same time.
+REPAIR, FAIL, DONE, RETURN, ARRIVAL, CHECK, SAMPLE = range(7)
+
+IDLE, BUSY, DOWN = range(3)
+
+
+@dataclass
+class SimulationConfig:
+    """
+    SimulationConfig:
+    - Horizon, random seed and the shop floor parameters of a run.
+    - A queue is built for an idle printer once the backlog of one of its
+      materials reaches `queue_area` m² or its oldest order waited
+      `max_wait_hours`.
+    - Printers fail after exponentially distributed running time
+      (`mtbf_hours` mean) and are repaired in `mttr_hours` on average.
+    - `problem_rate` of printed queues are problems, their orders
+      return to the backlog after `problem_hours`.
+    """
+
+    days: float = 7
+    seed: int = 1
+    arrival_scale: float = 1.0
+    queue_area: float = 20.0
+    max_wait_hours: float = 2.0
+    setup_minutes: float = 10.0
+    problem_rate: float = 0.02
+    problem_hours: float = 4.0
+    mtbf_hours: Optional[float] = 200.0
+    mttr_hours: float = 8.0
+
+
+class SimPrinter:
+    """Compact state of one printer, `job` holds (arrival, area) orders."""
+
+    __slots__ = (
+        "id",
+        "workplace_id",
+        "speed",
+        "materials",
+        "state",
+        "version",
+        "job",
+        "job_material",
+        "job_seconds",
+        "job_end",
+        "remaining",
+        "down_since",
+        "busy_seconds",
+        "down_seconds",
+        "queues",
+        "area",
+        "failures",
+    )
+
+    def __init__(
+        self, id: int, workplace_id: Optional[int], speed: float, materials: tuple
+    ) -> None:
+        self.id = id
+        self.workplace_id = workplace_id
+        self.speed = speed
+        self.materials = materials
+        self.state = IDLE
+        self.version = 0
+        self.job: list = []
+        self.job_material: Optional[int] = None
+        self.job_seconds = 0.0
+        self.job_end = 0.0
+        self.remaining = 0.0
+        self.down_since = 0.0
+        self.busy_seconds = 0.0
+        self.down_seconds = 0.0
+        self.queues = 0
+        self.area = 0.0
+        self.failures = 0
+
+
+class ShopFloorSimulation:
+    """
+    ShopFloorSimulation:
+    - Discrete-event model of order arrivals, queue building, printing,
+      printer failures and problem queues, driven by a heap of
+      (time, kind, sequence, payload) events.
+    - Orders are (arrival time, area m²) tuples in a backlog per material,
+      printers are `SimPrinter` slots, nothing else is kept per order,
+      so a simulated month takes seconds.
+    - `arrivals` are {material id: (orders per hour, areas to sample)}.
+    - Deterministic for the same printers, arrivals and config.
+    """
+
+    def __init__(
+        self,
+        printers: Iterable[dict],
+        arrivals: dict[int, tuple[float, list[float]]],
+        config: Optional[SimulationConfig] = None,
+    ) -> None:
+        printers = list(printers)
+        self.config = config or SimulationConfig()
+        self.random = random.Random(self.config.seed)
+        self.horizon = self.config.days * DAY
+        self.printers = [
+            SimPrinter(
+                printer["id"],
+                printer["workplace_id"],
+                printer["speed"],
+                tuple(sorted(printer["materials"])),
+            )
+            for printer in printers
+        ]
+        self.initially_down = [not printer["active"] for printer in printers]
+        self.arrivals = {
+            material_id: (rate * self.config.arrival_scale, areas)
+            for material_id, (rate, areas) in arrivals.items()
+            if rate > 0 and areas
+        }
+        self.material_printers: dict[int, list[SimPrinter]] = defaultdict(list)
+        for printer in self.printers:
+            for material_id in printer.materials:
+                self.material_printers[material_id].append(printer)
+        self.backlog: dict[int, deque] = defaultdict(deque)
+        self.backlog_area: dict[int, float] = defaultdict(float)
+        self.events: list = []
+        self.sequence = 0
+        self.processed = 0
+        self.now = 0.0
+        self.arrived = 0
+        self.done = 0
+        self.done_area = 0.0
+        self.problems = 0
+        self.lead_times: list[float] = []
+        self.daily_done = [0] * max(int(-(-self.horizon // DAY)), 1)
+        self.hourly_backlog: list[int] = []
+
+    def push(self, at: float, kind: int, payload=None) -> None:
+        if at <= self.horizon:
+            self.sequence += 1
+            heapq.heappush(self.events, (at, kind, self.sequence, payload))
+
+    def backlog_orders(self) -> int:
+        return sum(len(orders) for orders in self.backlog.values())
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        config = self.config
+        for material_id, (rate, _) in self.arrivals.items():
+            self.push(self.random.expovariate(rate / HOUR), ARRIVAL, material_id)
+        for printer, down in zip(self.printers, self.initially_down):
+            if down:
+                printer.state = DOWN
+                self.push(
+                    self.random.expovariate(1 / (config.mttr_hours * HOUR)),
+                    REPAIR,
+                    printer,
+                )
+            else:
+                self.schedule_failure(printer)
+        self.push(0.0, SAMPLE)
+        handlers = {
+            ARRIVAL: self.on_arrival,
+            CHECK: self.on_check,
+            DONE: self.on_done,
+            RETURN: self.on_return,
+            FAIL: self.on_fail,
+            REPAIR: self.on_repair,
+            SAMPLE: self.on_sample,
+        }
+        while self.events:
+            self.now, kind, _, payload = heapq.heappop(self.events)
+            self.processed += 1
+            handlers[kind](payload)
+        self.now = self.horizon
+        return self.report(time.perf_counter() - started)
+
+    def schedule_failure(self, printer: SimPrinter) -> None:
+        if self.config.mtbf_hours:
+            delay = self.random.expovariate(1 / (self.config.mtbf_hours * HOUR))
+            self.push(self.now + delay, FAIL, printer)
+
+    def ready_material(self, printer: SimPrinter) -> Optional[int]:
+        """Material with the oldest order whose backlog is worth a queue."""
+        chosen = None
+        oldest = None
+        max_wait = self.config.max_wait_hours * HOUR
+        for material_id in printer.materials:
+            orders = self.backlog.get(material_id)
+            if not orders:
+                continue
+            arrival = orders[0][0]
+            if (
+                self.backlog_area[material_id] >= self.config.queue_area
+                or arrival + max_wait <= self.now
+            ) and (oldest is None or arrival < oldest):
+                chosen, oldest = material_id, arrival
+        return chosen
+
+    def start(self, printer: SimPrinter) -> None:
+        if printer.state != IDLE:
+            return
+        material_id = self.ready_material(printer)
+        if material_id is None:
+            return
+        orders = self.backlog[material_id]
+        job = []
+        area = 0.0
+        while orders and (not job or area + orders[0][1] <= self.config.queue_area):
+            order = orders.popleft()
+            job.append(order)
+            area += order[1]
+        self.backlog_area[material_id] -= area
+        if orders:
+            self.push(
+                max(orders[0][0] + self.config.max_wait_hours * HOUR, self.now),
+                CHECK,
+                material_id,
+            )
+        printer.state = BUSY
+        printer.job = job
+        printer.job_material = material_id
+        printer.job_seconds = (
+            self.config.setup_minutes * 60 + area / printer.speed * HOUR
+        )
+        printer.job_end = self.now + printer.job_seconds
+        self.push(printer.job_end, DONE, (printer, printer.version))
+
+    def add_orders(
+        self, material_id: int, orders: list[tuple], front: bool = False
+    ) -> None:
+        """
+        Put orders to the backlog, at the front if they waited already.
+        A new oldest order gets a check when it waited long enough.
+        """
+        backlog = self.backlog[material_id]
+        head = backlog[0] if backlog else None
+        if front:
+            backlog.extendleft(reversed(orders))
+        else:
+            backlog.extend(orders)
+        self.backlog_area[material_id] += sum(order[1] for order in orders)
+        if backlog[0] is not head:
+            self.push(
+                max(backlog[0][0] + self.config.max_wait_hours * HOUR, self.now),
+                CHECK,
+                material_id,
+            )
+        self.on_check(material_id)
+
+    def on_arrival(self, material_id: int) -> None:
+        rate, areas = self.arrivals[material_id]
+        self.arrived += 1
+        self.add_orders(material_id, [(self.now, self.random.choice(areas))])
+        self.push(self.now + self.random.expovariate(rate / HOUR), ARRIVAL, material_id)
+
+    def on_check(self, material_id: int) -> None:
+        for printer in self.material_printers.get(material_id, ()):
+            if not self.backlog[material_id]:
+                break
+            self.start(printer)
+
+    def on_done(self, payload: tuple) -> None:
+        printer, version = payload
+        if version != printer.version or printer.state != BUSY:
+            return
+        area = sum(order[1] for order in printer.job)
+        printer.busy_seconds += printer.job_seconds
+        printer.queues += 1
+        printer.area += area
+        if self.random.random() < self.config.problem_rate:
+            self.problems += 1
+            self.push(
+                self.now + self.config.problem_hours * HOUR,
+                RETURN,
+                (printer.job_material, printer.job),
+            )
+        else:
+            day = min(int(self.now // DAY), len(self.daily_done) - 1)
+            self.daily_done[day] += len(printer.job)
+            self.done += len(printer.job)
+            self.done_area += area
+            self.lead_times.extend(self.now - arrival for arrival, _ in printer.job)
+        printer.state = IDLE
+        printer.job = []
+        printer.job_material = None
+        self.start(printer)
+
+    def on_return(self, payload: tuple) -> None:
+        """Orders of a problem queue are fixed and wait to be printed again."""
+        material_id, orders = payload
+        self.add_orders(material_id, orders, front=True)
+
+    def on_fail(self, printer: SimPrinter) -> None:
+        if printer.state == DOWN:
+            return
+        if printer.state == BUSY:
+            printer.remaining = printer.job_end - self.now
+            printer.version += 1
+        printer.state = DOWN
+        printer.down_since = self.now
+        printer.failures += 1
+        repair = self.random.expovariate(1 / (self.config.mttr_hours * HOUR))
+        self.push(self.now + repair, REPAIR, printer)
+
+    def on_repair(self, printer: SimPrinter) -> None:
+        printer.down_seconds += self.now - printer.down_since
+        if printer.job:
+            printer.state = BUSY
+            printer.job_end = self.now + printer.remaining
+            self.push(printer.job_end, DONE, (printer, printer.version))
+        else:
+            printer.state = IDLE
+            self.start(printer)
+        self.schedule_failure(printer)
+
+    def on_sample(self, payload=None) -> None:
+        self.hourly_backlog.append(self.backlog_orders())
+        self.push(self.now + HOUR, SAMPLE)
+
+    def report(self, seconds: float) -> dict:
+        horizon = self.horizon or 1
+        printers = []
+        workplaces = defaultdict(list)
+        for printer in self.printers:
+            busy = printer.busy_seconds
+            if printer.job:
+                # Printed part of the unfinished queue.
+                left = (
+                    printer.remaining
+                    if printer.state == DOWN
+                    else printer.job_end - horizon
+                )
+                busy += max(printer.job_seconds - left, 0)
+            down = printer.down_seconds
+            if printer.state == DOWN:
+                down += horizon - printer.down_since
+            utilization = round(busy / horizon, 3)
+            workplaces[printer.workplace_id].append(utilization)
+            printers.append(
+                {
+                    "id": printer.id,
+                    "workplace_id": printer.workplace_id,
+                    "utilization": utilization,
+                    "downtime_hours": round(down / HOUR, 1),
+                    "queues": printer.queues,
+                    "area": round(printer.area, 1),
+                    "failures": printer.failures,
+                }
+            )
+        lead_times = sorted(self.lead_times)
+        hourly = self.hourly_backlog or [0]
+        return {
+            "days": self.config.days,
+            "orders_arrived": self.arrived,
+            "orders_done": self.done,
+            "area_done": round(self.done_area, 1),
+            "throughput_per_day": round(self.done / (horizon / DAY), 1),
+            "daily_done": self.daily_done,
+            "lead_time_hours": {
+                "mean": (
+                    round(sum(lead_times) / len(lead_times) / HOUR, 2)
+                    if lead_times
+                    else None
+                ),
+                "p50": percentile(lead_times, 0.5),
+                "p95": percentile(lead_times, 0.95),
+            },
+            "backlog": {
+                "end_orders": self.backlog_orders(),
+                "end_area": round(sum(self.backlog_area.values()), 1),
+                "max_orders": max(hourly),
+                "mean_orders": round(sum(hourly) / len(hourly), 1),
+            },
+            "problems": self.problems,
+            "failures": sum(printer.failures for printer in self.printers),
+            "printers": printers,
+            "workplaces": {
+                workplace_id: round(sum(values) / len(values), 3)
+                for workplace_id, values in workplaces.items()
+            },
+            "events": self.processed,
+            "seconds": round(seconds, 3),
+        }
+
+
+def percentile(values: list[float], share: float) -> Optional[float]:
+    """Value (hours) of the sorted seconds at the share, None if empty."""
+    if not values:
+        return None
+    return round(values[min(int(len(values) * share), len(values) - 1)] / HOUR, 2)
+
+
+def load_printers(
+    add: Iterable[int] = (),
+    remove: Iterable[int] = (),
+    move: Optional[dict[int, int]] = None,
+) -> list[dict]:
+    """
+    Printers of the shop floor with their materials, two queries.
+    `add` clones printers (e.g. to buy another one of a model),
+    `remove` drops them and `move` puts {printer id: workplace id}.
+    Clones get negative ids, printers without a workplace are left out.
+    """
+    move = move or {}
+    remove = set(remove)
+    materials = defaultdict(set)
+    for printer_id, material_id in Printer.materials.through.objects.values_list(
+        "printer_id", "material_id"
+    ):
+        materials[printer_id].add(material_id)
+    printers = {
+        pk: {
+            "id": pk,
+            "workplace_id": move.get(pk, workplace_id),
+            "speed": speed,
+            "materials": materials[pk],
+            "active": status == Printer.ACTIVE,
+        }
+        for pk, workplace_id, speed, status in Printer.objects.values_list(
+            "pk", "workplace_id", "speed", "status"
+        )
+        if pk not in remove
+    }
+    for index, pk in enumerate(add, start=1):
+        if pk in printers:
+            printers[-index] = dict(printers[pk], id=-index, active=True)
+    return [printer for printer in printers.values() if printer["workplace_id"]]
+
+
+def load_arrivals(days: int = 28, sample: int = 1000) -> dict:
+    """
+    Orders per hour of every material over the last days, live and archived,
+    with up to `sample` order areas (m²) to draw the simulated sizes from.
+    """
+    since = timezone.now() - timedelta(days=days)
+    counts = defaultdict(int)
+    areas = defaultdict(list)
+    for model in (Order, ArchivedOrder):
+        rows = model.objects.filter(creation_time__gte=since).values_list(
+            "material_id", "width", "height"
+        )
+        for material_id, width, height in rows.iterator(chunk_size=2000):
+            counts[material_id] += 1
+            if len(areas[material_id]) < sample:
+                areas[material_id].append(width * height / 10000)
+    return {
+        material_id: (count / (days * 24), areas[material_id])
+        for material_id, count in counts.items()
+    }
+
+
+def synthetic_arrivals(
+    printers: Iterable[dict], orders_per_hour: float, seed: int = 1
+) -> dict:
+    """
+    Orders per hour spread evenly over the materials of the printers,
+    sized like the orders of `generate_data`.
+    """
+    rng = random.Random(seed)
+    material_ids = sorted({m for printer in printers for m in printer["materials"]})
+    areas = [
+        rng.randint(*ORDER_WIDTHS) * rng.randint(*ORDER_HEIGHTS) / 10000
+        for _ in range(1000)
+    ]
+    return {
+        material_id: (orders_per_hour / len(material_ids), areas)
+        for material_id in material_ids
+    }
+
+
+def workplace_names() -> dict[int, str]:
+    return dict(Workplace.objects.values_list("pk", "name"))
@@ -0,0 +1,156 @@
+import logging
+import time
+from contextvars import ContextVar
+from functools import partial
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from production.sql import (
+    fingerprint_hash,
+    fingerprint_sql,
+    is_transaction_statement,
+    query_origin,
+    request_view_name,
+)
+
+logger = logging.getLogger(__name__)
+
+# Set while the log runs its own queries (EXPLAIN, saving),
+# so they are not measured and recorded again.
+_recording: ContextVar[bool] = ContextVar("slow_query_recording", default=False)
+
+
+def is_recording() -> bool:
+    """True while the log runs its own queries in this context."""
+    return _recording.get()
+
+
+class SlowQueryLog:
+    """
+    SlowQueryLog:
+    - Database execute wrapper installed on every connection,
+      queries slower than `SLOW_QUERY_THRESHOLD_MS` are recorded.
+    - A SELECT seen for the first time in the process is explained
+      (`EXPLAIN ANALYZE` with `SLOW_QUERY_EXPLAIN_ANALYZE` where supported).
+    - Every slow query is written to the `production.slow_queries` log
+      (a rotating file) and counted in `SlowQuery` by SQL fingerprint.
+    - The code and view that ran the query are taken from the stack.
+    """
+
+    def __init__(self) -> None:
+        self.explained: set[str] = set()
+
+    @staticmethod
+    def threshold() -> Optional[float]:
+        return getattr(settings, "SLOW_QUERY_THRESHOLD_MS", None) or None
+
+    def __call__(self, execute, sql, params, many, context):
+        threshold = self.threshold()
+        if threshold is None or _recording.get() or is_transaction_statement(sql):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= threshold:
+            token = _recording.set(True)
+            try:
+                self.record(context["connection"], sql, params, many, duration_ms)
+            except DatabaseError:
+                logger.exception("Slow query could not be recorded")
+            finally:
+                _recording.reset(token)
+        return result
+
+    def explain(self, connection, sql: str, params, many: bool) -> str:
+        if many or not sql.lstrip().upper().startswith("SELECT"):
+            return ""
+        options = {}
+        if getattr(settings, "SLOW_QUERY_EXPLAIN_ANALYZE", False):
+            options["analyze"] = True
+        try:
+            prefix = connection.ops.explain_query_prefix(**options)
+        except ValueError:
+            prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            return "\n".join(
+                " ".join(str(column) for column in row) for row in cursor.fetchall()
+            )
+
+    def record(self, connection, sql, params, many, duration_ms) -> None:
+        fingerprint = fingerprint_sql(sql)
+        key = fingerprint_hash(fingerprint)
+        entry = {
+            "fingerprint_hash": key,
+            "fingerprint": fingerprint,
+            "sql": sql,
+            "origin": query_origin() or "",
+            "view_name": request_view_name() or "",
+            "duration_ms": round(duration_ms, 2),
+            "explain": "",
+        }
+        if key not in self.explained:
+            entry["explain"] = self.explain(connection, sql, params, many)
+            self.explained.add(key)
+
+        logger.warning(
+            "Slow query %(duration_ms)sms in %(view_name)s "
+            "from %(origin)s: %(fingerprint)s",
+            entry,
+            extra={"slow_query": entry},
+        )
+        # Rows of a rolled back transaction are not kept, the log line is.
+        transaction.on_commit(partial(self.save, entry), using=connection.alias)
+
+    def save(self, entry: dict) -> None:
+        token = _recording.set(True)
+        try:
+            self.save_entry(entry)
+        except DatabaseError:
+            logger.exception("Slow query could not be saved")
+        finally:
+            _recording.reset(token)
+
+    def save_entry(self, entry: dict) -> None:
+        """Count the occurrence in the fingerprint row, create it if missing."""
+        from production.models import SlowQuery
+
+        updated = SlowQuery.objects.filter(
+            fingerprint_hash=entry["fingerprint_hash"]
+        ).update(
+            count=F("count") + 1,
+            total_ms=F("total_ms") + entry["duration_ms"],
+            max_ms=Greatest("max_ms", Value(entry["duration_ms"])),
+            origin=entry["origin"][:255],
+            view_name=entry["view_name"][:255],
+            last_seen=timezone.now(),
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    SlowQuery.objects.create(
+                        fingerprint_hash=entry["fingerprint_hash"],
+                        fingerprint=entry["fingerprint"],
+                        sql=entry["sql"],
+                        explain=entry["explain"],
+                        origin=entry["origin"][:255],
+                        view_name=entry["view_name"][:255],
+                        total_ms=entry["duration_ms"],
+                        max_ms=entry["duration_ms"],
+                    )
+            except IntegrityError:
+                # Another process saved the fingerprint first.
+                self.save_entry(entry)
+
+
+slow_query_log = SlowQueryLog()
+
+
+def install_slow_query_log(connection) -> None:
+    if slow_query_log not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_log)
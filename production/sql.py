@@ -0,0 +1,117 @@
+import hashlib
+import os
+import re
+import sys
+from collections import Counter
+from difflib import unified_diff
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_PLACEHOLDER = re.compile(r"%s")
+_SPACES = re.compile(r"\s+")
+_TRANSACTION = re.compile(
+    r"\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b", re.IGNORECASE
+)
+_PROJECT_ROOT = os.path.abspath(settings.BASE_DIR)
+
+
+def fingerprint_sql(sql: str) -> str:
+    """
+    Normalize SQL to its shape: literals and parameters become `?`
+    and `IN (...)` lists collapse, so queries that differ
+    only in parameters share one fingerprint.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def is_transaction_statement(sql: str) -> bool:
+    return bool(_TRANSACTION.match(sql))
+
+
+def count_fingerprints(queries: Iterable[str]) -> Counter:
+    return Counter(fingerprint_sql(sql) for sql in queries)
+
+
+def diff_queries(before: Iterable[str], after: Iterable[str]) -> str:
+    """
+    Return a readable report of query shapes that were
+    executed more times in `after` than in `before`,
+    followed by a unified diff of both query lists.
+    """
+    before, after = list(before), list(after)
+    before_counts = count_fingerprints(before)
+    after_counts = count_fingerprints(after)
+    lines = [
+        f"{after_counts[shape] - before_counts[shape]:+d} x {shape}"
+        for shape in after_counts
+        if after_counts[shape] > before_counts[shape]
+    ]
+    diff = unified_diff(
+        [fingerprint_sql(sql) for sql in before],
+        [fingerprint_sql(sql) for sql in after],
+        fromfile="before",
+        tofile="after",
+        lineterm="",
+    )
+    return "\n".join(["Grown query shapes:", *lines, "", *diff])
+
+
+def fingerprint_hash(fingerprint: str) -> str:
+    return hashlib.sha1(fingerprint.encode()).hexdigest()
+
+
+# Frames of these modules are instrumentation, not the code running a query.
+_INSTRUMENTATION_MODULES = {
+    "production.sql",
+    "production.slow_queries",
+    "production.nplusone",
+    "production.timing",
+    "production.middleware",
+    "production.template_backends",
+}
+
+
+def _is_project_frame(frame) -> bool:
+    filename = os.path.abspath(frame.f_code.co_filename)
+    return (
+        filename.startswith(_PROJECT_ROOT)
+        and "site-packages" not in filename
+        and frame.f_globals.get("__name__") not in _INSTRUMENTATION_MODULES
+    )
+
+
+def query_origin(frame=None) -> Optional[str]:
+    """
+    The innermost project function on the stack, e.g.
+    `production.services.filter_orders_by_materials:123`.
+    Returns None if the query was run by framework code only
+    (e.g. a lazy queryset evaluated while rendering a template).
+    """
+    frame = frame or sys._getframe(1)
+    while frame is not None:
+        if _is_project_frame(frame):
+            module = frame.f_globals.get("__name__", "?")
+            function = frame.f_code.co_qualname
+            return f"{module}.{function}:{frame.f_lineno}"
+        frame = frame.f_back
+    return None
+
+
+def request_view_name(frame=None) -> Optional[str]:
+    """URL name of the request being handled on the stack, if any."""
+    frame = frame or sys._getframe(1)
+    while frame is not None:
+        request = frame.f_locals.get("request")
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            return match.view_name
+        frame = frame.f_back
+    return None
@@ -0,0 +1,459 @@
+import csv
+import datetime
+import io
+import random
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional, Type
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, models, transaction
+from django.db.models import Max
+
+from production.capabilities import invalidate_capability_index
+from production.models import (
+    AnalyticsBucket,
+    Material,
+    Order,
+    Printer,
+    PrintQueue,
+    StatusEvent,
+    Worker,
+    Workplace,
+)
+from production.reference_data import REFERENCE_MODELS, get_reference_data
+from production.status_objects import PrintStatusMixin, PrinterStatusMixin
+from production.utils import batched
+
+MATERIAL_NAMES = [
+    "Vinyl",
+    "Canvas",
+    "Paper",
+    "Silk",
+    "Linen",
+    "Textile",
+    "PVC",
+    "Fiberglass",
+    "Nonwoven",
+    "Metallic",
+]
+PRINTER_NAMES = ["Canon", "Epson", "HP", "Brother", "Ricoh", "Xerox"]
+PRINTER_MODELS = ["XT", "MX", "RL", "MM"]
+FIRST_NAMES = ["Jack", "Mac", "Joanne", "Helen", "Peter"]
+OWNERS = ["Use", "Meet", "Urus", "Dude"]
+COUNTRY_POSTS = [
+    "ukr-Nova Post",
+    "ukr-Ukr Post",
+    "pl-Dpd",
+    "pl-Poczta Polska",
+    "pl-Fedex",
+    "sl-Fedex",
+]
+IMAGE_NAMES = ["flowers", "blocks", "word_map", "painting", "waves"]
+
+# Ranges of order sizes, cm.
+ORDER_WIDTHS = (200, 999)
+ORDER_HEIGHTS = (215, 329)
+
+# Relative load of a weekday (Monday first) and of an hour of the day.
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 0.95, 0.85, 0.3, 0.15]
+HOUR_WEIGHTS = [0.02] * 7 + [
+    0.4,
+    1.0,
+    1.0,
+    1.0,
+    0.9,
+    0.7,
+    0.9,
+    1.0,
+    1.0,
+    0.9,
+    0.7,
+    0.4,
+    0.2,
+    0.1,
+    0.05,
+    0.02,
+    0.02,
+]
+
+# Status weights of queues, that are younger than `open_days`.
+OPEN_QUEUE_STATUSES = [
+    (PrintStatusMixin.READY_TO_PRINT, 0.45),
+    (PrintStatusMixin.IN_PROGRESS, 0.2),
+    (PrintStatusMixin.PROBLEM, 0.1),
+    (PrintStatusMixin.DONE, 0.25),
+]
+
+
+@contextmanager
+def auto_now_add_disabled(model: Type[models.Model]) -> Iterator[None]:
+    """
+    Let `bulk_create` keep the generated `auto_now_add` values
+    instead of overwriting them with the current time.
+    """
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now_add", False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def next_pk(model: Type[models.Model]) -> int:
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+class SyntheticDataGenerator:
+    """
+    SyntheticDataGenerator:
+    - Seeded generator of production-like data: workplaces, materials,
+      printers, workers, print queues and orders with years of history.
+    - The same seed, volumes and `until` date produce the same data.
+    - Queues and orders follow working hours and weekdays,
+      old ones are done, recent ones are waiting, printing or have problems.
+    - Rows are written with `bulk_create` in batches,
+      orders use COPY on PostgreSQL.
+    """
+
+    def __init__(
+        self,
+        seed: int = 1,
+        orders: int = 10_000,
+        queues: int = 500,
+        workplaces: int = 8,
+        printers_per_workplace: int = 4,
+        materials: int = 10,
+        workers: int = 32,
+        days: int = 365,
+        until: Optional[datetime.datetime] = None,
+        open_days: int = 3,
+        backlog_ratio: float = 0.02,
+        batch_size: int = 5_000,
+        use_copy: bool = True,
+        log: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.rng = random.Random(seed)
+        self.orders = orders
+        self.queues = queues
+        self.workplaces = workplaces
+        self.printers_per_workplace = printers_per_workplace
+        self.materials = materials
+        self.workers = workers
+        self.days = days
+        if until is None:
+            until = datetime.datetime.now(datetime.timezone.utc).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+        self.until = until
+        self.since = until - datetime.timedelta(days=days)
+        self.open_since = until - datetime.timedelta(days=open_days)
+        self.backlog_ratio = backlog_ratio if queues else 1.0
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.log = log or (lambda message: None)
+
+    def random_moment(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+    ) -> datetime.datetime:
+        """
+        Random moment between start and end,
+        weighted by working hours and weekdays.
+        """
+        span = (end - start).total_seconds()
+        for _ in range(100):
+            moment = start + datetime.timedelta(seconds=self.rng.random() * span)
+            weight = WEEKDAY_WEIGHTS[moment.weekday()] * HOUR_WEIGHTS[moment.hour]
+            if self.rng.random() < weight:
+                return moment
+        return moment
+
+    def history_moment(self) -> datetime.datetime:
+        """
+        Random moment of the history, the workload
+        grows over time, so recent days are busier.
+        """
+        # Square root of uniform is a linearly growing density.
+        offset = self.rng.random() ** 0.5 * self.days
+        day = self.since + datetime.timedelta(days=int(offset))
+        return self.random_moment(day, day + datetime.timedelta(days=1))
+
+    def bulk_create(self, model: Type[models.Model], objects: list) -> list:
+        with auto_now_add_disabled(model):
+            return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def create_workplaces(self) -> list[Workplace]:
+        start = next_pk(Workplace)
+        return self.bulk_create(
+            Workplace,
+            [Workplace(name=f"WP {start + index}") for index in range(self.workplaces)],
+        )
+
+    def create_materials(self) -> list[Material]:
+        start = next_pk(Material)
+        materials = []
+        for index in range(self.materials):
+            name = MATERIAL_NAMES[index % len(MATERIAL_NAMES)]
+            materials.append(
+                Material(
+                    name=f"{name} {start + index}",
+                    type=self.rng.choice(["Glossy", "Matte"]),
+                    roll_width=round(self.rng.uniform(1.06, 1.52), 2),
+                    winding=self.rng.randint(30, 150),
+                    density=self.rng.randint(115, 315),
+                )
+            )
+        return self.bulk_create(Material, materials)
+
+    def create_printers(
+        self,
+        workplaces: list[Workplace],
+        materials: list[Material],
+    ) -> list[Printer]:
+        start = next_pk(Printer)
+        printers = []
+        for workplace in workplaces:
+            for _ in range(self.printers_per_workplace):
+                status = (
+                    PrinterStatusMixin.MAINTENANCE
+                    if self.rng.random() < 0.1
+                    else PrinterStatusMixin.ACTIVE
+                )
+                printers.append(
+                    Printer(
+                        name=self.rng.choice(PRINTER_NAMES),
+                        model=(
+                            f"{self.rng.choice(PRINTER_MODELS)}"
+                            f"{start + len(printers):07d}"
+                        ),
+                        status=status,
+                        workplace=workplace,
+                    )
+                )
+        printers = self.bulk_create(Printer, printers)
+
+        through = Printer.materials.through
+        links = []
+        for printer in printers:
+            supported = self.rng.sample(materials, min(4, len(materials)))
+            links.extend(
+                through(printer_id=printer.pk, material_id=material.pk)
+                for material in supported
+            )
+            printer.supported = supported
+        self.bulk_create(through, links)
+        return printers
+
+    def create_workers(self, workplaces: list[Workplace]) -> list[Worker]:
+        start = next_pk(Worker)
+        # Hashing is slow on purpose, all generated workers share one password.
+        password = make_password(f"Synthetic&{start}")
+        workers = []
+        for index in range(self.workers):
+            number = start + index
+            first_name = self.rng.choice(FIRST_NAMES)
+            workers.append(
+                Worker(
+                    username=f"synthetic{number}",
+                    password=password,
+                    first_name=first_name,
+                    last_name=f"Synthetic{number}",
+                    email=f"{first_name}_synthetic{number}@email.com",
+                    phone_number=f"+380{500_000_000 + number:09d}",
+                    workplace=self.rng.choice(workplaces) if workplaces else None,
+                    date_joined=self.since,
+                )
+            )
+        return self.bulk_create(Worker, workers)
+
+    def create_queues(
+        self,
+        printers: list[Printer],
+        workers: list[Worker],
+    ) -> list[PrintQueue]:
+        """
+        Queues are created by the printers of a workplace
+        for a material that printer supports.
+        """
+        workers_by_workplace = {}
+        for worker in workers:
+            workers_by_workplace.setdefault(worker.workplace_id, []).append(worker)
+
+        statuses, weights = zip(*OPEN_QUEUE_STATUSES)
+        queues = []
+        for _ in range(self.queues):
+            printer = self.rng.choice(printers)
+            material = self.rng.choice(printer.supported)
+            creation_time = self.history_moment()
+            if creation_time < self.open_since:
+                status = PrintStatusMixin.DONE
+            else:
+                status = self.rng.choices(statuses, weights)[0]
+            queue = PrintQueue(
+                status=status,
+                material=material,
+                workplace_id=printer.workplace_id,
+                creation_time=creation_time,
+                printer=(
+                    None if status == PrintStatusMixin.READY_TO_PRINT else printer
+                ),
+            )
+            queue.performers = workers_by_workplace.get(printer.workplace_id) or [None]
+            queues.append(queue)
+        return self.bulk_create(PrintQueue, queues)
+
+    def order_status(self, queue: Optional[PrintQueue]) -> str:
+        if queue is None:
+            if self.rng.random() < 0.05:
+                return PrintStatusMixin.PROBLEM
+            return PrintStatusMixin.READY_TO_PRINT
+        if queue.status == PrintStatusMixin.PROBLEM and self.rng.random() < 0.7:
+            return PrintStatusMixin.READY_TO_PRINT
+        return queue.status
+
+    def build_orders(
+        self,
+        queues: list[PrintQueue],
+        materials: list[Material],
+    ) -> Iterator[Order]:
+        """
+        Queued orders were created up to two days before their queue,
+        the backlog of orders without a queue is recent.
+        """
+        start = next_pk(Order)
+        backlog = self.orders if not queues else int(self.orders * self.backlog_ratio)
+        for index in range(self.orders):
+            queue = self.rng.choice(queues) if index >= backlog else None
+            if queue is None:
+                material = self.rng.choice(materials)
+                creation_time = self.random_moment(self.open_since, self.until)
+            else:
+                material = queue.material
+                creation_time = self.random_moment(
+                    queue.creation_time - datetime.timedelta(days=2),
+                    queue.creation_time,
+                )
+            status = self.order_status(queue)
+            performer = None
+            performing_time = None
+            if status == PrintStatusMixin.DONE:
+                performer = self.rng.choice(queue.performers)
+                performing_time = queue.creation_time + datetime.timedelta(
+                    seconds=self.rng.uniform(600, 8 * 3600)
+                )
+            number = start + index
+            yield Order(
+                status=status,
+                code=f"{number}",
+                owner_full_name=self.rng.choice(OWNERS),
+                country_post=self.rng.choice(COUNTRY_POSTS),
+                image_name=f"{self.rng.choice(IMAGE_NAMES)}_{number}_.tiff",
+                material=material,
+                width=self.rng.randint(*ORDER_WIDTHS),
+                height=self.rng.randint(*ORDER_HEIGHTS),
+                creation_time=creation_time,
+                performing_time=performing_time,
+                performer=performer,
+                print_queue=queue,
+            )
+
+    def can_copy(self) -> bool:
+        if not self.use_copy or connection.vendor != "postgresql":
+            return False
+        with connection.cursor() as cursor:
+            return hasattr(cursor.cursor, "copy_expert")
+
+    def copy_orders(self, orders: Iterable[Order]) -> int:
+        """Write orders with PostgreSQL COPY, batch by batch."""
+        fields = [
+            field
+            for field in Order._meta.concrete_fields
+            if not isinstance(field, models.AutoField)
+        ]
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+        sql = (
+            f"COPY {connection.ops.quote_name(Order._meta.db_table)} "
+            f"({columns}) FROM STDIN WITH (FORMAT csv)"
+        )
+        created = 0
+        with connection.cursor() as cursor:
+            for batch in batched(orders, self.batch_size):
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for order in batch:
+                    writer.writerow(
+                        field.get_db_prep_save(
+                            getattr(order, field.attname), connection
+                        )
+                        for field in fields
+                    )
+                buffer.seek(0)
+                cursor.cursor.copy_expert(sql, buffer)
+                created += len(batch)
+                self.log(f"Orders: {created}/{self.orders}")
+        return created
+
+    def create_orders(
+        self,
+        queues: list[PrintQueue],
+        materials: list[Material],
+    ) -> int:
+        orders = self.build_orders(queues, materials)
+        if self.can_copy():
+            return self.copy_orders(orders)
+        created = 0
+        for batch in batched(orders, self.batch_size):
+            self.bulk_create(Order, batch)
+            created += len(batch)
+            self.log(f"Orders: {created}/{self.orders}")
+        return created
+
+    def generate(self) -> dict[str, int]:
+        with transaction.atomic():
+            workplaces = self.create_workplaces()
+            materials = self.create_materials()
+            printers = self.create_printers(workplaces, materials)
+            workers = self.create_workers(workplaces)
+            self.log(
+                f"Reference data: {len(workplaces)} workplaces, "
+                f"{len(materials)} materials, {len(printers)} printers, "
+                f"{len(workers)} workers"
+            )
+            queues = (
+                self.create_queues(printers, workers) if printers and materials else []
+            )
+            self.log(f"Print queues: {len(queues)}")
+            orders = self.create_orders(queues, materials) if materials else 0
+
+        # Bulk writes send no model signals.
+        invalidate_capability_index()
+        for model in REFERENCE_MODELS:
+            get_reference_data(model).invalidate()
+        return {
+            "workplaces": len(workplaces),
+            "materials": len(materials),
+            "printers": len(printers),
+            "workers": len(workers),
+            "print_queues": len(queues),
+            "orders": orders,
+        }
+
+
+def clear_production_data() -> None:
+    """Delete all production data, staff and superusers are kept."""
+    with transaction.atomic():
+        StatusEvent.objects.all().delete()
+        AnalyticsBucket.objects.all().delete()
+        Order.objects.all().delete()
+        PrintQueue.objects.all().delete()
+        Printer.objects.all().delete()
+        Material.objects.all().delete()
+        Worker.objects.filter(is_staff=False, is_superuser=False).delete()
+        Workplace.objects.all().delete()
@@ -0,0 +1,33 @@
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from production.timing import current_timing
+
+
+class TimedTemplate(Template):
+    """Template adding its render time to the current request timing."""
+
+    def render(self, context=None, request=None):
+        timing = current_timing()
+        if timing is None:
+            return super().render(context, request)
+        with timing.template_render():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    TimedDjangoTemplates:
+    - The Django template backend returning `TimedTemplate`,
+      so `ServerTimingMiddleware` can report template render time.
+    - Without a measured request it costs one context variable lookup.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,117 @@
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.db import connections
+
+_current_timing: ContextVar[Optional["RequestTiming"]] = ContextVar(
+    "current_timing", default=None
+)
+
+
+class RequestTiming:
+    """
+    RequestTiming:
+    - Breakdown of one request: total, view, SQL and template time.
+    - SQL is measured with a database execute wrapper,
+      templates by the `TimedDjangoTemplates` backend.
+    - Only the outermost template render is counted,
+      templates rendered inside it (includes, form templates) are part of it.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.view_started: Optional[float] = None
+        self.view_finished: Optional[float] = None
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.template_time = 0.0
+        self._template_depth = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    @contextmanager
+    def template_render(self) -> Iterator[None]:
+        self._template_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._template_depth -= 1
+            if not self._template_depth:
+                self.template_time += time.perf_counter() - started
+
+    @contextmanager
+    def instrument(self) -> Iterator["RequestTiming"]:
+        """Measure SQL and templates executed inside the block."""
+        token = _current_timing.set(self)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(self.execute_wrapper)
+                    )
+                yield self
+        finally:
+            _current_timing.reset(token)
+            self.finished = time.perf_counter()
+
+    def start_view(self) -> None:
+        self.view_started = time.perf_counter()
+
+    def finish_view(self) -> None:
+        if self.view_started is not None and self.view_finished is None:
+            self.view_finished = time.perf_counter()
+
+    @property
+    def total_time(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def view_time(self) -> float:
+        if self.view_started is None:
+            return 0.0
+        return (self.view_finished or time.perf_counter()) - self.view_started
+
+    @property
+    def python_time(self) -> float:
+        """Time that was not spent in SQL or template rendering."""
+        return max(self.total_time - self.db_time - self.template_time, 0.0)
+
+    def as_dict(self) -> dict[str, float]:
+        """Durations in milliseconds."""
+        return {
+            "total_ms": round(self.total_time * 1000, 2),
+            "view_ms": round(self.view_time * 1000, 2),
+            "db_ms": round(self.db_time * 1000, 2),
+            "db_queries": self.db_queries,
+            "template_ms": round(self.template_time * 1000, 2),
+            "python_ms": round(self.python_time * 1000, 2),
+        }
+
+    def server_timing(self) -> str:
+        """Value of the `Server-Timing` response header."""
+        metrics = [
+            ("db", self.db_time, f"SQL ({self.db_queries} queries)"),
+            ("tpl", self.template_time, "Templates"),
+            ("view", self.view_time, "View"),
+            ("py", self.python_time, "Python"),
+            ("total", self.total_time, "Total"),
+        ]
+        return ", ".join(
+            f'{name};dur={duration * 1000:.2f};desc="{description}"'
+            for name, duration, description in metrics
+        )
+
+
+def current_timing() -> Optional[RequestTiming]:
+    """Timing of the request being measured in this context, if any."""
+    return _current_timing.get()
@@ -12,6 +12,7 @@ from production.views import (
     WorkplaceUpdateView,
     WorkplaceDetailView,
     WorkplaceDeleteView,
+    workplace_rebalance,
     MaterialListView,
     MaterialDetailView,
     MaterialCreateView,
@@ -31,6 +32,9 @@ from production.views import (
     PrintQueueUpdateView,
     change_order_status,
     OrderDeleteView,
+    analytics,
+    analytics_data,
+    material_inventory,
 )
 
 urlpatterns = [
@@ -73,6 +77,11 @@ urlpatterns = [
         WorkplaceDeleteView.as_view(),
         name="workplace-delete",
     ),
+    path(
+        "workplaces/<int:pk>/rebalance/",
+        workplace_rebalance,
+        name="workplace-rebalance",
+    ),
     path(
         "materials/",
         MaterialListView.as_view(),
@@ -84,6 +93,7 @@ urlpatterns = [
         name="material-detail",
     ),
     path("materials/create/", MaterialCreateView.as_view(), name="material-create"),
+    path("materials/inventory/", material_inventory, name="material-inventory"),
     path(
         "materials/<int:pk>/update/",
         MaterialUpdateView.as_view(),
@@ -164,6 +174,8 @@ urlpatterns = [
         OrderDeleteView.as_view(),
         name="order-delete",
     ),
+    path("analytics/", analytics, name="analytics"),
+    path("analytics/data/", analytics_data, name="analytics-data"),
 ]
 
 app_name = "production"
@@ -0,0 +1,13 @@
+from typing import Iterable, Iterator
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Lists of at most `size` consecutive items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,36 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+class SharedVersion:
+    """
+    SharedVersion:
+    - Version stamp of in-process data, kept in the shared cache.
+    - A change made by one worker process bumps the stamp,
+      so the data is rebuilt in every process on the next read.
+    - Stamps are random, so concurrent bumps never produce the same one.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.key = f"wallis:version:{name}"
+
+    def get(self) -> str:
+        version = cache.get(self.key)
+        if version is None:
+            cache.add(self.key, uuid4().hex, timeout=None)
+            version = cache.get(self.key)
+        return version
+
+    def bump(self) -> None:
+        cache.set(self.key, uuid4().hex, timeout=None)
+
+    def invalidate(self) -> None:
+        """
+        Bump the stamp now and once more after the current transaction
+        commits, so data rebuilt before the commit is not kept.
+        """
+        self.bump()
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(self.bump)
@@ -1,13 +1,23 @@
 from copy import copy
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import QuerySet, Q, Count
 from django.db.models.functions import TruncDay
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseRedirect,
+    JsonResponse,
+)
 from django.shortcuts import render, get_object_or_404
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.utils.crypto import constant_time_compare
 from django.utils.timezone import now
 from django.views import generic
 from django_filters.views import FilterView
@@ -28,21 +38,31 @@ from production.forms import (
 )
 
 from production.mixins import (
+    ClaimConflictMixin,
     DeleteViewMixin,
     ViewSuccessUrlMixin,
     InstanceCacheMixin,
     PostApproveMixin,
     ListViewSearchMixin,
+    StatusEventAuthorMixin,
+    WorkplacePermissionMixin,
 )
 
 from production.models import (
     Worker, Workplace,
     Material, Printer,
-    PrintQueue, Order
+    PrintQueue, Order,
+    ArchivedOrder,
 )
 
+from production.analytics import DIMENSIONS, MAX_DAYS, analytics_summary
 from production.calculations import create_summary_context
-from production.services import get_week_time_scheme
+from production.inventory import material_forecast
+from production.rebalancing import rebalance_workplace
+from production.scheduling import printer_plan
+from production.metrics import get_domain_gauges, registry
+from production.profiling import get_profile_store
+from production.services import can_operate_workplace, get_week_time_scheme
 
 
 @login_required
@@ -69,13 +89,18 @@ def index(request):
     )
     orders = Order.objects.all()
     seven_days_ago = now().date() - timedelta(days=6)
-    weekly_orders_data = (
-        orders.filter(status=Order.DONE, performing_time__date__gte=seven_days_ago)
+    # Archived orders are done, they count towards the done rollups.
+    weekly_orders_data = [
+        entry
+        for model in (Order, ArchivedOrder)
+        for entry in model.objects.filter(
+            status=Order.DONE, performing_time__date__gte=seven_days_ago
+        )
         .annotate(day=TruncDay("performing_time"))
         .values("day")
         .annotate(count=Count("id"))
         .order_by("day")
-    )
+    ]
 
     weekly_orders = [0] * 7
     day_to_index = {(seven_days_ago + timedelta(days=i)): i for i in range(7)}
@@ -86,11 +111,12 @@ def index(request):
     for entry in weekly_orders_data:
         day = entry["day"].date()
         if day in day_to_index:
-            weekly_orders[day_to_index[day]] = entry["count"]
+            weekly_orders[day_to_index[day]] += entry["count"]
 
-    num_daily_done_orders = orders.filter(
-        status=Order.DONE, performing_time__date=today
-    ).count()
+    num_daily_done_orders = sum(
+        model.objects.filter(status=Order.DONE, performing_time__date=today).count()
+        for model in (Order, ArchivedOrder)
+    )
 
     num_problem_orders = orders.filter(
         status=Order.PROBLEM,
@@ -163,6 +189,7 @@ class WorkplaceListView(LoginRequiredMixin, ListViewSearchMixin):
 
 class WorkplaceCreateView(
     LoginRequiredMixin,
+    ClaimConflictMixin,
     generic.CreateView,
     ViewSuccessUrlMixin,
 ):
@@ -173,6 +200,7 @@ class WorkplaceCreateView(
 
 class WorkplaceUpdateView(
     LoginRequiredMixin,
+    ClaimConflictMixin,
     generic.UpdateView,
     ViewSuccessUrlMixin,
 ):
@@ -182,17 +210,27 @@ class WorkplaceUpdateView(
 
 
 class WorkplaceDetailView(
+    InstanceCacheMixin,
+    WorkplacePermissionMixin,
     LoginRequiredMixin,
     generic.DetailView,
 ):
     model = Workplace
     queryset = Workplace.objects.all()
 
+    def get_object(self, queryset=None) -> Workplace:
+        return self.cache_instance(Workplace)
+
+    def get_permission_workplace(self) -> Workplace:
+        return self.object
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        workplace = self.get_object()
+        workplace = self.object
 
-        print_queues = PrintQueue.objects.prefetch_related("material").filter(
+        print_queues = PrintQueue.objects.prefetch_related(
+            "material", "orders"
+        ).filter(
             status__in=[
                 PrintQueue.READY_TO_PRINT,
                 PrintQueue.PROBLEM,
@@ -220,6 +258,32 @@ class WorkplaceDeleteView(LoginRequiredMixin, DeleteViewMixin):
     template_name = "production/workplace_confirm_delete.html"
 
 
+@login_required
+def workplace_rebalance(request: HttpRequest, pk: int) -> HttpResponse:
+    """
+    Preview of the rebalanced ready print queues of the workplace,
+    applied when the "approve" button was pressed.
+    """
+    workplace = get_object_or_404(Workplace, pk=pk)
+    if not can_operate_workplace(request.user, workplace):
+        return HttpResponseForbidden()
+    if request.method == "POST" and "approve" in request.POST:
+        rebalance_workplace(workplace, apply=True, by=request.user)
+        return HttpResponseRedirect(
+            reverse("production:workplace-detail", kwargs={"pk": workplace.pk})
+        )
+    plans = rebalance_workplace(workplace)
+    return render(
+        request,
+        "production/workplace_rebalance.html",
+        {
+            "workplace": workplace,
+            "plans": [plan.as_dict() for plan in plans],
+            "changed": any(plan.changed for plan in plans),
+        },
+    )
+
+
 class MaterialListView(LoginRequiredMixin, ListViewSearchMixin):
     model = Material
     paginate_by = 14
@@ -238,6 +302,19 @@ class MaterialDetailView(
     ).all()
 
 
+@login_required
+def material_inventory(request: HttpRequest) -> HttpResponse:
+    """Stock, ready backlog and run-out forecast of every material."""
+    return render(
+        request,
+        "production/material_inventory.html",
+        {
+            "forecast": material_forecast(),
+            "forecast_days": settings.INVENTORY_FORECAST_DAYS,
+        },
+    )
+
+
 class MaterialCreateView(LoginRequiredMixin, generic.CreateView, ViewSuccessUrlMixin):
     model = Material
     form_class = MaterialForm
@@ -300,6 +377,11 @@ class PrinterUpdateView(
 class PrinterDetailView(LoginRequiredMixin, generic.DetailView):
     model = Printer
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["plan"] = printer_plan(self.object)
+        return context
+
 
 class PrinterDeleteView(LoginRequiredMixin, DeleteViewMixin):
     model = Printer
@@ -309,6 +391,15 @@ class PrinterDeleteView(LoginRequiredMixin, DeleteViewMixin):
 
 class OrderDetailView(LoginRequiredMixin, generic.DetailView):
     model = Order
+    template_name = "production/order_detail.html"
+    context_object_name = "order"
+
+    def get_object(self, queryset=None):
+        """Archived orders keep their ids, so old links still open them."""
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            return get_object_or_404(ArchivedOrder, pk=self.kwargs["pk"])
 
 
 class OrderListView(
@@ -325,6 +416,11 @@ class OrderListView(
     context_object_name = "order_list"
     filterset_class = OrderFilter
 
+    def get_queryset(self) -> QuerySet:
+        if self.request.GET.get("archive"):
+            self.queryset = ArchivedOrder.objects.prefetch_related("material").all()
+        return super().get_queryset()
+
 
 class OrderDeleteView(LoginRequiredMixin, DeleteViewMixin):
     model = Order
@@ -355,15 +451,32 @@ class PrintQueueDeleteView(LoginRequiredMixin, DeleteViewMixin):
     template_name = "production/print_queue_confirm_delete.html"
 
 
-class PrintQueueDetailView(LoginRequiredMixin, generic.DetailView):
+class PrintQueueDetailView(
+    InstanceCacheMixin,
+    WorkplacePermissionMixin,
+    LoginRequiredMixin,
+    generic.DetailView,
+):
     model = PrintQueue
     template_name = "production/print_queue_detail.html"
     queryset = PrintQueue.objects.prefetch_related(
         "orders__material"
     ).all()
 
+    def get_object(self, queryset=None) -> PrintQueue:
+        print_queue = super().get_object(queryset)
+        identity_map = self.get_identity_map()
+        identity_map.add(print_queue)
+        for field_name in ["workplace", "printer"]:
+            identity_map.resolve(print_queue, field_name)
+        return print_queue
+
+    def get_permission_workplace(self) -> int:
+        return self.object.workplace_id
+
 
 class PrintQueueCreateView(
+    StatusEventAuthorMixin,
     PostApproveMixin,
     InstanceCacheMixin,
     LoginRequiredMixin,
@@ -380,10 +493,8 @@ class PrintQueueCreateView(
 
     def get_context_data(self, **kwargs):
         context = copy(kwargs)
-        form = self.get_form()
-
         if "form" not in context:
-            context["form"] = form
+            context["form"] = self.get_form()
 
         context.update(create_summary_context(context.get("form")))
         return context
@@ -391,10 +502,12 @@ class PrintQueueCreateView(
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs["cached_workplace"] = self.workplace
+        kwargs["identity_map"] = self.get_identity_map()
         return kwargs
 
 
 class PrintQueueUpdateView(
+    StatusEventAuthorMixin,
     PostApproveMixin,
     InstanceCacheMixin,
     LoginRequiredMixin,
@@ -409,11 +522,13 @@ class PrintQueueUpdateView(
     def print_queue(self) -> PrintQueue:
         return self.cache_instance(PrintQueue)
 
+    def get_object(self, queryset=None) -> PrintQueue:
+        return self.print_queue
+
     def get_context_data(self, **kwargs):
         context = copy(kwargs)
-        form = self.get_form()
         if "form" not in context:
-            context["form"] = form
+            context["form"] = self.get_form()
 
         context.update(create_summary_context(context.get("form")))
         context.update({"object": self.print_queue})
@@ -422,6 +537,7 @@ class PrintQueueUpdateView(
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs["cached_instance"] = self.print_queue
+        kwargs["identity_map"] = self.get_identity_map()
         return kwargs
 
 
@@ -440,12 +556,96 @@ def change_order_status(request: HttpRequest, pk: int) -> HttpResponse:
             if new_status == order.READY_TO_PRINT:
                 if order in problem_orders and problem_orders.count() == 1:
                     print_queue.status = print_queue.READY_TO_PRINT
+                    print_queue.changed_by = request.user
                     print_queue.save()
             if new_status == order.PROBLEM:
                 if print_queue.status != order.PROBLEM:
                     print_queue.status = print_queue.PROBLEM
+                    print_queue.changed_by = request.user
                     print_queue.save()
         order.status = new_status
+        order.changed_by = request.user
         order.save()
 
     return HttpResponseRedirect(order.get_absolute_url())
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Metrics of all worker processes in Prometheus text format.
+    Requires `Authorization: Bearer <METRICS_TOKEN>` if the token is set,
+    otherwise it is open in DEBUG and for staff users only.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        authorization = request.headers.get("Authorization", "")
+        if not constant_time_compare(authorization, f"Bearer {token}"):
+            return HttpResponseForbidden()
+    elif not (settings.DEBUG or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(get_domain_gauges()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+def analytics_params(request: HttpRequest) -> tuple[str, int]:
+    dimension = request.GET.get("dimension", "all")
+    if dimension not in DIMENSIONS:
+        dimension = "all"
+    try:
+        days = int(request.GET.get("days", 30))
+    except ValueError:
+        days = 30
+    return dimension, min(max(days, 1), MAX_DAYS)
+
+
+@login_required
+def analytics(request: HttpRequest) -> HttpResponse:
+    """Lead time, cycle time and throughput from the streaming aggregates."""
+    dimension, days = analytics_params(request)
+    return render(
+        request,
+        "production/analytics.html",
+        {
+            "summary": analytics_summary(dimension, days),
+            "dimensions": DIMENSIONS,
+            "periods": [7, 30, 90, 365],
+        },
+    )
+
+
+@login_required
+def analytics_data(request: HttpRequest) -> JsonResponse:
+    dimension, days = analytics_params(request)
+    return JsonResponse(analytics_summary(dimension, days))
+
+
+@login_required
+def profile_list(request: HttpRequest) -> HttpResponse:
+    """Collapsed-stack profiles of `ProfilerMiddleware`, for staff only."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    return render(
+        request,
+        "production/profile_list.html",
+        {
+            "profiles": get_profile_store().list(),
+            "profiler_enabled": settings.PROFILER_ENABLED,
+        },
+    )
+
+
+@login_required
+def profile_download(request: HttpRequest, name: str) -> HttpResponse:
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    path = get_profile_store().path(name)
+    if path is None:
+        raise Http404
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment="download" in request.GET,
+        filename=name,
+        content_type="text/plain; charset=utf-8",
+    )
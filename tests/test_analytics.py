@@ -0,0 +1,158 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from production.analytics import (
+    BUCKET_BOUNDS,
+    DIMENSIONS,
+    HOUR,
+    ORDER_LEAD_TIME,
+    QUEUE_CYCLE_TIME,
+    analytics_summary,
+    bucket_of,
+    bucket_quantile,
+    rebuild_analytics,
+)
+from production.archive import archive_print_queues
+from production.models import AnalyticsBucket, Order, PrintQueue
+from tests.test_items import TestItems
+
+
+class BucketTest(SimpleTestCase):
+    def test_bucket_of(self):
+        self.assertEqual(bucket_of(0), 0)
+        self.assertEqual(bucket_of(HOUR), BUCKET_BOUNDS.index(HOUR))
+        self.assertEqual(bucket_of(10**9), len(BUCKET_BOUNDS))
+
+    def test_bucket_quantile(self):
+        counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.assertIsNone(bucket_quantile(counts, 0.5))
+        counts[bucket_of(HOUR * 1.5)] = 10
+        self.assertEqual(bucket_quantile(counts, 0.5), HOUR * 1.5)
+        self.assertEqual(bucket_quantile(counts, 1), 2 * HOUR)
+
+
+class AnalyticsTest(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.queue_m1.printer = self.printer1
+        self.queue_m1.save()
+        self.queue_m1.orders.set([self.order1_m1, self.order2_m1])
+        # Orders were created two hours ago.
+        Order.objects.update(creation_time=timezone.now() - timedelta(hours=2))
+        PrintQueue.objects.update(creation_time=timezone.now() - timedelta(hours=3))
+
+    def by_key(self, summary, metric):
+        return {item["key"]: item for item in summary["metrics"][metric]["items"]}
+
+    def test_bulk_done_transitions_are_aggregated(self):
+        Order.objects.filter(material=self.material1).change_status(
+            Order.DONE, by=self.regular_user, performing_time=timezone.now()
+        )
+
+        everything = self.by_key(analytics_summary("all", days=7), ORDER_LEAD_TIME)
+        self.assertEqual(everything[0]["done"], 3)
+        self.assertAlmostEqual(everything[0]["mean_hours"], 2, places=1)
+        self.assertEqual(everything[0]["daily"][-1], 3)
+
+        workplaces = self.by_key(
+            analytics_summary("workplace", days=7), ORDER_LEAD_TIME
+        )
+        self.assertEqual(list(workplaces), [self.workplace1.pk])
+        self.assertEqual(workplaces[self.workplace1.pk]["done"], 2)
+        self.assertEqual(workplaces[self.workplace1.pk]["label"], "workplace1")
+
+        workers = self.by_key(analytics_summary("worker", days=7), ORDER_LEAD_TIME)
+        self.assertEqual(workers[self.regular_user.pk]["label"], "regular")
+
+    def test_saved_done_transition_is_aggregated(self):
+        queue = PrintQueue.objects.get(pk=self.queue_m1.pk)
+        queue.status = PrintQueue.DONE
+        queue.save()
+
+        printers = self.by_key(analytics_summary("printer"), QUEUE_CYCLE_TIME)
+        self.assertEqual(printers[self.printer1.pk]["done"], 1)
+        self.assertAlmostEqual(printers[self.printer1.pk]["mean_hours"], 3, places=1)
+
+    def test_other_transitions_are_ignored(self):
+        Order.objects.change_status(Order.PROBLEM)
+        self.assertFalse(AnalyticsBucket.objects.exists())
+
+    def test_rebuild_matches_incremental(self):
+        Order.objects.filter(material=self.material1).change_status(
+            Order.DONE, performing_time=timezone.now()
+        )
+        incremental = analytics_summary("material")["metrics"]
+
+        call_command("rebuild_analytics", stdout=StringIO())
+
+        self.assertEqual(analytics_summary("material")["metrics"], incremental)
+
+    def test_rebuild_reproduces_every_dimension(self):
+        Order.objects.filter(material=self.material1).change_status(
+            Order.DONE, by=self.regular_user
+        )
+        queue = PrintQueue.objects.get(pk=self.queue_m1.pk)
+        queue.status = PrintQueue.DONE
+        queue.changed_by = self.regular_user
+        queue.save()
+        incremental = {
+            dimension: analytics_summary(dimension)["metrics"]
+            for dimension in DIMENSIONS
+        }
+
+        call_command("rebuild_analytics", stdout=StringIO())
+
+        for dimension in DIMENSIONS:
+            self.assertEqual(
+                analytics_summary(dimension)["metrics"],
+                incremental[dimension],
+                dimension,
+            )
+
+    def buckets(self):
+        return sorted(
+            AnalyticsBucket.objects.values_list(
+                "dimension", "metric", "day", "key", "bucket", "count", "total_seconds"
+            )
+        )
+
+    def test_rebuild_keeps_live_buckets(self):
+        # No performer or performing time, only the status events.
+        Order.objects.filter(material=self.material1).change_status(
+            Order.DONE, by=self.regular_user
+        )
+        queue = PrintQueue.objects.get(pk=self.queue_m1.pk)
+        queue.status = PrintQueue.DONE
+        queue.changed_by = self.regular_user
+        queue.save()
+        live = self.buckets()
+        archive_print_queues([queue.pk], timezone.now())
+
+        rebuild_analytics()
+
+        self.assertEqual(len(live), 9)
+        self.assertEqual(self.buckets(), live)
+
+    def test_page_and_json(self):
+        Order.objects.filter(material=self.material1).change_status(
+            Order.DONE, performing_time=timezone.now()
+        )
+        self.client.force_login(self.regular_user)
+
+        page = self.client.get(reverse("production:analytics"), {"days": 7})
+        data = self.client.get(
+            reverse("production:analytics-data"),
+            {"dimension": "material", "days": "bad"},
+        ).json()
+
+        self.assertContains(page, "Order lead time")
+        self.assertEqual(data["days"], 30)
+        self.assertEqual(data["metrics"][ORDER_LEAD_TIME]["items"][0]["done"], 3)
+        self.assertEqual(
+            data["metrics"][ORDER_LEAD_TIME]["items"][0]["label"], "Material1"
+        )
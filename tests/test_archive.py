@@ -0,0 +1,139 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from production.archive import archive_done
+from production.models import ArchivedOrder, ArchivedPrintQueue, Order, PrintQueue
+from tests.test_items import TestItems
+
+
+class ArchiveTest(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.long_ago = timezone.now() - timedelta(days=120)
+        self.before = timezone.now() - timedelta(days=90)
+        self.queue_m1.orders.set([self.order1_m1, self.order2_m1])
+        PrintQueue.objects.filter(pk=self.queue_m1.pk).update(
+            status=PrintQueue.DONE,
+            creation_time=self.long_ago,
+            printer=self.printer1,
+        )
+        Order.objects.filter(pk__in=[self.order1_m1.pk, self.order2_m1.pk]).update(
+            status=Order.DONE, performing_time=self.long_ago, performer=self.admin_user
+        )
+        Order.objects.filter(pk=self.order1_m2.pk).update(
+            status=Order.DONE, performing_time=self.long_ago
+        )
+        # Done recently, stays live.
+        Order.objects.filter(pk=self.order2_m2.pk).update(
+            status=Order.DONE, performing_time=timezone.now()
+        )
+
+    def test_done_work_is_moved_with_ids(self):
+        archived = archive_done(self.before)
+
+        self.assertEqual(archived, {"print_queues": 1, "orders": 3})
+        self.assertFalse(PrintQueue.objects.filter(pk=self.queue_m1.pk).exists())
+        self.assertEqual(
+            set(Order.objects.values_list("pk", flat=True)),
+            {self.order3_m1.pk, self.order2_m2.pk},
+        )
+        queue = ArchivedPrintQueue.objects.get(pk=self.queue_m1.pk)
+        self.assertEqual(queue.printer, self.printer1)
+        self.assertEqual(
+            set(queue.orders.values_list("pk", flat=True)),
+            {self.order1_m1.pk, self.order2_m1.pk},
+        )
+        order = ArchivedOrder.objects.get(pk=self.order1_m1.pk)
+        self.assertEqual(order.code, self.order1_m1.code)
+        self.assertEqual(order.performer, self.admin_user)
+        self.assertEqual(order.performing_time, self.long_ago)
+        self.assertIsNotNone(order.archived_at)
+
+    def test_queue_with_unfinished_order_stays_live(self):
+        Order.objects.filter(pk=self.order2_m1.pk).update(status=Order.PROBLEM)
+
+        archived = archive_done(self.before)
+
+        self.assertEqual(archived, {"print_queues": 0, "orders": 1})
+        self.assertTrue(PrintQueue.objects.filter(pk=self.queue_m1.pk).exists())
+        self.assertEqual(
+            list(ArchivedOrder.objects.values_list("pk", flat=True)),
+            [self.order1_m2.pk],
+        )
+
+    def test_dry_run_moves_nothing(self):
+        archived = archive_done(self.before, dry_run=True)
+
+        self.assertEqual(archived, {"print_queues": 1, "orders": 3})
+        self.assertFalse(ArchivedOrder.objects.exists())
+        self.assertEqual(Order.objects.count(), 5)
+
+    def test_small_batches(self):
+        archived = archive_done(self.before, batch_size=1)
+
+        self.assertEqual(archived, {"print_queues": 1, "orders": 3})
+        self.assertEqual(ArchivedOrder.objects.count(), 3)
+
+    def test_archived_order_opens_by_its_url(self):
+        archive_done(self.before)
+        self.client.force_login(self.admin_user)
+
+        response = self.client.get(
+            reverse("production:order-detail", kwargs={"pk": self.order1_m1.pk})
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "(archived)")
+        self.assertNotContains(
+            response,
+            reverse("production:print-queue-detail", kwargs={"pk": self.queue_m1.pk}),
+        )
+
+    def test_order_list_archive_toggle(self):
+        archive_done(self.before)
+        self.client.force_login(self.admin_user)
+        url = reverse("production:order-list")
+
+        live = self.client.get(url)
+        archive = self.client.get(url, {"archive": 1, "code": "113"})
+
+        self.assertEqual(
+            {order.pk for order in live.context["order_list"]},
+            {self.order3_m1.pk, self.order2_m2.pk},
+        )
+        self.assertEqual(
+            {order.pk for order in archive.context["order_list"]},
+            {self.order1_m1.pk, self.order2_m1.pk},
+        )
+
+    def test_index_counts_archived_orders(self):
+        ArchivedOrder.objects.create(
+            id=1000,
+            code="archived",
+            owner_full_name="owner",
+            image_name="some_name.tiff",
+            width=100,
+            height=100,
+            material=self.material1,
+            status=Order.DONE,
+            creation_time=timezone.now(),
+            performing_time=timezone.now(),
+            archived_at=timezone.now(),
+        )
+        self.client.force_login(self.admin_user)
+
+        response = self.client.get(reverse("production:index"))
+
+        self.assertEqual(response.context["num_daily_done_orders"], 2)
+        self.assertEqual(response.context["weekly_orders"][0][-1], 2)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("archive_orders", "--days=90", stdout=out)
+
+        self.assertIn("Archived 1 print queues and 3 orders", out.getvalue())
+        self.assertEqual(ArchivedOrder.objects.count(), 3)
@@ -0,0 +1,114 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from production.benchmarks import (
+    BENCHMARKS,
+    compare_results,
+    measure,
+    run_benchmarks,
+)
+from production.models import Printer, Workplace
+
+
+def fast_run(**kwargs):
+    return run_benchmarks(sizes=[3], repeat=1, min_time=0.0001, **kwargs)
+
+
+class RunBenchmarksTest(TestCase):
+    def test_every_benchmark_runs_at_every_size(self):
+        results = run_benchmarks(
+            names=["order.tiles_count"], sizes=[1, 5], repeat=2, min_time=0.0001
+        )
+        self.assertEqual(
+            list(results["results"]), ["order.tiles_count[1]", "order.tiles_count[5]"]
+        )
+        self.assertEqual(results["results"]["order.tiles_count[5]"]["repeat"], 2)
+        self.assertEqual(results["meta"]["database"], "sqlite")
+
+    def test_database_rows_are_rolled_back(self):
+        results = fast_run()
+        self.assertEqual(len(results["results"]), len(BENCHMARKS))
+        self.assertFalse(Printer.objects.exists())
+        self.assertFalse(Workplace.objects.exists())
+
+    def test_index_lookups_do_not_query(self):
+        for name in ["capability_index.lookup", "capability_index.get"]:
+            function = BENCHMARKS[name].setup(10)
+            with self.assertNumQueries(0):
+                function()
+
+    def test_index_build_reads_created_printers(self):
+        function = BENCHMARKS["capability_index.build"].setup(10)
+        with self.assertNumQueries(1):
+            index = function()
+        self.assertEqual(len(index.printer_status), 10)
+
+
+class CompareResultsTest(SimpleTestCase):
+    def test_growth_beyond_tolerance_is_a_regression(self):
+        previous = {"results": {"a[10]": {"median_us": 10}, "b[10]": {"median_us": 10}}}
+        results = {
+            "results": {
+                "a[10]": {"median_us": 11.9},
+                "b[10]": {"median_us": 12.1},
+                "c[10]": {"median_us": 99},
+            }
+        }
+        self.assertEqual(
+            compare_results(results, previous, tolerance=0.2),
+            ["b[10]: 10us -> 12.1us"],
+        )
+
+    def test_measure_reports_microseconds_per_call(self):
+        stats = measure(lambda: None, repeat=3, min_time=0.001)
+        self.assertGreater(stats["loops"], 1)
+        self.assertLessEqual(stats["min_us"], stats["median_us"])
+
+
+class BenchmarkCommandTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.output = Path(self.directory.name) / "results.json"
+
+    def call(self, *args):
+        out = StringIO()
+        call_command(
+            "benchmark",
+            "order.tiles_count",
+            "--sizes=2",
+            "--repeat=1",
+            "--min-time=0.0001",
+            *args,
+            stdout=out,
+            stderr=StringIO(),
+        )
+        return out.getvalue()
+
+    def test_results_are_stored_and_compared(self):
+        self.call(f"--output={self.output}")
+        results = json.loads(self.output.read_text())
+        self.assertIn("order.tiles_count[2]", results["results"])
+
+        results["results"]["order.tiles_count[2]"]["median_us"] = 1e9
+        self.output.write_text(json.dumps(results))
+        self.assertIn(
+            "No regressions against the previous run.",
+            self.call(f"--compare={self.output}"),
+        )
+
+    def test_regressions_fail(self):
+        self.output.write_text(
+            json.dumps({"results": {"order.tiles_count[2]": {"median_us": 1e-6}}})
+        )
+        with self.assertRaisesMessage(CommandError, "order.tiles_count[2]"):
+            self.call(f"--compare={self.output}")
+
+    def test_unknown_benchmark(self):
+        with self.assertRaisesMessage(CommandError, "Unknown benchmarks: missing."):
+            call_command("benchmark", "missing", stdout=StringIO())
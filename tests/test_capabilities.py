@@ -0,0 +1,101 @@
+from production.capabilities import (
+    get_capability_index,
+    peek_capability_index,
+)
+from production.forms import WorkplaceForm
+from production.models import Material, Printer, Workplace
+from production.services import (
+    filter_materials_by_workplace_active_printers,
+    filter_workplaces_by_active_printers_materials,
+)
+from tests.test_items import TestItems
+
+
+class TestCapabilityIndex(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.printer1.materials.add(self.material1, self.material2)
+        self.printer1.workplace = self.workplace1
+        self.printer1.save()
+        self.printer2.materials.add(self.material2)
+        self.printer2.workplace = self.workplace2
+        self.printer2.save()
+
+    def test_index_is_built_with_one_query(self):
+        with self.assertNumQueries(1):
+            index = get_capability_index()
+        with self.assertNumQueries(0):
+            self.assertIs(get_capability_index(), index)
+
+    def test_index_maps_materials_printers_workplaces(self):
+        index = get_capability_index()
+        self.assertEqual(
+            index.materials_for_workplace(self.workplace1.pk),
+            {self.material1.pk, self.material2.pk},
+        )
+        self.assertEqual(
+            index.workplaces_for_materials([self.material2.pk]),
+            {self.workplace1.pk, self.workplace2.pk},
+        )
+        self.assertEqual(
+            index.printers_for_material(self.material2.pk, self.workplace2.pk),
+            {self.printer2.pk},
+        )
+
+    def test_maintenance_printer_is_not_capable(self):
+        self.printer2.status = Printer.MAINTENANCE
+        self.printer2.save()
+        index = get_capability_index()
+        self.assertEqual(
+            index.workplaces_for_materials([self.material2.pk]),
+            {self.workplace1.pk},
+        )
+
+    def test_status_change_invalidates_index(self):
+        get_capability_index()
+        self.printer1.status = Printer.MAINTENANCE
+        self.printer1.save()
+        self.assertIsNone(peek_capability_index())
+
+    def test_unrelated_change_keeps_index(self):
+        index = get_capability_index()
+        self.printer1.name = "Renamed"
+        self.printer1.save()
+        self.assertIs(peek_capability_index(), index)
+
+    def test_materials_change_invalidates_index(self):
+        get_capability_index()
+        self.printer1.materials.remove(self.material1)
+        self.assertIsNone(peek_capability_index())
+        self.assertEqual(
+            get_capability_index().materials_for_workplace(self.workplace1.pk),
+            {self.material2.pk},
+        )
+
+    def test_workplace_form_bulk_update_invalidates_index(self):
+        get_capability_index()
+        form = WorkplaceForm(
+            instance=self.workplace1,
+            data={"name": self.workplace1.name, "printers": []},
+        )
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.assertIsNone(peek_capability_index())
+        self.assertEqual(
+            get_capability_index().materials_for_workplace(self.workplace1.pk),
+            set(),
+        )
+
+    def test_services_use_index(self):
+        get_capability_index()
+        with self.assertNumQueries(1):
+            materials = list(
+                filter_materials_by_workplace_active_printers(
+                    Material.objects.all(), self.workplace2
+                )
+            )
+        self.assertEqual(materials, [self.material2])
+        workplaces = filter_workplaces_by_active_printers_materials(
+            Workplace.objects.all(), [self.material1]
+        )
+        self.assertQuerySetEqual(workplaces, [self.workplace1])
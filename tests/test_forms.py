@@ -9,6 +9,7 @@ from production.forms import (
     PrintQueueUpdateForm,
 )
 from production.models import Printer, Material, Order, PrintQueue, Workplace
+from production.services import ClaimConflict
 from tests.test_items import TestItems
 
 
@@ -220,6 +221,25 @@ class TestPrintQueueCreateForm(TestItems):
         self.assertEqual(instance.workplace, self.workplace)
         self.assertEqual(set(instance.orders.all()), set(orders))
 
+    def test_concurrent_save_does_not_steal_orders(self):
+        form_data = {"material": self.material1, "orders": [self.order1_m1]}
+        first, second = (
+            PrintQueueCreateForm(data=form_data, cached_workplace=self.workplace)
+            for _ in range(2)
+        )
+        self.assertTrue(first.is_valid())
+        self.assertTrue(second.is_valid())
+        queue = first.save()
+
+        with self.assertRaises(ClaimConflict) as conflict:
+            second.save()
+
+        self.assertEqual(conflict.exception.count, 1)
+        self.assertIsNone(second.instance.pk)
+        self.assertEqual(PrintQueue.objects.count(), 2)
+        self.order1_m1.refresh_from_db()
+        self.assertEqual(self.order1_m1.print_queue, queue)
+
 
 class TestPrintQueueUpdateForm(TestItems):
     def setUp(self):
@@ -296,3 +316,48 @@ class TestPrintQueueUpdateForm(TestItems):
         form = PrintQueueUpdateForm(data=form_data, cached_instance=self.print_queue)
         self.assertFalse(form.is_valid())
         self.assertIn("orders", form.errors)
+
+    def test_removed_order_taken_meanwhile_stays(self):
+        self.print_queue.orders.set(self.orders)
+        form_data = {
+            "workplace": self.workplace1,
+            "material": self.material1,
+            "orders": [self.order1_m1],
+        }
+        form = PrintQueueUpdateForm(data=form_data, cached_instance=self.print_queue)
+        self.assertTrue(form.is_valid())
+        Order.objects.filter(pk=self.order2_m1.pk).update(print_queue=self.queue_m1)
+
+        form.save()
+
+        self.assertEqual(list(self.print_queue.orders.all()), [self.order1_m1])
+        self.order2_m1.refresh_from_db()
+        self.assertEqual(self.order2_m1.print_queue, self.queue_m1)
+
+
+class TestEvaluatedFields(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.printer1.materials.add(self.material1)
+        self.printer1.workplace = self.workplace1
+        self.printer1.save()
+
+    def test_cleaned_orders_share_rendered_choices(self):
+        form = PrintQueueCreateForm(
+            data={"material": self.material1.pk, "orders": [self.order1_m1.pk]},
+            cached_workplace=self.workplace1,
+        )
+        self.assertTrue(form.is_valid())
+        with self.assertNumQueries(0):
+            orders = list(form.cleaned_data["orders"])
+            choices = [value.instance for value, _ in form.fields["orders"].choices]
+        self.assertEqual(orders, [self.order1_m1])
+        self.assertIs(orders[0], choices[0])
+
+    def test_invalid_order_choice(self):
+        form = PrintQueueCreateForm(
+            data={"material": self.material1.pk, "orders": [self.order1_m2.pk]},
+            cached_workplace=self.workplace1,
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("orders", form.errors)
@@ -0,0 +1,65 @@
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import reverse
+
+from production.identity_map import IdentityMap, get_identity_map
+from production.models import Material, Order, Workplace
+from tests.test_items import TestItems
+
+
+class TestIdentityMap(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.identity_map = IdentityMap()
+
+    def test_repeated_get_is_served_from_map(self):
+        with self.assertNumQueries(1):
+            first = self.identity_map.get(Material, self.material1.pk)
+            second = self.identity_map.get(Material, str(self.material1.pk))
+        self.assertIs(first, second)
+        self.assertEqual(self.identity_map.hits, 1)
+        self.assertEqual(self.identity_map.saved_queries, 1)
+
+    def test_get_many_is_batched(self):
+        pks = [self.material1.pk, self.material2.pk, self.material3.pk]
+        with self.assertNumQueries(1):
+            materials = self.identity_map.get_many(Material, pks)
+        self.assertEqual(materials, [self.material1, self.material2, self.material3])
+        self.assertEqual(self.identity_map.saved_queries, 2)
+
+    def test_resolve_many_loads_related_with_one_query(self):
+        orders = list(Order.objects.all())
+        with self.assertNumQueries(1):
+            materials = self.identity_map.resolve_many(orders, "material")
+        with self.assertNumQueries(0):
+            self.assertEqual([order.material for order in orders], materials)
+        self.assertEqual(set(materials), {self.material1, self.material2})
+
+    def test_get_or_404(self):
+        with self.assertRaises(Http404):
+            self.identity_map.get_or_404(Workplace, 0)
+
+    def test_add_keeps_first_instance(self):
+        self.identity_map.add(self.workplace1)
+        other = Workplace.objects.get(pk=self.workplace1.pk)
+        self.assertIs(self.identity_map.add(other), self.workplace1)
+
+    def test_request_identity_map_is_reused(self):
+        request = RequestFactory().get("/")
+        self.assertIs(get_identity_map(request), get_identity_map(request))
+
+
+class TestIdentityMapMiddleware(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.regular_user.workplace = self.workplace1
+        self.regular_user.save()
+        self.client.force_login(self.regular_user)
+
+    def test_user_workplace_reuses_view_workplace(self):
+        url = reverse("production:workplace-detail", args=[self.workplace1.pk])
+        response = self.client.get(url)
+        identity_map = response.wsgi_request.identity_map
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(identity_map.hits, 1)
+        self.assertEqual(identity_map.saved_queries, 1)
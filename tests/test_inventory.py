@@ -0,0 +1,164 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from production.calculations import PrintQueueSummary
+from production.inventory import (
+    adjust_roll,
+    backlog_areas,
+    consume,
+    material_forecast,
+    receive_roll,
+)
+from production.models import (
+    MaterialLedgerEntry,
+    MaterialRoll,
+    MaterialStock,
+    Order,
+    PrintQueue,
+)
+from tests.test_items import TestItems
+
+
+class InventoryTest(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.queue_m1.orders.set([self.order1_m1, self.order2_m1])
+
+    def stock(self, material):
+        return MaterialStock.objects.get(material=material)
+
+    def test_receive_roll(self):
+        receive_roll(self.material1, area=50)
+        receive_roll(self.material1, area=30)
+
+        stock = self.stock(self.material1)
+        self.assertEqual((stock.rolls, stock.remaining_area), (2, 80))
+        self.assertEqual(
+            list(MaterialLedgerEntry.objects.values_list("kind", "area")),
+            [(MaterialLedgerEntry.RECEIPT, 50), (MaterialLedgerEntry.RECEIPT, 30)],
+        )
+
+    def test_consume_oldest_rolls_first(self):
+        first = receive_roll(self.material1, area=10)
+        second = receive_roll(self.material1, area=10)
+
+        consume(self.material1.pk, 14)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.remaining_area, second.remaining_area), (0, 6))
+        stock = self.stock(self.material1)
+        self.assertEqual((stock.rolls, stock.remaining_area), (1, 6))
+
+    def test_consume_beyond_stock(self):
+        receive_roll(self.material1, area=5)
+
+        entries = consume(self.material1.pk, 8)
+
+        self.assertEqual([entry.area for entry in entries], [-5, -3])
+        self.assertIsNone(entries[-1].roll)
+        stock = self.stock(self.material1)
+        self.assertEqual((stock.rolls, stock.remaining_area), (0, -3))
+
+    def test_adjust_roll(self):
+        roll = receive_roll(self.material1, area=10)
+
+        adjust_roll(roll, 0)
+
+        stock = self.stock(self.material1)
+        self.assertEqual((stock.rolls, stock.remaining_area), (0, 0))
+        self.assertEqual(
+            MaterialLedgerEntry.objects.last().kind, MaterialLedgerEntry.ADJUSTMENT
+        )
+
+    def test_done_queue_consumes_its_orders(self):
+        receive_roll(self.material1, area=50)
+        queue = PrintQueue.objects.get(pk=self.queue_m1.pk)
+        queue.status = PrintQueue.DONE
+        queue.changed_by = self.admin_user
+
+        queue.save()
+        queue.status = PrintQueue.PROBLEM
+        queue.save()
+        queue.status = PrintQueue.DONE
+        queue.save()
+
+        area = self.order1_m1.square_meters + self.order2_m1.square_meters
+        self.assertAlmostEqual(
+            self.stock(self.material1).remaining_area, 50 - area, places=1
+        )
+        entry = MaterialLedgerEntry.objects.get(kind=MaterialLedgerEntry.CONSUMPTION)
+        self.assertEqual(entry.print_queue_id, queue.pk)
+        self.assertEqual(entry.by, self.admin_user)
+
+    def test_untracked_material_is_not_consumed(self):
+        PrintQueue.objects.filter(pk=self.queue_m1.pk).change_status(PrintQueue.DONE)
+        self.assertFalse(MaterialLedgerEntry.objects.exists())
+
+    def test_backlog_and_forecast(self):
+        receive_roll(self.material1, area=10)
+        consume(self.material1.pk, 6)
+        MaterialLedgerEntry.objects.update(at=timezone.now() - timedelta(days=1))
+
+        self.assertAlmostEqual(
+            backlog_areas()[self.material1.pk],
+            sum(
+                order.square_meters
+                for order in Order.objects.filter(material=self.material1)
+            ),
+            places=1,
+        )
+        forecast = {item["material_id"]: item for item in material_forecast(days=3)}
+        item = forecast[self.material1.pk]
+        self.assertEqual(item["remaining_area"], 4)
+        self.assertEqual(item["daily_consumption"], 2)
+        # The ready backlog needs more than the stock, it runs out today.
+        self.assertEqual(item["days_left"], 0)
+        self.assertEqual(item["shortage"], round(item["backlog_area"] - 4, 2))
+        self.assertFalse(forecast[self.material2.pk]["tracked"])
+
+    def test_backlog_brings_run_out_forward(self):
+        receive_roll(self.material1, area=40)
+        consume(self.material1.pk, 6)
+        MaterialLedgerEntry.objects.update(at=timezone.now() - timedelta(days=1))
+
+        def forecast():
+            return {item["material_id"]: item for item in material_forecast(days=3)}[
+                self.material1.pk
+            ]
+
+        Order.objects.update(status=Order.PROBLEM)
+        self.assertEqual(forecast()["days_left"], 17)
+
+        Order.objects.update(status=Order.READY_TO_PRINT)
+        item = forecast()
+        self.assertEqual(
+            item["available_area"], round(34 - item["backlog_area"], 2)
+        )
+        self.assertEqual(item["days_left"], int(item["available_area"] / 2))
+        self.assertLess(item["days_left"], 17)
+
+    def test_summary_warns_about_stock(self):
+        stock = MaterialStock(material=self.material1, remaining_area=1)
+        summary = PrintQueueSummary([self.order1_m1], self.material1, stock)
+        self.assertEqual(summary.stock_left, round(1 - self.order1_m1.square_meters, 2))
+        self.assertIn(
+            "Warning: There is not enough material in stock!", summary.messages
+        )
+        self.assertIsNone(
+            PrintQueueSummary([self.order1_m1], self.material1).stock_left
+        )
+
+    def test_inventory_page_and_command(self):
+        call_command("receive_rolls", "Material1", "--count=2", stdout=StringIO())
+        self.assertEqual(MaterialRoll.objects.count(), 2)
+        self.client.force_login(self.regular_user)
+
+        response = self.client.get(reverse("production:material-inventory"))
+
+        self.assertContains(response, "Material1")
+        self.assertContains(response, "Not tracked")
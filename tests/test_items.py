@@ -1,12 +1,16 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 
+from production.capabilities import invalidate_capability_index
 from production.models import Workplace, Printer, Material, Order, PrintQueue
 
 
 class TestItems(TestCase):
 
     def setUp(self):
+        cache.clear()
+        invalidate_capability_index()
         self.admin_user = get_user_model().objects.create_superuser(
             username="admin", email="<EMAIL>", password="<PASS*0WORD>"
         )
@@ -95,4 +99,5 @@ class TestItems(TestCase):
 
         self.queue_m1 = PrintQueue.objects.create(
             material=self.material1,
+            workplace=self.workplace1,
         )
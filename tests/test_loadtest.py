@@ -0,0 +1,114 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from production.loadtest import LoadTest, compare_with_baseline, percentile
+from production.models import PrintQueue
+from tests.test_items import TestItems
+
+
+class PercentileTest(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_compare_with_baseline(self):
+        baseline = {"production:index": {"p95": 100.0, "rps": 10.0}}
+        self.assertEqual(
+            compare_with_baseline(
+                {"production:index": {"p95": 110.0, "rps": 9.0}}, baseline
+            ),
+            [],
+        )
+        regressions = compare_with_baseline(
+            {"production:index": {"p95": 150.0, "rps": 5.0}}, baseline
+        )
+        self.assertEqual(len(regressions), 2)
+
+    def test_new_url_names_are_not_regressions(self):
+        self.assertEqual(
+            compare_with_baseline({"production:index": {"p95": 1, "rps": 1}}, {}), []
+        )
+
+
+class LoadTestTest(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.printer1.workplace = self.workplace1
+        self.printer1.save()
+        self.printer1.materials.add(self.material1)
+        self.regular_user.workplace = self.workplace1
+        self.regular_user.save()
+
+    def test_workflows_are_recorded_per_url_name(self):
+        summary = LoadTest(
+            user=self.regular_user,
+            concurrency=1,
+            iterations=20,
+            seed=3,
+            host="testserver",
+        ).run()
+        self.assertIn("production:index", summary)
+        self.assertIn("production:order-list", summary)
+        for stats in summary.values():
+            self.assertEqual(stats["errors"], 0)
+            self.assertLessEqual(stats["p50"], stats["p95"])
+            self.assertLessEqual(stats["p95"], stats["p99"])
+
+    def test_create_print_queue_workflow(self):
+        queues = PrintQueue.objects.count()
+        summary = LoadTest(
+            user=self.regular_user,
+            workflows=["create_print_queue"],
+            concurrency=1,
+            iterations=1,
+            host="testserver",
+        ).run()
+        self.assertEqual(summary["production:print-queue-create"]["requests"], 3)
+        self.assertEqual(PrintQueue.objects.count(), queues + 1)
+
+    def test_unknown_workflow(self):
+        with self.assertRaises(ValueError):
+            LoadTest(user=self.regular_user, workflows=["unknown"])
+
+    def test_command_saves_and_compares_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = Path(directory) / "baseline.json"
+            options = [
+                "--workflows=dashboard",
+                "--concurrency=1",
+                "--iterations=2",
+                "--host=testserver",
+                f"--username={self.regular_user.username}",
+                f"--baseline={baseline}",
+            ]
+            call_command(
+                "loadtest",
+                *options,
+                "--save-baseline",
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+            with open(baseline) as file:
+                self.assertIn("production:index", json.load(file))
+
+            call_command(
+                "loadtest",
+                *options,
+                "--tolerance=1000",
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+
+            with open(baseline, "w") as file:
+                json.dump({"production:index": {"p95": 0.001, "rps": 1e6}}, file)
+            with self.assertRaises(CommandError):
+                call_command("loadtest", *options, stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,66 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from production.memory import MemoryProfile, format_bytes, profile_memory
+from tests.test_items import TestItems
+
+
+def allocate(blocks):
+    return [bytearray(1024) for _ in range(blocks)]
+
+
+class MemoryProfileTest(SimpleTestCase):
+    def test_peak_and_top_lines(self):
+        with MemoryProfile(top=3).measure() as profile:
+            held = allocate(200)
+            allocate(1000)
+        self.assertGreaterEqual(profile.peak, 1000 * 1024)
+        self.assertLess(profile.allocated, profile.peak)
+        top = profile.top_lines[0]
+        self.assertTrue(top["location"].startswith("tests/test_memory.py:"))
+        self.assertGreaterEqual(top["size"], 200 * 1024)
+        self.assertEqual(len(held), 200)
+
+    def test_one_profile_at_a_time(self):
+        with profile_memory() as outer:
+            with profile_memory() as inner:
+                pass
+        self.assertIsNotNone(outer)
+        self.assertIsNone(inner)
+
+    def test_format_bytes(self):
+        self.assertEqual(format_bytes(512), "512 B")
+        self.assertEqual(format_bytes(3 * 1024 * 1024), "3.0 MiB")
+
+
+class MemoryProfilerMiddlewareTest(TestItems):
+    @override_settings(MEMORY_PROFILER_URL_NAMES=["production:print-queue-list"])
+    def test_chosen_views_are_logged(self):
+        self.client.force_login(self.admin_user)
+        with self.assertLogs("production.memory", "INFO") as logs:
+            self.client.get(reverse("production:print-queue-list"))
+            self.client.get(reverse("production:material-list"))
+        (record,) = logs.records
+        self.assertEqual(record.memory["url_name"], "production:print-queue-list")
+        self.assertGreater(record.memory["peak_bytes"], 0)
+
+
+class ProfileMemoryCommandTest(TestItems):
+    def test_profiles_every_size(self):
+        out = StringIO()
+        call_command(
+            "profile_memory",
+            "production:workplace-detail",
+            "--sizes=20,40",
+            "--host=testserver",
+            "--noinput",
+            stdout=out,
+            stderr=StringIO(),
+        )
+        output = out.getvalue()
+        self.assertIn("20 orders, /workplaces/", output)
+        self.assertIn("40 orders, /workplaces/", output)
+        self.assertIn("orders      peak       held", output)
@@ -0,0 +1,174 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from production.metrics import EXITED_FILE, MetricsRegistry, get_domain_gauges
+from production.middleware import MetricsMiddleware
+from tests.test_items import TestItems
+
+
+class MetricsRegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.counter("test_requests_total", "Requests.")
+        self.latency = self.registry.histogram(
+            "test_latency_seconds", "Latency.", buckets=(0.1, 1.0)
+        )
+
+    def test_render_counters_and_histograms(self):
+        self.requests.inc(url_name="production:index")
+        self.requests.inc(2, url_name="production:index")
+        self.latency.observe(0.05, url_name="production:index")
+        self.latency.observe(0.5, url_name="production:index")
+        self.latency.observe(5, url_name="production:index")
+        text = self.registry.render()
+        self.assertIn("# TYPE test_requests_total counter", text)
+        self.assertIn('test_requests_total{url_name="production:index"} 3', text)
+        self.assertIn(
+            'test_latency_seconds_bucket{url_name="production:index",le="0.1"} 1', text
+        )
+        self.assertIn(
+            'test_latency_seconds_bucket{url_name="production:index",le="1.0"} 2', text
+        )
+        self.assertIn(
+            'test_latency_seconds_bucket{url_name="production:index",le="+Inf"} 3', text
+        )
+        self.assertIn('test_latency_seconds_count{url_name="production:index"} 3', text)
+
+    def test_gauges_are_grouped_by_name(self):
+        text = self.registry.render(
+            [
+                ("test_a", "A.", {"material": "Vinyl"}, 1),
+                ("test_b", "B.", {"material": "Vinyl"}, 2),
+                ("test_a", "A.", {"material": "Silk"}, 3),
+            ]
+        )
+        lines = text.splitlines()
+        a_lines = [
+            index for index, line in enumerate(lines) if line.startswith("test_a")
+        ]
+        self.assertEqual(a_lines[1] - a_lines[0], 1)
+        self.assertEqual(text.count("# TYPE test_a gauge"), 1)
+
+    def test_values_are_reset_after_fork(self):
+        self.requests.inc(url_name="production:index")
+        self.registry.pid = -1
+        self.requests.inc(url_name="production:index")
+        self.assertIn(
+            'test_requests_total{url_name="production:index"} 1', self.registry.render()
+        )
+
+    def test_processes_are_summed_from_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = MetricsRegistry(directory=directory)
+            requests = registry.counter("test_requests_total", "Requests.")
+            latency = registry.histogram("test_latency", "Latency.", buckets=(1.0,))
+            requests.inc(url_name="production:index")
+            latency.observe(0.5, url_name="production:index")
+
+            other = MetricsRegistry()
+            other.counter("test_requests_total", "Requests.").inc(
+                4, url_name="production:index"
+            )
+            other.histogram("test_latency", "Latency.", buckets=(1.0,)).observe(
+                2, url_name="production:index"
+            )
+            with open(Path(directory) / "metrics-999999-1.json", "w") as file:
+                json.dump(other.snapshot(), file)
+
+            with mock.patch("production.metrics.pid_alive", return_value=True):
+                text = registry.render()
+        self.assertIn('test_requests_total{url_name="production:index"} 5', text)
+        self.assertIn(
+            'test_latency_bucket{url_name="production:index",le="1.0"} 1', text
+        )
+        self.assertIn('test_latency_count{url_name="production:index"} 2', text)
+
+    def write_process(self, directory, name, amount):
+        other = MetricsRegistry()
+        other.counter("test_requests_total", "Requests.").inc(amount)
+        with open(Path(directory) / name, "w") as file:
+            json.dump(other.snapshot(), file)
+
+    def test_exited_processes_are_merged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = MetricsRegistry(directory=directory)
+            registry.counter("test_requests_total", "Requests.").inc()
+            self.write_process(directory, "metrics-999998-1.json", 2)
+            # The pid was reused: the older file is of an exited process.
+            self.write_process(directory, "metrics-999999-1.json", 4)
+            self.write_process(directory, "metrics-999999-2.json", 8)
+
+            alive = {999999}
+            with mock.patch("production.metrics.pid_alive", alive.__contains__):
+                first = registry.render()
+                names = os.listdir(directory)
+                alive.clear()
+                second = registry.render()
+                merged = os.listdir(directory)
+
+        self.assertIn("test_requests_total 15", first)
+        self.assertCountEqual(
+            [name for name in names if name.endswith(".json")],
+            [EXITED_FILE, registry.path().name, "metrics-999999-2.json"],
+        )
+        self.assertIn("test_requests_total 15", second)
+        self.assertCountEqual(
+            [name for name in merged if name.endswith(".json")],
+            [EXITED_FILE, registry.path().name],
+        )
+
+
+class MetricsMiddlewareTest(SimpleTestCase):
+    def test_disabled_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: None)
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsEndpointTest(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("metrics")
+
+    def test_staff_can_scrape(self):
+        self.client.force_login(self.admin_user)
+        self.client.get(reverse("production:material-list"))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('url_name="production:material-list"', text)
+        self.assertIn("wallis_http_request_duration_seconds_bucket", text)
+        self.assertIn("wallis_db_queries_per_request_bucket", text)
+        self.assertIn('wallis_orders{status="ready_to_print"}', text)
+        self.assertIn('wallis_backlog_square_meters{material="Material1"}', text)
+
+    def test_regular_user_is_forbidden(self):
+        self.client.force_login(self.regular_user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_token_scrape_does_not_query_database(self):
+        headers = {"Authorization": "Bearer secret"}
+        self.assertEqual(self.client.get(self.url, headers=headers).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        wrong = {"Authorization": "Bearer wrong"}
+        self.assertEqual(self.client.get(self.url, headers=wrong).status_code, 403)
+
+    def test_domain_gauges(self):
+        gauges = {
+            (name, tuple(labels.items())): value
+            for name, _, labels, value in get_domain_gauges()
+        }
+        material1 = (("material", "Material1"),)
+        self.assertEqual(gauges[("wallis_backlog_orders", material1)], 3)
+        self.assertEqual(gauges[("wallis_backlog_square_meters", material1)], 16.34)
+        self.assertEqual(gauges[("wallis_orders", (("status", "ready_to_print"),))], 5)
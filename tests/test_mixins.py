@@ -2,13 +2,15 @@ from unittest import TestCase
 
 from django import forms
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.db.models import Q
 from django.forms import ModelForm
 from django.test import RequestFactory
 from django.urls import reverse
 
+from production.fields import EvaluatedModelChoiceField
 from production.forms import WorkerSearchForm
+from production.identity_map import IdentityMap
 from production.mixins import (
     ViewSuccessUrlMixin,
     ListViewSearchMixin,
@@ -73,6 +75,8 @@ class TestViewSuccessUrlMixin(TestItems):
 
     def test_get_success_url_without_view_name(self):
         self.mixin.object = self.regular_user
+        view_name = get_user_model().view_name
+        self.addCleanup(setattr, get_user_model(), "view_name", view_name)
         delattr(get_user_model(), "view_name")
         with self.assertRaises(ImproperlyConfigured):
             self.mixin.get_success_url()
@@ -250,3 +254,22 @@ class TestFormFieldMixin(TestItems):
         self.assertQuerySetEqual(
             expected_context, self.form.initial_context["printers"]
         )
+
+    def test_field_object_from_identity_map_must_be_a_choice(self):
+        identity_map = IdentityMap()
+        identity_map.add(self.printer2)
+        self.form.identity_map = identity_map
+        for field in [
+            forms.ModelChoiceField(queryset=Printer.objects.filter(workplace=None)),
+            EvaluatedModelChoiceField(queryset=Printer.objects.filter(workplace=None)),
+        ]:
+            with self.assertRaises((Printer.DoesNotExist, ValidationError)):
+                self.form.get_field_object(field, self.printer2.pk)
+            self.assertIs(
+                self.form.get_field_object(field, self.printer3.pk),
+                identity_map.get(Printer, self.printer3.pk),
+            )
+
+        identity_map.add(self.printer4)
+        field = EvaluatedModelChoiceField(queryset=Printer.objects.all())
+        self.assertIs(self.form.get_field_object(field, self.printer4.pk), self.printer4)
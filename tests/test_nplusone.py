@@ -0,0 +1,103 @@
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory
+
+from production.middleware import NPlusOneMiddleware
+from production.models import PrintQueue
+from production.nplusone import NPlusOneError, detect_nplusone
+from production.slow_queries import slow_query_log
+from tests.test_items import TestItems
+
+QUEUE_TEMPLATE = """{% for queue in queues %}
+{{ queue.pk }}: {{ queue.orders.count }}
+{% endfor %}"""
+
+
+class NPlusOneDetectorTest(TestItems):
+    def setUp(self):
+        super().setUp()
+        for _ in range(3):
+            PrintQueue.objects.create(
+                material=self.material1, workplace=self.workplace1
+            )
+        self.template = engines["django"].from_string(QUEUE_TEMPLATE)
+
+    def count_orders(self):
+        for queue in PrintQueue.objects.all():
+            queue.orders.count()
+
+    def test_template_loop_raises_with_template_line(self):
+        with self.assertRaises(NPlusOneError) as error:
+            with detect_nplusone(raise_error=True, label="queues"):
+                self.template.render({"queues": PrintQueue.objects.all()})
+        message = str(error.exception)
+        self.assertIn("N+1 queries in queues", message)
+        self.assertIn("4 x SELECT COUNT(*)", message)
+        self.assertIn(":2 (python:", message)
+
+    def test_prefetched_loop_passes(self):
+        with detect_nplusone(raise_error=True) as detector:
+            self.template.render(
+                {"queues": PrintQueue.objects.prefetch_related("orders")}
+            )
+        self.assertEqual(detector.findings(), [])
+
+    def test_python_origin_is_reported(self):
+        with detect_nplusone() as detector:
+            self.count_orders()
+        (finding,) = detector.findings()
+        ((template, origin),) = finding["locations"]
+        self.assertIsNone(template)
+        self.assertIn("NPlusOneDetectorTest.count_orders:", origin)
+
+    def test_same_parameters_are_not_reported(self):
+        with detect_nplusone() as detector:
+            for _ in range(4):
+                self.queue_m1.orders.count()
+        self.assertEqual(detector.findings(), [])
+
+    def test_slow_query_log_queries_are_ignored(self):
+        with detect_nplusone() as detector:
+            for index in range(3):
+                slow_query_log.save(
+                    {
+                        "fingerprint_hash": str(index),
+                        "fingerprint": f"SELECT {index}",
+                        "sql": f"SELECT {index}",
+                        "origin": "",
+                        "view_name": "",
+                        "duration_ms": 1.0,
+                        "explain": "",
+                    }
+                )
+        self.assertEqual(detector.findings(), [])
+
+    def test_log_mode_warns(self):
+        with self.assertLogs("production.nplusone", "WARNING") as logs:
+            with detect_nplusone():
+                self.count_orders()
+        self.assertIn("SELECT COUNT(*)", logs.output[0])
+
+
+class NPlusOneMiddlewareTest(TestItems):
+    def view(self, request):
+        for queue in PrintQueue.objects.all():
+            queue.orders.count()
+        return HttpResponse()
+
+    def test_raise_mode(self):
+        for _ in range(3):
+            PrintQueue.objects.create(
+                material=self.material1, workplace=self.workplace1
+            )
+        request = RequestFactory().get("/queues/")
+        with self.settings(NPLUSONE_MODE="raise"):
+            middleware = NPlusOneMiddleware(self.view)
+        with self.assertRaisesMessage(NPlusOneError, "GET /queues/"):
+            middleware(request)
+
+    def test_disabled_without_mode(self):
+        with self.settings(NPLUSONE_MODE=None):
+            with self.assertRaises(MiddlewareNotUsed):
+                NPlusOneMiddleware(self.view)
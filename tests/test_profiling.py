@@ -0,0 +1,129 @@
+import tempfile
+import time
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from production.profiling import ProfileStore, StackSampler
+from tests.test_items import TestItems
+
+
+def busy_function(seconds):
+    finish = time.perf_counter() + seconds
+    while time.perf_counter() < finish:
+        pass
+
+
+class StackSamplerTest(SimpleTestCase):
+    def test_collapsed_stacks_of_the_thread(self):
+        sampler = StackSampler(interval=0.001).start()
+        busy_function(0.05)
+        sampler.stop()
+        self.assertGreater(sampler.samples, 0)
+        self.assertIn(
+            "tests.test_profiling:StackSamplerTest.test_collapsed_stacks_of_the_thread"
+            ";tests.test_profiling:busy_function ",
+            sampler.collapsed(),
+        )
+
+    def test_samples_are_bounded(self):
+        sampler = StackSampler(interval=0.001, max_samples=3).start()
+        busy_function(0.05)
+        sampler.stop()
+        self.assertEqual(sampler.samples, 3)
+
+
+class ProfileStoreTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_save_and_list(self):
+        store = ProfileStore(self.directory.name)
+        path = store.save("a;b 2\n", "slow", "production:order-list", 1.5)
+        (profile,) = store.list()
+        self.assertEqual(profile["name"], path.name)
+        self.assertEqual(profile["trigger"], "slow")
+        self.assertEqual(profile["view_name"], "production-order-list")
+        self.assertEqual(profile["duration_ms"], 1500)
+        self.assertEqual(store.path(path.name), path)
+
+    def test_oldest_files_are_removed(self):
+        store = ProfileStore(self.directory.name, max_files=2)
+        for duration in (1, 2, 3):
+            store.save("a;b 1\n", "url", "production:index", duration)
+        self.assertEqual(
+            [profile["duration_ms"] for profile in store.list()], [3000, 2000]
+        )
+
+    def test_disk_usage_is_bounded(self):
+        store = ProfileStore(self.directory.name, max_bytes=20)
+        for duration in (1, 2, 3):
+            store.save("a;b 1\n" * 2, "url", "production:index", duration)
+        self.assertEqual([profile["duration_ms"] for profile in store.list()], [3000])
+
+    def test_only_profile_names_are_served(self):
+        store = ProfileStore(self.directory.name)
+        self.assertIsNone(store.path("../settings.py"))
+
+
+class ProfilerMiddlewareTest(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = ProfileStore(self.directory.name)
+
+    def profiler(self, **kwargs):
+        return override_settings(
+            PROFILER_ENABLED=True,
+            PROFILER_DIR=self.directory.name,
+            PROFILER_INTERVAL_MS=0.1,
+            **kwargs,
+        )
+
+    def test_header_profiles_staff_requests(self):
+        self.client.force_login(self.admin_user)
+        with self.profiler():
+            self.client.get(reverse("production:order-list"), HTTP_X_PROFILE="1")
+        (profile,) = self.store.list()
+        self.assertEqual(profile["trigger"], "header")
+        self.assertEqual(profile["view_name"], "production-order-list")
+
+    def test_header_is_ignored_for_other_users(self):
+        self.client.force_login(self.regular_user)
+        with self.profiler():
+            self.client.get(reverse("production:order-list"), HTTP_X_PROFILE="1")
+        self.assertEqual(self.store.list(), [])
+
+    def test_url_names(self):
+        self.client.force_login(self.regular_user)
+        with self.profiler(PROFILER_URL_NAMES=["production:order-list"]):
+            self.client.get(reverse("production:order-list"))
+            self.client.get(reverse("production:material-list"))
+        (profile,) = self.store.list()
+        self.assertEqual(profile["trigger"], "url")
+
+    def test_fast_requests_are_not_kept(self):
+        self.client.force_login(self.regular_user)
+        with self.profiler(PROFILER_SLOW_MS=60_000, PROFILER_SLOW_SAMPLE_RATE=1):
+            self.client.get(reverse("production:order-list"))
+        self.assertEqual(self.store.list(), [])
+
+    def test_profiles_page_is_for_staff(self):
+        path = self.store.save("a;b 2\n", "url", "production:index", 0.2)
+        with self.profiler():
+            self.client.force_login(self.regular_user)
+            self.assertEqual(self.client.get(reverse("profile-list")).status_code, 403)
+
+            self.client.force_login(self.admin_user)
+            response = self.client.get(reverse("profile-list"))
+            self.assertContains(response, "production-index")
+            response = self.client.get(
+                reverse("profile-download", kwargs={"name": path.name})
+            )
+            self.assertEqual(b"".join(response.streaming_content), b"a;b 2\n")
+            response = self.client.get(
+                reverse("profile-download", kwargs={"name": "missing.collapsed"})
+            )
+            self.assertEqual(response.status_code, 404)
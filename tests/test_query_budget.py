@@ -0,0 +1,169 @@
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from production.capabilities import get_capability_index
+from production.models import (
+    Material,
+    Order,
+    Printer,
+    PrintQueue,
+    Worker,
+    Workplace,
+)
+from production.nplusone import detect_nplusone
+from production.sql import diff_queries, fingerprint_sql
+from production.urls import urlpatterns
+from tests.test_items import TestItems
+
+# Rows added to every table between the two measurements.
+GROWTH = 6
+
+
+class QueryBudgetTest(TestItems):
+    """
+    Render every URL of `production/urls.py` with the TestItems
+    fixtures and again after the tables grew.
+    The number of queries must not depend on the number of rows.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin_user)
+        self.admin_user.workplace = self.workplace1
+        self.admin_user.save()
+        for printer in [self.printer1, self.printer2]:
+            printer.workplace = self.workplace1
+            printer.save()
+            printer.materials.add(self.material1, self.material2)
+        self.order1_m1.print_queue = self.queue_m1
+        self.order1_m1.save()
+        self.order2_m2.status = Order.PROBLEM
+        self.order2_m2.save()
+
+    def url_objects(self) -> dict[str, object]:
+        """Object passed as `pk` to URLs with a `pk` kwarg, by URL prefix."""
+        return {
+            "worker": self.regular_user,
+            "workplace": self.workplace1,
+            "material": self.material1,
+            "printer": self.printer1,
+            "print-queue-create": self.workplace1,
+            "print-queue": self.queue_m1,
+            "order": self.order1_m1,
+            "change-order-status": self.order1_m1,
+        }
+
+    def get_url(self, pattern: URLPattern) -> str:
+        name = f"production:{pattern.name}"
+        if "pk" not in pattern.pattern.converters:
+            return reverse(name)
+        objects = self.url_objects()
+        prefix = max(
+            (prefix for prefix in objects if pattern.name.startswith(prefix)),
+            key=len,
+        )
+        return reverse(name, kwargs={"pk": objects[prefix].pk})
+
+    def grow_dataset(self, size: int) -> None:
+        for index in range(size):
+            workplace = Workplace.objects.create(name=f"wp_{index}")
+            Worker.objects.create_user(
+                username=f"budget_worker_{index}",
+                password="<PASS*0WORD>",
+                workplace=self.workplace1,
+            )
+            material = Material.objects.create(
+                name=f"budget_material_{index}",
+                type="test",
+                roll_width=1,
+                winding=100,
+                density=1,
+            )
+            printer = Printer.objects.create(
+                name=f"budget_printer_{index}",
+                model=f"budget_model_{index}",
+                workplace=self.workplace1,
+            )
+            printer.materials.add(self.material1, material)
+            Printer.objects.create(
+                name=f"budget_other_{index}",
+                model=f"budget_other_model_{index}",
+                workplace=workplace,
+            )
+            queue = PrintQueue.objects.create(
+                material=self.material1, workplace=self.workplace1
+            )
+            for order_index in range(2):
+                Order.objects.create(
+                    code=f"9{index}{order_index}",
+                    owner_full_name="owner",
+                    image_name="budget.tiff",
+                    width=230,
+                    height=240,
+                    material=self.material1,
+                    print_queue=queue if order_index else None,
+                )
+            self.queue_m1.orders.add(
+                Order.objects.create(
+                    code=f"8{index}",
+                    owner_full_name="owner",
+                    image_name="budget.tiff",
+                    width=230,
+                    height=240,
+                    material=self.material1,
+                    status=Order.PROBLEM,
+                )
+            )
+
+    def capture(
+        self, urls: dict[str, str], nplusone: bool = False
+    ) -> dict[str, list[str]]:
+        get_capability_index()
+        captured = {}
+        for name, url in urls.items():
+            with (
+                CaptureQueriesContext(connection) as context,
+                detect_nplusone(raise_error=nplusone, label=name),
+            ):
+                response = self.client.get(url)
+            self.assertLess(response.status_code, 400, f"{name}: {url}")
+            captured[name] = [query["sql"] for query in context.captured_queries]
+        return captured
+
+    def test_queries_do_not_grow_with_rows(self):
+        urls = {pattern.name: self.get_url(pattern) for pattern in urlpatterns}
+        small = self.capture(urls)
+        self.grow_dataset(GROWTH)
+        large = self.capture(urls, nplusone=True)
+        for name in urls:
+            with self.subTest(url_name=name):
+                self.assertLessEqual(
+                    len(large[name]),
+                    len(small[name]),
+                    f"\n{name} ({urls[name]}) runs "
+                    f"{len(small[name])} -> {len(large[name])} queries:\n"
+                    + diff_queries(small[name], large[name]),
+                )
+
+
+class FingerprintSqlTest(SimpleTestCase):
+    def test_parameters_share_fingerprint(self):
+        self.assertEqual(
+            fingerprint_sql("SELECT * FROM t WHERE id = 1 AND name = 'a'"),
+            fingerprint_sql("SELECT * FROM t WHERE id = 25 AND name = 'b''c'"),
+        )
+
+    def test_in_lists_collapse(self):
+        self.assertEqual(
+            fingerprint_sql("SELECT * FROM t WHERE id IN (1, 2, 3)"),
+            "SELECT * FROM t WHERE id IN (...)",
+        )
+
+    def test_diff_reports_grown_shapes(self):
+        report = diff_queries(
+            ["SELECT * FROM t WHERE id = 1"],
+            ["SELECT * FROM t WHERE id = 1", "SELECT * FROM t WHERE id = 2"],
+        )
+        self.assertIn("+1 x SELECT * FROM t WHERE id = ?", report)
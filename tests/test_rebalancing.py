@@ -0,0 +1,148 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from production.models import Material, Order, PrintQueue
+from production.rebalancing import QueuePlan, plan_material, rebalance_workplace
+from tests.test_items import TestItems
+
+CREATED = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class PlanMaterialTest(SimpleTestCase):
+    def setUp(self):
+        self.material = Material(pk=1, name="Material", winding=10)
+        self.next_pk = 0
+
+    def orders(self, count, width=100, height=100):
+        orders = []
+        for _ in range(count):
+            self.next_pk += 1
+            orders.append(
+                Order(
+                    pk=self.next_pk,
+                    width=width,
+                    height=height,
+                    creation_time=CREATED,
+                )
+            )
+        return orders
+
+    def test_split_over_wound_queue(self):
+        orders = self.orders(14)
+
+        plan = plan_material(self.material, [QueuePlan(1, orders)])
+
+        self.assertEqual([queue.queue_id for queue in plan.after], [1, None])
+        self.assertEqual(plan.after[0].orders, orders[:10])
+        self.assertEqual(plan.after[1].orders, orders[10:])
+        self.assertEqual(plan.moves, {order.pk: 1 for order in orders[10:]})
+
+    def test_merge_under_filled_queues(self):
+        first, second, third = self.orders(6), self.orders(2), self.orders(1)
+
+        plan = plan_material(
+            self.material,
+            [QueuePlan(1, first), QueuePlan(2, second), QueuePlan(3, third)],
+        )
+
+        self.assertEqual(len(plan.after), 1)
+        self.assertEqual(plan.after[0].orders, first + second + third)
+        self.assertEqual(plan.removed, [2, 3])
+
+    def test_oldest_queue_is_not_merged_into_newer(self):
+        first, second = self.orders(2), self.orders(6)
+
+        plan = plan_material(self.material, [QueuePlan(1, first), QueuePlan(2, second)])
+
+        self.assertEqual([queue.queue_id for queue in plan.after], [1, 2])
+        self.assertEqual(plan.after[0].orders, first)
+        self.assertFalse(plan.changed)
+
+    def test_queue_is_kept_if_orders_do_not_fit(self):
+        plan = plan_material(
+            self.material, [QueuePlan(1, self.orders(8)), QueuePlan(2, self.orders(3))]
+        )
+
+        self.assertFalse(plan.changed)
+        self.assertEqual([len(queue.orders) for queue in plan.after], [8, 3])
+
+    def test_odd_tile_counts_are_paired(self):
+        self.material.winding = 6
+        first = self.orders(3) + self.orders(1, width=150)
+        second = self.orders(3) + self.orders(1, width=150)
+
+        plan = plan_material(self.material, [QueuePlan(1, first), QueuePlan(2, second)])
+
+        self.assertEqual([queue.tiles for queue in plan.before], [9, 9])
+        self.assertEqual([queue.tiles for queue in plan.after], [12, 6])
+        self.assertEqual(plan.moves, {second[-1].pk: 0})
+
+    def test_larger_order_than_winding_stays_alone(self):
+        orders = self.orders(2, width=400, height=400)
+
+        plan = plan_material(self.material, [QueuePlan(1, orders)])
+
+        self.assertEqual([len(queue.orders) for queue in plan.after], [1, 1])
+        self.assertIn(
+            "Warning: You have too many orders!",
+            plan.as_dict()["queues"]["before"][0]["messages"],
+        )
+
+
+class RebalanceWorkplaceTest(TestItems):
+    def setUp(self):
+        super().setUp()
+        Material.objects.filter(pk=self.material1.pk).update(winding=12)
+        self.queue_m1.orders.set([self.order1_m1, self.order2_m1, self.order3_m1])
+
+    def test_preview_writes_nothing(self):
+        with self.assertNumQueries(5):
+            plans = rebalance_workplace(self.workplace1)
+
+        self.assertEqual(plans[0].as_dict()["new_queues"], 1)
+        self.assertEqual(PrintQueue.objects.count(), 1)
+
+    def test_apply_splits_and_merges(self):
+        rebalance_workplace(self.workplace1, apply=True, by=self.admin_user)
+
+        new_queue = PrintQueue.objects.exclude(pk=self.queue_m1.pk).get()
+        self.assertEqual(list(new_queue.orders.all()), [self.order3_m1])
+        self.assertEqual(new_queue.workplace, self.workplace1)
+
+        Material.objects.filter(pk=self.material1.pk).update(winding=20)
+        rebalance_workplace(self.workplace1, apply=True)
+
+        self.assertEqual(list(PrintQueue.objects.all()), [self.queue_m1])
+        self.assertEqual(self.queue_m1.orders.count(), 3)
+
+    def test_problem_queues_are_left(self):
+        PrintQueue.objects.filter(pk=self.queue_m1.pk).update(status=PrintQueue.PROBLEM)
+
+        self.assertEqual(rebalance_workplace(self.workplace1, apply=True), [])
+        self.assertEqual(PrintQueue.objects.count(), 1)
+
+    def test_page_and_command(self):
+        url = reverse("production:workplace-rebalance", args=[self.workplace1.pk])
+        self.client.force_login(self.regular_user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.admin_user)
+        response = self.client.get(url)
+        self.assertContains(response, "1 orders moved")
+        self.assertContains(response, "Apply")
+
+        out = StringIO()
+        call_command("rebalance_queues", self.workplace1.pk, stdout=out)
+        self.assertIn("Would rebalance 1 of 1 materials.", out.getvalue())
+        self.assertEqual(PrintQueue.objects.count(), 1)
+
+        response = self.client.post(url, {"approve": ""})
+        self.assertRedirects(
+            response,
+            reverse("production:workplace-detail", args=[self.workplace1.pk]),
+        )
+        self.assertEqual(PrintQueue.objects.count(), 2)
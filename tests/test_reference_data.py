@@ -0,0 +1,104 @@
+from django.urls import reverse
+
+from production.capabilities import get_capability_index, peek_capability_index
+from production.filters import OrderFilter, PrintQueueFilter
+from production.forms import PrinterForm, WorkerCreateForm
+from production.models import Material, Order, Printer, PrintQueue
+from production.reference_data import ReferenceData, get_reference_data
+from production.versioning import SharedVersion
+from tests.test_items import TestItems
+
+
+class TestReferenceData(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.reference_data = get_reference_data(Material)
+
+    def test_choices_are_cached(self):
+        with self.assertNumQueries(1):
+            choices = self.reference_data.choices()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.reference_data.choices(), choices)
+        self.assertEqual(
+            choices,
+            [(material.pk, str(material)) for material in Material.objects.all()],
+        )
+
+    def test_printer_labels_use_full_name(self):
+        labels = get_reference_data(Printer).labels()
+        self.assertEqual(labels[self.printer1.pk], self.printer1.full_name)
+
+    def test_save_invalidates_choices(self):
+        self.reference_data.choices()
+        material = Material.objects.create(
+            name="New", type="test", roll_width=1, winding=1, density=1
+        )
+        self.assertIn((material.pk, "New"), self.reference_data.choices())
+
+    def test_delete_invalidates_choices(self):
+        self.reference_data.choices()
+        pk = self.material3.pk
+        self.material3.delete()
+        self.assertNotIn(pk, self.reference_data.labels())
+
+    def test_other_process_sees_new_version(self):
+        other_process = ReferenceData(Material)
+        other_process.choices()
+        self.material1.name = "Renamed"
+        self.material1.save()
+        self.assertEqual(other_process.labels()[self.material1.pk], "Renamed")
+
+    def test_capability_index_is_rebuilt_after_shared_bump(self):
+        index = get_capability_index()
+        SharedVersion("capability_index").bump()
+        self.assertIsNone(peek_capability_index())
+        self.assertIsNot(get_capability_index(), index)
+
+
+class TestReferenceChoicesRendering(TestItems):
+    def setUp(self):
+        super().setUp()
+        for model in ["production.Material", "production.Workplace"]:
+            get_reference_data(model).choices()
+        get_reference_data(Printer).choices()
+
+    def test_filters_render_without_queries(self):
+        order_filter = OrderFilter(queryset=Order.objects.none())
+        print_queue_filter = PrintQueueFilter(queryset=PrintQueue.objects.none())
+        with self.assertNumQueries(0):
+            str(order_filter.form)
+            str(print_queue_filter.form)
+
+    def test_forms_render_without_queries(self):
+        with self.assertNumQueries(0):
+            str(PrinterForm())
+            str(WorkerCreateForm())
+
+    def test_filter_by_cached_choice(self):
+        order_filter = OrderFilter(
+            data={"material": self.material2.pk}, queryset=Order.objects.all()
+        )
+        self.assertQuerySetEqual(
+            order_filter.qs, Order.objects.filter(material=self.material2)
+        )
+
+    def test_printer_form_saves_cached_choices(self):
+        form = PrinterForm(
+            data={
+                "name": "New",
+                "model": "new-model",
+                "speed": 10,
+                "status": Printer.ACTIVE,
+                "workplace": self.workplace1.pk,
+                "materials": [self.material1.pk],
+            }
+        )
+        self.assertTrue(form.is_valid())
+        printer = form.save()
+        self.assertEqual(printer.workplace, self.workplace1)
+        self.assertEqual(list(printer.materials.all()), [self.material1])
+
+    def test_printer_create_page_renders(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(reverse("production:printer-create"))
+        self.assertContains(response, self.material1.name)
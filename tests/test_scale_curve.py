@@ -0,0 +1,77 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from production.scale_curve import (
+    ScaleCurve,
+    format_table,
+    growth_exponent,
+    page_urls,
+    render_html,
+)
+from tests.test_items import TestItems
+
+PAGES = ["production:order-list", "production:workplace-detail"]
+
+
+class GrowthExponentTest(SimpleTestCase):
+    def test_constant_and_linear_growth(self):
+        sizes = [1_000, 10_000, 100_000]
+        self.assertEqual(growth_exponent(sizes, [5, 5, 5]), 0)
+        self.assertEqual(growth_exponent(sizes, [1, 10, 100]), 1)
+        self.assertEqual(growth_exponent(sizes, [1, 100, 10_000]), 2)
+
+    def test_one_size_has_no_exponent(self):
+        self.assertIsNone(growth_exponent([1_000], [5]))
+
+
+class ScaleCurveTest(TestItems):
+    def test_page_urls(self):
+        urls = page_urls()
+        self.assertEqual(urls["production:order-list"], "/orders/")
+        self.assertEqual(
+            urls["production:print-queue-create"],
+            f"/workplaces/{self.workplace1.pk}/print-queue-create",
+        )
+        self.assertNotIn("production:change-order-status", urls)
+
+    def test_every_page_is_measured_at_every_size(self):
+        curve = ScaleCurve(
+            self.admin_user,
+            sizes=[40, 20],
+            url_names=PAGES,
+            repeat=1,
+            host="testserver",
+        )
+        results = curve.run()
+        self.assertEqual(sorted(results), sorted(PAGES))
+        for url_name in PAGES:
+            self.assertEqual(sorted(results[url_name]), [20, 40])
+            stats = results[url_name][40]
+            self.assertEqual(stats["status"], 200)
+            self.assertGreater(stats["queries"], 0)
+            self.assertGreater(stats["peak_kib"], 0)
+        self.assertIn("production:order-list", format_table(curve))
+        self.assertEqual(render_html(curve).count("<svg"), 2)
+
+    def test_command_stores_results(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "scale.json"
+            call_command(
+                "scale_benchmark",
+                *PAGES,
+                "--sizes=20,40",
+                "--repeat=1",
+                "--host=testserver",
+                "--noinput",
+                f"--output={output}",
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+            results = json.loads(output.read_text())
+        self.assertEqual(results["sizes"], [20, 40])
+        self.assertIn("latency_ms", results["exponents"]["production:order-list"])
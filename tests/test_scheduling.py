@@ -0,0 +1,227 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from production.capabilities import CapabilityIndex
+from production.forms import PrintQueueUpdateForm
+from production.models import Order, Printer, PrintQueue
+from production.scheduling import (
+    HOUR,
+    PrinterSchedule,
+    plan_queues,
+    printer_plan,
+)
+from production.services import set_remove_foreign_by_cleaned_data_and_instance
+from tests.test_items import TestItems
+
+
+class PrinterScheduleTest(SimpleTestCase):
+    def setUp(self):
+        index = CapabilityIndex(
+            [
+                (1, Printer.ACTIVE, 10, 100),
+                (2, Printer.ACTIVE, 10, 100),
+                (2, Printer.ACTIVE, 10, 200),
+                (3, Printer.ACTIVE, 20, 100),
+            ]
+        )
+        self.schedule = PrinterSchedule({1: 10, 2: 20, 3: 10}, {1: HOUR}, index)
+
+    def test_least_loaded_printer_of_workplace(self):
+        self.assertEqual(self.schedule.assign(100, 10, 10), 2)
+        self.assertEqual(self.schedule.loads[2], 0.5 * HOUR)
+        self.assertEqual(self.schedule.assign(100, 10, 10), 2)
+        self.assertEqual(self.schedule.assign(100, 10, 10), 1)
+        self.assertEqual(self.schedule.assign(100, 20, 10), 3)
+
+    def test_stale_entries_are_skipped(self):
+        self.schedule.add(2, 40)
+        self.schedule.remove(1, 10)
+        self.assertEqual(self.schedule.least_loaded(100, 10), 1)
+        self.assertEqual(self.schedule.least_loaded(200, 10), 2)
+
+    def test_no_printer(self):
+        self.assertIsNone(self.schedule.assign(300, 10, 1))
+        self.assertIsNone(self.schedule.assign(200, 20, 1))
+
+
+class SchedulingSetUp(TestItems):
+    def setUp(self):
+        super().setUp()
+        for printer in [self.printer1, self.printer2, self.printer3]:
+            printer.workplace = self.workplace1
+            printer.save()
+            printer.materials.add(self.material1)
+        self.printer3.status = Printer.MAINTENANCE
+        self.printer3.save()
+        self.queue_m1.orders.set([self.order1_m1])
+        self.queue2_m1 = PrintQueue.objects.create(
+            material=self.material1, workplace=self.workplace1
+        )
+        self.queue2_m1.orders.set([self.order2_m1])
+        self.queue3_m1 = PrintQueue.objects.create(
+            material=self.material1, workplace=self.workplace1
+        )
+        self.queue3_m1.orders.set([self.order3_m1])
+        PrintQueue.objects.filter(pk=self.queue_m1.pk).update(
+            creation_time=timezone.now() - timedelta(hours=1)
+        )
+
+    def printers(self):
+        return dict(PrintQueue.objects.values_list("pk", "printer_id"))
+
+
+class SchedulingTest(SchedulingSetUp):
+    def test_plan_balances_active_printers(self):
+        assignments = plan_queues()
+
+        self.assertEqual(len(assignments), 3)
+        self.assertEqual(
+            sorted(self.printers().values()),
+            sorted([self.printer1.pk, self.printer1.pk, self.printer2.pk]),
+        )
+        self.assertEqual(plan_queues(), {})
+
+    def test_oldest_queue_is_planned_first(self):
+        self.printer2.materials.remove(self.material1)
+        plan_queues()
+        plan = printer_plan(self.printer1)
+        self.assertEqual(plan["queues"][0]["id"], self.queue_m1.pk)
+        self.assertEqual(plan["queues"][0]["start_hours"], 0)
+        self.assertAlmostEqual(
+            plan["load_hours"], 3 * self.order1_m1.square_meters / 10, places=1
+        )
+
+    def test_filled_queue_is_scheduled(self):
+        queue = PrintQueue.objects.create(
+            material=self.material2, workplace=self.workplace1
+        )
+        self.printer3.materials.add(self.material2)
+        self.printer2.materials.add(self.material2)
+
+        set_remove_foreign_by_cleaned_data_and_instance(
+            Order, {"orders": Order.objects.filter(material=self.material2)}, queue
+        )
+
+        queue.refresh_from_db()
+        self.assertEqual(queue.printer, self.printer2)
+
+    def test_finished_printer_takes_newest_queue(self):
+        PrintQueue.objects.filter(pk=self.queue_m1.pk).update(printer=self.printer2)
+        PrintQueue.objects.exclude(pk=self.queue_m1.pk).update(printer=self.printer1)
+
+        PrintQueue.objects.filter(pk=self.queue_m1.pk).change_status(PrintQueue.DONE)
+
+        printers = self.printers()
+        self.assertEqual(printers[self.queue2_m1.pk], self.printer1.pk)
+        self.assertEqual(printers[self.queue3_m1.pk], self.printer2.pk)
+
+    def test_queue_moved_to_other_workplace_is_rescheduled(self):
+        plan_queues()
+        self.printer4.workplace = self.workplace2
+        self.printer4.save()
+        self.printer4.materials.add(self.material1)
+        form = PrintQueueUpdateForm(
+            data={
+                "workplace": self.workplace2,
+                "material": self.material1,
+                "orders": [self.order1_m1],
+            },
+            cached_instance=self.queue_m1,
+        )
+        self.assertTrue(form.is_valid())
+
+        form.save()
+
+        self.queue_m1.refresh_from_db()
+        self.assertEqual(self.queue_m1.workplace, self.workplace2)
+        self.assertEqual(self.queue_m1.printer, self.printer4)
+
+    def test_page_and_command(self):
+        out = StringIO()
+        call_command("schedule_queues", stdout=out)
+        self.assertIn("Assigned 3 print queues to 2 printers.", out.getvalue())
+        self.client.force_login(self.regular_user)
+
+        response = self.client.get(
+            reverse("production:printer-detail", args=[self.printer1.pk])
+        )
+
+        self.assertContains(response, "Planned print queues")
+        self.assertContains(response, f"#{self.queue_m1.pk}")
+
+
+class FailoverTest(SchedulingSetUp):
+    def setUp(self):
+        super().setUp()
+        self.printer4.workplace = self.workplace2
+        self.printer4.save()
+        self.printer4.materials.add(self.material1)
+
+    def set_maintenance(self, printer):
+        printer.status = Printer.MAINTENANCE
+        with (
+            self.assertLogs("production.scheduling", "WARNING") as logs,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            printer.save()
+        return logs.output[0]
+
+    def test_queues_stay_in_workplace_if_possible(self):
+        PrintQueue.objects.exclude(pk=self.queue3_m1.pk).update(printer=self.printer1)
+        PrintQueue.objects.filter(pk=self.queue3_m1.pk).update(printer=self.printer2)
+
+        log = self.set_maintenance(self.printer1)
+
+        self.assertIn("2 print queues moved, 0 of them to other workplaces", log)
+        self.assertEqual(set(self.printers().values()), {self.printer2.pk})
+
+    def test_stranded_workplace_queues_move_to_other_workplace(self):
+        PrintQueue.objects.filter(pk=self.queue_m1.pk).update(printer=self.printer1)
+        self.printer2.status = Printer.MAINTENANCE
+        with self.captureOnCommitCallbacks(execute=True):
+            self.printer2.save()
+        queue_m3 = PrintQueue.objects.create(
+            material=self.material3, workplace=self.workplace1
+        )
+
+        log = self.set_maintenance(self.printer1)
+
+        self.assertIn("3 print queues moved, 3 of them to other workplaces", log)
+        self.assertIn(f"1 have no active printer: #{queue_m3.pk}", log)
+        self.assertEqual(
+            set(
+                PrintQueue.objects.filter(material=self.material1).values_list(
+                    "printer_id", "workplace_id"
+                )
+            ),
+            {(self.printer4.pk, self.workplace2.pk)},
+        )
+        queue_m3.refresh_from_db()
+        self.assertEqual(queue_m3.workplace, self.workplace1)
+
+    def test_saving_inactive_printer_again_does_nothing(self):
+        PrintQueue.objects.update(printer=self.printer1)
+        self.set_maintenance(self.printer1)
+        PrintQueue.objects.update(printer=self.printer1)
+
+        self.printer1.name = "Renamed"
+        with (
+            self.assertNoLogs("production.scheduling", "WARNING"),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            self.printer1.save()
+            Printer.objects.get(pk=self.printer1.pk).save()
+
+        self.assertEqual(set(self.printers().values()), {self.printer1.pk})
+
+    def test_in_progress_queues_stay(self):
+        PrintQueue.objects.update(printer=self.printer1, status=PrintQueue.IN_PROGRESS)
+        self.printer1.status = Printer.MAINTENANCE
+        with self.captureOnCommitCallbacks(execute=True):
+            self.printer1.save()
+        self.assertEqual(set(self.printers().values()), {self.printer1.pk})
@@ -0,0 +1,121 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from production.models import Printer
+from production.simulation import (
+    ShopFloorSimulation,
+    SimulationConfig,
+    load_arrivals,
+    load_printers,
+)
+from tests.test_items import TestItems
+
+
+def printer(id, workplace_id=1, speed=10, materials=(1,), active=True):
+    return {
+        "id": id,
+        "workplace_id": workplace_id,
+        "speed": speed,
+        "materials": set(materials),
+        "active": active,
+    }
+
+
+class ShopFloorSimulationTest(SimpleTestCase):
+    arrivals = {1: (4, [2.0]), 2: (2, [1.0])}
+
+    def run_simulation(self, printers, **config):
+        config = SimulationConfig(**{"days": 7, **config})
+        return ShopFloorSimulation(printers, self.arrivals, config).run()
+
+    def test_same_seed_same_report(self):
+        printers = [printer(1), printer(2, materials=(1, 2))]
+        first = self.run_simulation(printers)
+        second = self.run_simulation(printers)
+        first.pop("seconds")
+        second.pop("seconds")
+        self.assertEqual(first, second)
+
+    def test_orders_are_printed_without_failures(self):
+        report = self.run_simulation(
+            [printer(1, materials=(1, 2)), printer(2, materials=(1, 2))],
+            mtbf_hours=None,
+            problem_rate=0,
+        )
+
+        self.assertGreater(report["orders_arrived"], 0)
+        self.assertLessEqual(
+            report["orders_arrived"] - report["orders_done"],
+            # Orders of the queues being printed at the end.
+            report["backlog"]["end_orders"] + 40,
+        )
+        self.assertEqual(report["failures"], 0)
+        # Waiting for a queue to fill up and printing it take about 4 hours.
+        self.assertLessEqual(report["lead_time_hours"]["p95"], 5)
+        self.assertEqual(sum(report["daily_done"]), report["orders_done"])
+        for item in report["printers"]:
+            self.assertEqual(item["downtime_hours"], 0)
+            self.assertLess(item["utilization"], 1)
+
+    def test_more_printers_shrink_backlog(self):
+        printers = [printer(1, materials=(1, 2)), printer(2, materials=(1, 2))]
+        one = self.run_simulation(printers[:1], arrival_scale=1.5)
+        two = self.run_simulation(printers, arrival_scale=1.5)
+        self.assertGreater(one["backlog"]["end_orders"], 100)
+        self.assertLess(two["backlog"]["end_orders"], 50)
+        self.assertGreater(two["orders_done"], one["orders_done"])
+
+    def test_failures_and_problems(self):
+        report = self.run_simulation(
+            [printer(1), printer(2, active=False)],
+            mtbf_hours=10,
+            problem_rate=0.5,
+        )
+        self.assertGreater(report["failures"], 0)
+        self.assertGreater(report["problems"], 0)
+        self.assertTrue(all(item["downtime_hours"] for item in report["printers"]))
+
+
+class LoadShopFloorTest(TestItems):
+    def setUp(self):
+        super().setUp()
+        for item in [self.printer1, self.printer2]:
+            item.workplace = self.workplace1
+            item.save()
+            item.materials.add(self.material1)
+
+    def test_load_printers(self):
+        printers = load_printers(
+            add=[self.printer1.pk],
+            remove=[self.printer2.pk],
+            move={self.printer1.pk: self.workplace2.pk},
+        )
+        self.assertEqual(
+            [(item["id"], item["workplace_id"]) for item in printers],
+            [(self.printer1.pk, self.workplace2.pk), (-1, self.workplace2.pk)],
+        )
+        self.assertEqual(printers[1]["materials"], {self.material1.pk})
+
+    def test_load_arrivals(self):
+        arrivals = load_arrivals(days=7)
+        rate, areas = arrivals[self.material1.pk]
+        self.assertAlmostEqual(rate, 3 / (7 * 24))
+        self.assertAlmostEqual(areas[0], self.order1_m1.square_meters, places=2)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("simulate", "--days=2", "--arrival-scale=50", stdout=out)
+        self.assertIn("Simulated 2.0 days", out.getvalue())
+        self.assertIn("workplace1", out.getvalue())
+
+        out = StringIO()
+        call_command(
+            "simulate",
+            "--orders-per-hour=5",
+            f"--add-printer={self.printer1.pk}",
+            stdout=out,
+        )
+        self.assertIn(f"{-1:>8}", out.getvalue())
+        self.assertFalse(Printer.objects.filter(pk__lt=0).exists())
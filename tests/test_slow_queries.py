@@ -0,0 +1,87 @@
+from django.template import engines
+from django.urls import reverse
+
+from production.identity_map import IdentityMap
+from production.models import Order, SlowQuery
+from production.slow_queries import slow_query_log
+from tests.test_items import TestItems
+
+
+class SlowQueryLogTest(TestItems):
+    """Every query is slow inside `slow()`, so nothing else is logged."""
+
+    def setUp(self):
+        super().setUp()
+        slow_query_log.explained.clear()
+
+    def slow(self):
+        return self.settings(SLOW_QUERY_THRESHOLD_MS=1e-9)
+
+    def load_order(self, pk):
+        with self.slow(), self.captureOnCommitCallbacks(execute=True):
+            IdentityMap().get(Order, pk)
+
+    def test_queries_are_deduplicated_by_fingerprint(self):
+        with self.assertLogs("production.slow_queries", "WARNING") as logs:
+            self.load_order(self.order1_m1.pk)
+            self.load_order(self.order2_m1.pk)
+        self.assertEqual(len(logs.records), 2)
+
+        slow_query = SlowQuery.objects.get(fingerprint__contains="production_order")
+        self.assertEqual(slow_query.count, 2)
+        self.assertGreaterEqual(slow_query.max_ms, slow_query.average_ms)
+        self.assertTrue(slow_query.explain)
+        self.assertTrue(
+            slow_query.origin.startswith("production.identity_map.IdentityMap.load:")
+        )
+
+    def test_view_name_is_recorded(self):
+        self.client.force_login(self.regular_user)
+        with self.assertLogs("production.slow_queries", "WARNING"):
+            with self.slow(), self.captureOnCommitCallbacks(execute=True):
+                self.client.get(reverse("production:material-list"))
+        self.assertTrue(
+            SlowQuery.objects.filter(view_name="production:material-list").exists()
+        )
+
+    def test_origin_is_resolved_past_template_rendering(self):
+        template = engines["django"].from_string("{{ orders.count }}")
+        with self.assertLogs("production.slow_queries", "WARNING"):
+            with self.slow(), self.captureOnCommitCallbacks(execute=True):
+                template.render({"orders": Order.objects.all()})
+        slow_query = SlowQuery.objects.get(fingerprint__contains="production_order")
+        self.assertTrue(
+            slow_query.origin.startswith(
+                "tests.test_slow_queries.SlowQueryLogTest."
+                "test_origin_is_resolved_past_template_rendering:"
+            ),
+            slow_query.origin,
+        )
+
+    def test_own_queries_are_not_recorded(self):
+        with self.assertLogs("production.slow_queries", "WARNING"):
+            self.load_order(self.order1_m1.pk)
+        self.assertFalse(
+            SlowQuery.objects.filter(
+                fingerprint__contains="production_slowquery"
+            ).exists()
+        )
+
+    def test_disabled_log(self):
+        with self.assertNoLogs("production.slow_queries", "WARNING"):
+            with self.settings(SLOW_QUERY_THRESHOLD_MS=None):
+                IdentityMap().get(Order, self.order1_m1.pk)
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_admin_lists_slow_queries(self):
+        with self.assertLogs("production.slow_queries", "WARNING"):
+            self.load_order(self.order1_m1.pk)
+        self.client.force_login(self.admin_user)
+        response = self.client.get(reverse("admin:production_slowquery_changelist"))
+        self.assertContains(response, "production.identity_map.IdentityMap.load")
+
+    def test_transaction_statements_are_skipped(self):
+        with self.assertLogs("production.slow_queries", "WARNING") as logs:
+            self.load_order(self.order1_m1.pk)
+        for record in logs.records:
+            self.assertNotIn("SAVEPOINT", record.getMessage())
@@ -0,0 +1,118 @@
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+from django.utils import timezone
+
+from production.models import Order, PrintQueue, StatusEvent
+from tests.test_items import TestItems
+
+
+class StatusEventTest(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.queue_m1.printer = self.printer1
+        self.queue_m1.save()
+        self.queue_m1.orders.set([self.order1_m1, self.order2_m1])
+
+    def events(self, **filters):
+        return list(
+            StatusEvent.objects.filter(**filters).values_list(
+                "from_status", "to_status"
+            )
+        )
+
+    def test_creation_is_logged(self):
+        self.assertEqual(
+            self.events(order_id=self.order1_m1.pk), [("", Order.READY_TO_PRINT)]
+        )
+        self.assertEqual(
+            self.events(kind=StatusEvent.PRINT_QUEUE, print_queue_id=self.queue_m1.pk),
+            [("", PrintQueue.READY_TO_PRINT)],
+        )
+
+    def test_save_without_status_change_is_not_logged(self):
+        order = Order.objects.get(pk=self.order1_m1.pk)
+        order.comment = "comment"
+        order.save()
+        self.assertEqual(StatusEvent.objects.filter(order_id=order.pk).count(), 1)
+
+    def test_change_order_status_view(self):
+        self.client.force_login(self.regular_user)
+        self.client.get(
+            reverse("production:change-order-status", kwargs={"pk": self.order1_m1.pk})
+        )
+
+        order_event = StatusEvent.objects.filter(order_id=self.order1_m1.pk).last()
+        self.assertEqual(
+            (order_event.from_status, order_event.to_status),
+            (Order.READY_TO_PRINT, Order.PROBLEM),
+        )
+        self.assertEqual(order_event.by, self.regular_user)
+        self.assertEqual(order_event.print_queue_id, self.queue_m1.pk)
+        self.assertEqual(order_event.workplace, self.workplace1)
+        self.assertEqual(order_event.printer, self.printer1)
+        self.assertEqual(
+            self.events(kind=StatusEvent.PRINT_QUEUE, print_queue_id=self.queue_m1.pk)[
+                -1
+            ],
+            (PrintQueue.READY_TO_PRINT, PrintQueue.PROBLEM),
+        )
+
+    def test_bulk_change_status(self):
+        performing_time = timezone.now()
+        changed = Order.objects.filter(material=self.material1).change_status(
+            Order.DONE, by=self.admin_user, performing_time=performing_time
+        )
+
+        self.assertEqual(changed, 3)
+        self.assertEqual(
+            Order.objects.filter(
+                status=Order.DONE, performing_time=performing_time
+            ).count(),
+            3,
+        )
+        done = StatusEvent.objects.filter(to_status=Order.DONE)
+        self.assertEqual(
+            set(done.values_list("order_id", flat=True)),
+            {self.order1_m1.pk, self.order2_m1.pk, self.order3_m1.pk},
+        )
+        self.assertEqual(
+            set(done.values_list("workplace_id", flat=True)),
+            {self.workplace1.pk, None},
+        )
+        self.assertEqual(
+            Order.objects.filter(material=self.material1).change_status(Order.DONE), 0
+        )
+
+    def test_events_are_append_only(self):
+        event = StatusEvent.objects.first()
+        event.to_status = Order.DONE
+        with self.assertRaises(ValueError):
+            event.save()
+
+    def test_saved_event_has_related_ids(self):
+        queue = PrintQueue.objects.get(pk=self.queue_m1.pk)
+        queue.status = PrintQueue.IN_PROGRESS
+        queue.save()
+        order = Order.objects.get(pk=self.order3_m1.pk)
+        order.status = Order.PROBLEM
+        order.save()
+
+        queue_event = StatusEvent.objects.filter(kind=StatusEvent.PRINT_QUEUE).last()
+        self.assertEqual(
+            (queue_event.print_queue_id, queue_event.workplace, queue_event.printer),
+            (self.queue_m1.pk, self.workplace1, self.printer1),
+        )
+        order_event = StatusEvent.objects.filter(order_id=order.pk).last()
+        self.assertEqual(
+            (order_event.print_queue_id, order_event.workplace_id), (None, None)
+        )
+
+    def test_model_without_lookups_fails_on_first_save(self):
+        with mock.patch.object(PrintQueue, "status_event_lookups", ()):
+            with self.assertRaisesMessage(ImproperlyConfigured, "PrintQueue must"):
+                PrintQueue.objects.create(material=self.material1)
+            with self.assertRaisesMessage(ImproperlyConfigured, "PrintQueue must"):
+                PrintQueue.objects.all().change_status(PrintQueue.DONE)
+        self.assertEqual(list(PrintQueue.objects.all()), [self.queue_m1])
@@ -0,0 +1,122 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from production.capabilities import get_capability_index
+from production.models import Material, Order, Printer, PrintQueue, Worker, Workplace
+from production.status_objects import PrintStatusMixin
+from production.synthetic import SyntheticDataGenerator, clear_production_data
+
+UNTIL = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class SyntheticDataGeneratorTest(TestCase):
+    def generate(self, **kwargs) -> dict[str, int]:
+        options = {
+            "seed": 7,
+            "orders": 300,
+            "queues": 30,
+            "workplaces": 3,
+            "printers_per_workplace": 2,
+            "materials": 4,
+            "workers": 6,
+            "days": 60,
+            "until": UNTIL,
+            "batch_size": 100,
+        }
+        options.update(kwargs)
+        return SyntheticDataGenerator(**options).generate()
+
+    def orders_snapshot(self) -> list[tuple]:
+        return list(
+            Order.objects.order_by("pk").values_list(
+                "status", "width", "height", "creation_time"
+            )
+        )
+
+    def test_generates_requested_volumes(self):
+        created = self.generate()
+        self.assertEqual(created["orders"], 300)
+        self.assertEqual(Order.objects.count(), 300)
+        self.assertEqual(PrintQueue.objects.count(), 30)
+        self.assertEqual(Printer.objects.count(), 6)
+        self.assertEqual(Workplace.objects.count(), 3)
+        self.assertEqual(Material.objects.count(), 4)
+        self.assertEqual(Worker.objects.count(), 6)
+
+    def test_same_seed_generates_same_data(self):
+        self.generate()
+        first = self.orders_snapshot()
+        clear_production_data()
+        self.generate()
+        self.assertEqual(self.orders_snapshot(), first)
+
+    def test_other_seed_generates_other_data(self):
+        self.generate()
+        first = self.orders_snapshot()
+        clear_production_data()
+        self.generate(seed=8)
+        self.assertNotEqual(self.orders_snapshot(), first)
+
+    def test_creation_times_are_kept_within_history(self):
+        self.generate()
+        since = UNTIL - datetime.timedelta(days=62)
+        self.assertFalse(Order.objects.filter(creation_time__lt=since).exists())
+        self.assertFalse(Order.objects.filter(creation_time__gt=UNTIL).exists())
+        self.assertFalse(PrintQueue.objects.filter(creation_time__lt=since).exists())
+
+    def test_queued_orders_match_queue(self):
+        self.generate()
+        queued = Order.objects.filter(print_queue__isnull=False)
+        self.assertTrue(queued.exists())
+        self.assertFalse(queued.exclude(material=F("print_queue__material")).exists())
+        self.assertFalse(
+            Order.objects.filter(
+                status=PrintStatusMixin.DONE, performing_time__isnull=True
+            ).exists()
+        )
+
+    def test_queue_printers_support_queue_material(self):
+        self.generate()
+        index = get_capability_index()
+        for queue in PrintQueue.objects.exclude(printer__isnull=True):
+            self.assertIn(queue.material_id, index.printer_materials[queue.printer_id])
+            self.assertEqual(
+                index.printer_workplace[queue.printer_id], queue.workplace_id
+            )
+
+    def test_old_queues_are_done(self):
+        self.generate()
+        open_since = UNTIL - datetime.timedelta(days=3)
+        self.assertFalse(
+            PrintQueue.objects.filter(creation_time__lt=open_since)
+            .exclude(status=PrintStatusMixin.DONE)
+            .exists()
+        )
+
+
+class GenerateDataCommandTest(TestCase):
+    def test_command_generates_data(self):
+        out = StringIO()
+        call_command(
+            "generate_data",
+            "--orders=50",
+            "--queues=5",
+            "--workplaces=2",
+            "--materials=3",
+            "--workers=2",
+            "--until=2026-01-01",
+            stdout=out,
+        )
+        self.assertEqual(Order.objects.count(), 50)
+        self.assertIn("50 orders", out.getvalue())
+
+    def test_clear_replaces_existing_data(self):
+        options = ["--orders=20", "--queues=2", "--workplaces=1", "--materials=2"]
+        call_command("generate_data", *options, stdout=StringIO())
+        call_command("generate_data", *options, "--clear", stdout=StringIO())
+        self.assertEqual(Order.objects.count(), 20)
+        self.assertEqual(Workplace.objects.count(), 1)
@@ -0,0 +1,76 @@
+from django.db import connection
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from production.timing import RequestTiming, current_timing
+from tests.test_items import TestItems
+
+
+class RequestTimingTest(SimpleTestCase):
+    def test_nested_templates_are_counted_once(self):
+        timing = RequestTiming()
+        with timing.template_render():
+            with timing.template_render():
+                pass
+            inner = timing.template_time
+        self.assertEqual(inner, 0.0)
+        self.assertGreater(timing.template_time, 0.0)
+
+    def test_templates_are_measured_inside_instrument(self):
+        template = engines["django"].from_string("{{ value }}")
+        timing = RequestTiming()
+        with timing.instrument():
+            self.assertIs(current_timing(), timing)
+            template.render({"value": 1})
+        self.assertIsNone(current_timing())
+        self.assertGreater(timing.template_time, 0.0)
+
+    def test_server_timing_header(self):
+        timing = RequestTiming()
+        with timing.instrument():
+            pass
+        header = timing.server_timing()
+        for name in ("db", "tpl", "view", "py", "total"):
+            self.assertIn(f"{name};dur=", header)
+        self.assertIn('desc="SQL (0 queries)"', header)
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+class ServerTimingMiddlewareTest(TestItems):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("production:material-list")
+
+    def test_staff_gets_server_timing_header(self):
+        self.client.force_login(self.admin_user)
+        with self.assertLogs("production.timing", "INFO") as logs:
+            response = self.client.get(self.url)
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("tpl;dur=", response["Server-Timing"])
+        self.assertIn("url_name=production:material-list", logs.output[0])
+        timing = logs.records[0].timing
+        self.assertGreater(timing["db_queries"], 0)
+        self.assertGreater(timing["template_ms"], 0)
+        self.assertGreaterEqual(timing["total_ms"], timing["view_ms"])
+
+    def test_queries_are_counted(self):
+        self.client.force_login(self.admin_user)
+        with self.assertLogs("production.timing", "INFO") as logs:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(self.url)
+        self.assertEqual(logs.records[0].timing["db_queries"], len(queries))
+
+    def test_regular_user_gets_no_header(self):
+        self.client.force_login(self.regular_user)
+        with self.assertLogs("production.timing", "INFO"):
+            response = self.client.get(self.url)
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_disabled_middleware_is_not_used(self):
+        self.client.force_login(self.admin_user)
+        with self.assertNoLogs("production.timing", "INFO"):
+            response = self.client.get(self.url)
+        self.assertNotIn("Server-Timing", response)
@@ -1,6 +1,12 @@
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from production.capabilities import get_capability_index
+from production.forms import PrintQueueCreateForm, WorkplaceForm
 from production.models import (
     Workplace, Worker,
     Order,  Printer,
@@ -98,7 +104,7 @@ class PrivateMaterialTest(TestViewsSetUp):
         response = self.client.get(MATERIAL_URL)
         self.assertEqual(response.status_code, 200)
         expected_materials = Material.objects.all()
-        self.assertQuerySetEqual(response.context["materials_list"], expected_materials)
+        self.assertQuerySetEqual(response.context["material_list"], expected_materials)
         self.assertTemplateUsed(
             response,
             "production/material_list.html",
@@ -116,7 +122,7 @@ class PrivatePrinterTest(TestViewsSetUp):
         response = self.client.get(PRINTER_URL)
         expected_printers = Printer.objects.all()
         self.assertEqual(response.status_code, 200)
-        self.assertQuerySetEqual(response.context["printers_list"], expected_printers)
+        self.assertQuerySetEqual(response.context["printer_list"], expected_printers)
 
 
 class PublicOrderTest(TestCase):
@@ -130,7 +136,7 @@ class PrivateOrderTest(TestViewsSetUp):
         response = self.client.get(ORDER_URL)
         self.assertEqual(response.status_code, 200)
         expected_orders = Order.objects.all()
-        self.assertQuerySetEqual(response.context["orders_list"], expected_orders)
+        self.assertQuerySetEqual(response.context["order_list"], expected_orders)
 
 
 class PublicPrintQueueTest(TestCase):
@@ -236,3 +242,194 @@ class ChangeOrderStatusTest(TestViewsSetUp):
         self.order1_m1.refresh_from_db()
         self.assertEqual(response.status_code, 302)
         self.assertEqual(self.order1_m1.status, Order.DONE)
+
+
+class PrintQueueFormQueriesTest(TestViewsSetUp):
+    """
+    Lock in the number of queries of the print queue form views:
+    the form is built and cleaned once per request and the summary
+    shares evaluated querysets with the rendered form.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.printer1.materials.add(self.material1)
+        self.printer1.workplace = self.workplace1
+        self.printer1.save()
+        self.order1_m1.print_queue = self.queue_m1
+        self.order1_m1.save()
+        get_capability_index()
+        self.create_url = reverse(
+            "production:print-queue-create", args=[self.workplace1.pk]
+        )
+        self.update_url = reverse(
+            "production:print-queue-update", args=[self.queue_m1.pk]
+        )
+
+    def test_create_view_get_queries(self):
+        with self.assertNumQueries(6):
+            response = self.client.get(self.create_url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_create_view_post_without_approve_queries(self):
+        data = {"material": self.material1.pk, "orders": [self.order2_m1.pk]}
+        with self.assertNumQueries(8):
+            response = self.client.post(self.create_url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["summary"]["total_tiles"], 5)
+
+    def test_update_view_get_queries(self):
+        with self.assertNumQueries(9):
+            response = self.client.get(self.update_url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_view_post_without_approve_queries(self):
+        data = {
+            "workplace": self.workplace1.pk,
+            "orders": [self.order1_m1.pk, self.order2_m1.pk],
+        }
+        with self.assertNumQueries(11):
+            response = self.client.post(self.update_url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["summary"]["total_tiles"], 10)
+
+    def test_post_renders_same_form_instance(self):
+        data = {"material": self.material1.pk, "orders": [self.order2_m1.pk]}
+        response = self.client.post(self.create_url, data)
+        form = response.context["form"]
+        self.assertTrue(form.is_bound)
+        self.assertIn(self.order2_m1, form.cleaned_data["orders"])
+
+
+class PrintQueueClaimConflictTest(TestViewsSetUp):
+    def setUp(self):
+        super().setUp()
+        self.printer1.materials.add(self.material1)
+        self.printer1.workplace = self.workplace1
+        self.printer1.save()
+        self.create_url = reverse(
+            "production:print-queue-create", args=[self.workplace1.pk]
+        )
+
+    def test_orders_taken_after_validation_are_reported(self):
+        clean_orders = PrintQueueCreateForm.clean_orders
+
+        def taken_meanwhile(form):
+            orders = clean_orders(form)
+            Order.objects.filter(pk=self.order2_m1.pk).update(
+                print_queue=self.queue_m1
+            )
+            return orders
+
+        data = {
+            "material": self.material1.pk,
+            "orders": [self.order1_m1.pk, self.order2_m1.pk],
+            "approve": "",
+        }
+        with mock.patch.object(
+            PrintQueueCreateForm, "clean_orders", taken_meanwhile
+        ):
+            response = self.client.post(self.create_url, data)
+
+        self.assertContains(
+            response, "1 of the selected orders were just taken by another print queue"
+        )
+        self.assertEqual(list(PrintQueue.objects.all()), [self.queue_m1])
+        self.order1_m1.refresh_from_db()
+        self.assertIsNone(self.order1_m1.print_queue)
+
+
+class WorkplaceClaimConflictTest(TestViewsSetUp):
+    def post_taken_meanwhile(self, url, data):
+        clean = WorkplaceForm.clean
+
+        def taken_meanwhile(form):
+            cleaned_data = clean(form)
+            Printer.objects.filter(pk=self.printer2.pk).update(
+                workplace=self.workplace2
+            )
+            return cleaned_data
+
+        with mock.patch.object(WorkplaceForm, "clean", taken_meanwhile):
+            return self.client.post(url, data)
+
+    def test_create_reports_printers_taken_meanwhile(self):
+        data = {"name": "workplace3", "printers": [self.printer1.pk, self.printer2.pk]}
+        url = reverse("production:workplace-create")
+        response = self.post_taken_meanwhile(url, data)
+
+        self.assertContains(
+            response, "1 of the selected printers were just taken by another workplace"
+        )
+        self.assertFalse(Workplace.objects.filter(name="workplace3").exists())
+        self.printer1.refresh_from_db()
+        self.assertIsNone(self.printer1.workplace)
+
+    def test_update_reports_printers_taken_meanwhile(self):
+        url = reverse("production:workplace-update", args=[self.workplace1.pk])
+        data = {"name": "renamed", "printers": [self.printer1.pk, self.printer2.pk]}
+        response = self.post_taken_meanwhile(url, data)
+
+        self.assertContains(
+            response, "1 of the selected printers were just taken by another workplace"
+        )
+        self.workplace1.refresh_from_db()
+        self.assertEqual(self.workplace1.name, "workplace1")
+        self.printer2.refresh_from_db()
+        self.assertEqual(self.printer2.workplace, self.workplace2)
+
+
+class WorkplacePermissionContextTest(TestViewsSetUp):
+    def setUp(self):
+        super().setUp()
+        self.regular_user.workplace = self.workplace1
+        self.regular_user.save()
+        self.workplace_url = reverse(
+            "production:workplace-detail", args=[self.workplace1.pk]
+        )
+        self.print_queue_url = reverse(
+            "production:print-queue-detail", args=[self.queue_m1.pk]
+        )
+
+    def add_workers(self, count: int) -> None:
+        for index in range(count):
+            Worker.objects.create_user(
+                username=f"worker_{index}",
+                password="<PASS*0WORD>",
+                workplace=self.workplace1,
+            )
+
+    def test_worker_can_operate_own_workplace(self):
+        self.client.force_login(self.regular_user)
+        for url in [self.workplace_url, self.print_queue_url]:
+            response = self.client.get(url)
+            self.assertTrue(response.context["is_workplace_worker"])
+            self.assertTrue(response.context["can_operate_workplace"])
+
+    def test_worker_can_not_operate_other_workplace(self):
+        self.regular_user.workplace = self.workplace2
+        self.regular_user.save()
+        self.client.force_login(self.regular_user)
+        response = self.client.get(self.print_queue_url)
+        self.assertFalse(response.context["can_operate_workplace"])
+        self.assertNotContains(
+            response,
+            reverse("production:print-queue-update", args=[self.queue_m1.pk]),
+        )
+
+    def test_staff_can_operate_any_workplace(self):
+        response = self.client.get(self.print_queue_url)
+        self.assertFalse(response.context["is_workplace_worker"])
+        self.assertTrue(response.context["can_operate_workplace"])
+
+    def test_print_queue_detail_queries_do_not_depend_on_headcount(self):
+        self.client.force_login(self.regular_user)
+        self.client.get(self.print_queue_url)
+        with CaptureQueriesContext(connection) as few_workers:
+            self.client.get(self.print_queue_url)
+        self.add_workers(5)
+        with CaptureQueriesContext(connection) as many_workers:
+            self.client.get(self.print_queue_url)
+        self.assertEqual(len(few_workers), len(many_workers))
+        for query in many_workers.captured_queries:
+            self.assertNotIn('"production_worker"."workplace_id" =', query["sql"])
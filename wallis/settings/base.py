@@ -41,12 +41,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "production.middleware.ServerTimingMiddleware",
+    "production.middleware.MetricsMiddleware",
+    "production.middleware.NPlusOneMiddleware",
+    "production.middleware.MemoryProfilerMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "production.middleware.ProfilerMiddleware",
+    "production.middleware.IdentityMapMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
@@ -56,7 +62,8 @@ ROOT_URLCONF = "wallis.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "production.template_backends.TimedDjangoTemplates",
+        "NAME": "django",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -66,6 +73,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "production.context_processors.cfg_assets_root",
+                "production.context_processors.user_workplace",
             ],
         },
     },
@@ -114,6 +122,125 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 # Assets Management
 ASSETS_ROOT = os.getenv("ASSETS_ROOT", "/static/assets")
 
+# Server-Timing
+# Share of requests (0..1) measured by ServerTimingMiddleware, 0 disables it.
+
+SERVER_TIMING_SAMPLE_RATE = float(os.getenv("SERVER_TIMING_SAMPLE_RATE", "0"))
+
+# Metrics
+# Recorded by MetricsMiddleware when METRICS_ENABLED and scraped
+# from /metrics, every gunicorn worker writes its values
+# to METRICS_DIR and a scrape sums them. Without the directory
+# only the values of the scraped process are reported.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+
+METRICS_FLUSH_INTERVAL = 5
+
+METRICS_DOMAIN_GAUGES_TTL = 30
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# N+1 queries
+# NPLUSONE_MODE "log" logs a warning for every request running one query
+# shape at least NPLUSONE_THRESHOLD times, "raise" fails the request.
+# Unset (production) the detector is not installed.
+
+NPLUSONE_MODE = os.getenv("NPLUSONE_MODE")
+
+NPLUSONE_THRESHOLD = 3
+
+# Slow queries
+# Queries slower than the threshold are explained, logged and counted
+# by SQL fingerprint in the admin. Off unless SLOW_QUERY_THRESHOLD_MS is set
+# (production defaults to 200 ms). Logged to stderr, or to a rotating file
+# if SLOW_QUERY_LOG_FILE is set.
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "0")) or None
+
+SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "0") == "1"
+
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "slow_queries": (
+            {
+                "class": "logging.handlers.RotatingFileHandler",
+                "filename": SLOW_QUERY_LOG_FILE,
+                "maxBytes": 10 * 1024 * 1024,
+                "backupCount": 5,
+                "delay": True,
+            }
+            if SLOW_QUERY_LOG_FILE
+            else {"class": "logging.StreamHandler"}
+        ),
+    },
+    "loggers": {
+        "production.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
+# Profiler
+# Samples Python stacks of chosen requests every PROFILER_INTERVAL_MS
+# and stores collapsed-stack files in PROFILER_DIR, listed at /profiles/.
+# A request is profiled if a staff user sends "X-Profile: 1",
+# if its URL name is in PROFILER_URL_NAMES (comma separated),
+# or it is slower than PROFILER_SLOW_MS among PROFILER_SLOW_SAMPLE_RATE
+# of requests sampled for it. Old files are removed above the limits.
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+
+PROFILER_DIR = os.getenv("PROFILER_DIR", BASE_DIR / "profiles")
+
+PROFILER_URL_NAMES = [
+    name for name in os.getenv("PROFILER_URL_NAMES", "").split(",") if name
+]
+
+PROFILER_SLOW_MS = float(os.getenv("PROFILER_SLOW_MS", "0")) or None
+
+PROFILER_SLOW_SAMPLE_RATE = float(os.getenv("PROFILER_SLOW_SAMPLE_RATE", "0.05"))
+
+PROFILER_INTERVAL_MS = 5
+
+PROFILER_MAX_SAMPLES = 6000
+
+PROFILER_MAX_CONCURRENT = 1
+
+PROFILER_MAX_FILES = 200
+
+PROFILER_MAX_BYTES = 50 * 1024 * 1024
+
+# Memory profiler
+# Requests to the URL names (comma separated) are measured with tracemalloc,
+# peak and top allocating lines are logged to "production.memory".
+
+MEMORY_PROFILER_URL_NAMES = [
+    name for name in os.getenv("MEMORY_PROFILER_URL_NAMES", "").split(",") if name
+]
+
+MEMORY_PROFILER_TOP = 10
+
+# Archive
+# `manage.py archive_orders` moves done orders and print queues older
+# than ARCHIVE_AFTER_DAYS to the archive tables.
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+
+# Inventory
+# Material run-out dates are forecast at the average daily consumption
+# of the last INVENTORY_FORECAST_DAYS days.
+
+INVENTORY_FORECAST_DAYS = 30
+
 # IPS
 
 INTERNAL_IPS = [
@@ -5,6 +5,10 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+SERVER_TIMING_SAMPLE_RATE = 1.0
+
+NPLUSONE_MODE = os.getenv("NPLUSONE_MODE", "log")
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
@@ -28,3 +28,22 @@ DATABASES = {
         },
     }
 }
+
+# Cache
+# Shared by all gunicorn workers, so versioned in-process data
+# (reference data choices, capability index) is invalidated in every process.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("CACHE_LOCATION", "/tmp/wallis_cache"),
+    }
+}
+
+# Metrics
+
+METRICS_DIR = os.getenv("METRICS_DIR", "/tmp/wallis_metrics")
+
+# Slow queries
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200")) or None
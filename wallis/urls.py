@@ -19,9 +19,14 @@ from debug_toolbar.toolbar import debug_toolbar_urls
 from django.contrib import admin
 from django.urls import path, include
 
+from production.views import metrics_view, profile_download, profile_list
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     # bild-in django authorization
     path("accounts/", include("django.contrib.auth.urls")),
+    path("metrics", metrics_view, name="metrics"),
+    path("profiles/", profile_list, name="profile-list"),
+    path("profiles/<str:name>", profile_download, name="profile-download"),
     path("", include("production.urls", namespace="production")),
 ] + debug_toolbar_urls()